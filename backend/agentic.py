@@ -1,17 +1,66 @@
 import logging, asyncio
-import tempfile
-import os
 from typing import List, Optional, Dict, Any
 from agents.vision_agent import image_extraction
 from parsers.parse import process_pdf_async
 from agents.vision_agent import vision_agent
-from supabase_client.supabase_client import SupabaseCaseClient
-from models.data_models import ProcessedFile, CaseInput, PatientData, RadiologyDocument
+from supabase_client.supabase_client import get_supabase_client
+from models.data_models import ProcessedFile, CaseInput, PatientData, RadiologyDocument, ParsedPage
 from agents.medical_ai_agent import MedicalInsightsAgent
+from utils.events import get_event_bus
 
 logger = logging.getLogger(__name__)
 
-supabase = SupabaseCaseClient()
+supabase = get_supabase_client()
+events = get_event_bus()
+
+
+async def _store_lab_result(lab_file: Dict[str, Any], result: Dict[str, Any]) -> Dict[str, Any]:
+    """Persist the parsed text of one lab file and return its status"""
+    file_id = lab_file.get('file_id')
+    file_name = lab_file.get('file_name')
+    status = {"file_id": file_id, "file_name": file_name, "status": result.get('status'), "cached": result.get('cached', False)}
+
+    if result.get('status') != 'success':
+        logger.error(f"Failed to process lab file {file_name}: {result.get('error', 'Unknown error')}")
+        status["error"] = result.get('error', 'Unknown error')
+        return status
+
+    try:
+        await supabase.update_case_file_metadata(
+            file_id=file_id, 
+            metadata={"text_data": result.get('text', '')}
+            )
+        logger.info(f"Successfully processed lab file: {file_name}")
+    except Exception as e:
+        logger.error(f"Error storing lab file {file_name}: {e}")
+        status.update({"status": "error", "error": str(e)})
+        return status
+
+    # Page-level copy for stages that only need some pages; text_data stays the source of truth
+    pages = result.get('pages', [])
+    status["pages"] = len(pages)
+    try:
+        await supabase.replace_file_pages(file_id, [page.model_dump() for page in pages])
+    except Exception as e:
+        logger.warning(f"Error storing pages of lab file {file_name}: {e}")
+    return status
+
+
+async def _parse_lab_file(case_id: str, lab_file: Dict[str, Any]) -> Dict[str, Any]:
+    """Parse, store and report one lab file, publishing progress as its pages are parsed"""
+    file_id = lab_file.get('file_id')
+
+    async def on_page(page: ParsedPage) -> None:
+        await events.publish(case_id, "file", {
+            "file_category": "lab", "file_id": file_id, "file_name": lab_file.get('file_name'),
+            "status": "parsing", "pages_parsed": page.page_number,
+        })
+
+    result = await process_pdf_async(lab_file.get('file_path'), on_page=on_page)
+    status = await _store_lab_result(lab_file, result)
+    await events.publish(case_id, "file", {"file_category": "lab", **status})
+    return status
+
 
 async def agentic_process(
     case_id: str, 
@@ -36,35 +85,16 @@ async def agentic_process(
 
     if lab_files:
         logger.info("Processing lab files...")
-        for lab_file in lab_files:
-            file_id = lab_file.get('file_id')
-            file_name = lab_file.get('file_name')
-            file_content = lab_file.get('file_content')
-            file_type = lab_file.get('file_type')
-            
-            logger.info(f"Processing lab file: {file_name} ({file_type}) - Size: {len(file_content)} bytes")
-            temp_file_path = None
-            try:
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
-                    temp_file.write(file_content)
-                    temp_file_path = temp_file.name
-                
-                result = await process_pdf_async(temp_file_path)
-
-                if result.get('status') == 'success':
-                    logger.info(f"Successfully processed lab file: {file_name}")
-                    await supabase.update_case_file_metadata(
-                        file_id=file_id, 
-                        metadata={"text_data": result.get('text', '')}
-                        )
-                else:
-                    logger.error(f"Failed to process lab file {file_name}: {result.get('error', 'Unknown error')}")
-                
-            except Exception as e:
-                logger.error(f"Error processing lab file {file_name}: {e}")
-            finally:
-                if temp_file_path and os.path.exists(temp_file_path):
-                    os.unlink(temp_file_path)
+        try:
+            for lab_file in lab_files:
+                logger.info(f"Queueing lab file: {lab_file.get('file_name')} ({lab_file.get('file_type')}) - Size: {lab_file.get('file_size')} bytes")
+
+            # The process-wide parse limiter still bounds the jobs in flight across all cases
+            file_statuses = await asyncio.gather(*(_parse_lab_file(case_id, lab_file) for lab_file in lab_files))
+            logger.info(f"Lab file statuses for case {case_id}: {file_statuses}")
+
+        except Exception as e:
+            logger.error(f"Error processing lab files: {e}")
 
     if radiology_files:
         logger.info("Processing radiology files...")
@@ -109,21 +139,42 @@ async def agentic_process(
         )
         
 
+        # Resumes from the last checkpoint if an earlier attempt failed mid-workflow
         medical_agent = MedicalInsightsAgent()
         medical_insights = await medical_agent.process(case_input)
-        
-        logger.info(f"Successfully generated medical insights for case {case_id}")
-        await supabase.update_case_status(case_id=case_id, status="completed")
+        await _complete_case(case_id, medical_insights)
         
     except Exception as e:
-        logger.error(f"Error in AI insights generation: {e}")
-        await supabase.update_case_status(case_id=case_id, status="failed")
+        logger.error(f"Error in AI insights generation for case {case_id}: {e}")
         raise e
 
     logger.info(f"Completed enhanced agentic process for case {case_id}")
     return "done"
 
 
+async def _complete_case(case_id: str, medical_insights) -> None:
+    logger.info(f"Successfully generated medical insights for case {case_id}")
+    if medical_insights is not None:
+        await events.publish(case_id, "insights", medical_insights.model_dump(mode="json"))
+    await supabase.update_case_status(case_id=case_id, status="completed")
+    await events.publish(case_id, "status", {"status": "completed"})
+
+
+async def resume_analysis(case_id: str):
+    """Resume a case's failed or interrupted analysis from its last checkpoint"""
+    logger.info(f"Resuming analysis for case {case_id}")
+    try:
+        medical_agent = MedicalInsightsAgent()
+        medical_insights = await medical_agent.resume(case_id)
+        await _complete_case(case_id, medical_insights)
+    except Exception as e:
+        logger.error(f"Error resuming analysis for case {case_id}: {e}")
+        raise e
+
+    logger.info(f"Completed resumed analysis for case {case_id}")
+    return "done"
+
+
 # async def main():
 #     case_id = "917034a2-c50e-48f4-8289-963ad7b0ad58"
 #     user_id = "b8acad4b-4944-4d66-b405-de70886e7248"
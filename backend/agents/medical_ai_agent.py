@@ -1,31 +1,117 @@
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Callable, Tuple
 import json
 import asyncio
+import time
 from utils.base_agent import BaseAgent
 from models.state_models import MedicalAnalysisState
+from pydantic import ValidationError
 from models.data_models import (
     CaseInput, LabDocument, RadiologyDocument, CaseSummary, SOAPNote,
     Diagnosis, DifferentialDiagnosis, InvestigationRecommendation,
     TreatmentRecommendation, MedicalInsights, PatientData
 )
 
-from langgraph.graph import StateGraph, END
+from langgraph.graph import StateGraph, START, END
 from utils.llm_utils import LLMManager
-from supabase_client.supabase_client import SupabaseCaseClient
+from supabase_client.supabase_client import get_supabase_client
+from utils.events import get_event_bus
+from utils.node_cache import NodeResultCache, get_node_cache, fingerprint
+from utils.checkpoints import SQLiteCheckpointSaver, get_checkpointer
+from utils.tokens import count_tokens, chunk_pages
+from parsers.pages import split_pages
 
-from utils.medical_prompts import LAB_ANALYSIS_PROMPT, CASE_SUMMARY_PROMPT, SOAP_NOTE_PROMPT, DIAGNOSIS_PROMPT, DIFFERENTIAL_DIAGNOSIS_PROMPT, RECOMMENDATIONS_PROMPT
+from utils.medical_prompts import LAB_ANALYSIS_PROMPT, CASE_SUMMARY_PROMPT, SOAP_NOTE_PROMPT, DIAGNOSIS_PROMPT, DIFFERENTIAL_DIAGNOSIS_PROMPT, RECOMMENDATIONS_PROMPT, FAST_ANALYSIS_PROMPT
 
 from utils.extractjson import extract_json_from_string
+from config import LAB_ANALYSIS_FANOUT, LAB_CHUNK_MAX_TOKENS, LLM_STREAM_PARTIALS, LLM_STREAM_PARTIAL_INTERVAL, ANALYSIS_MODE
 
 import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# State keys whose values are sent with the stage event of the node that wrote them
+STAGE_RESULT_KEYS = (
+    "case_summary", "soap_note", "primary_diagnosis", "differential_diagnoses",
+    "investigation_recommendations", "treatment_recommendations",
+)
+
+
+# Model of each state key a node writes, to restore outputs reused from the node cache
+STATE_KEY_MODELS = {
+    "processed_lab_docs": LabDocument,
+    "case_summary": CaseSummary,
+    "soap_note": SOAPNote,
+    "primary_diagnosis": Diagnosis,
+    "differential_diagnoses": DifferentialDiagnosis,
+    "investigation_recommendations": InvestigationRecommendation,
+    "treatment_recommendations": TreatmentRecommendation,
+}
+
+
+def _dump(value: Any) -> Any:
+    if isinstance(value, list):
+        return [_dump(item) for item in value]
+    return value.model_dump(mode="json") if hasattr(value, "model_dump") else value
+
+
+def _restore(key: str, value: Any) -> Any:
+    model = STATE_KEY_MODELS.get(key)
+    if model is None or value is None:
+        return value
+    if isinstance(value, list):
+        return [model.model_validate(item) for item in value]
+    return model.model_validate(value)
+
+
+def _merge_lab_analyses(analyses: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Combine the analyses of a lab document's chunks, in page order. A test
+    reported by several chunks keeps its first value; a repeat with a
+    different value (e.g. a serial measurement) is kept as "<test> (2)".
+    """
+    lab_values: Dict[str, Any] = {}
+    summaries: List[str] = []
+    abnormalities: List[str] = []
+    scores: List[float] = []
+    for analysis in analyses:
+        for test_name, value in (analysis.get("lab_values") or {}).items():
+            name, repeat = test_name, 1
+            while name in lab_values and lab_values[name] != value:
+                repeat += 1
+                name = f"{test_name} ({repeat})"
+            lab_values.setdefault(name, value)
+        if analysis.get("summary"):
+            summaries.append(str(analysis["summary"]).strip())
+        for abnormality in analysis.get("key_abnormalities") or []:
+            if abnormality not in abnormalities:
+                abnormalities.append(abnormality)
+        if isinstance(analysis.get("confidence_score"), (int, float)):
+            scores.append(analysis["confidence_score"])
+
+    return {
+        "lab_values": lab_values,
+        "summary": " ".join(summaries),
+        "key_abnormalities": abnormalities,
+        "confidence_score": min(scores) if scores else None,
+    }
+
+# "staged": summary -> SOAP note -> diagnosis, one LLM call each
+# "fast": all three from one call, falling back to the staged path if the response doesn't validate
+ANALYSIS_MODES = ("staged", "fast")
+
 class MedicalInsightsAgent(BaseAgent):
     
-    def __init__(self, model_name: str = "llama-3.3-70b-versatile", temperature: float = 0.2):
+    def __init__(self, model_name: str = "llama-3.3-70b-versatile", temperature: float = 0.2, lab_fanout: int = LAB_ANALYSIS_FANOUT, lab_chunk_max_tokens: int = LAB_CHUNK_MAX_TOKENS, mode: str = ANALYSIS_MODE, node_cache: Optional[NodeResultCache] = None, checkpointer: Optional[SQLiteCheckpointSaver] = None):
+        if mode not in ANALYSIS_MODES:
+            raise ValueError(f"Unknown analysis mode {mode!r}, expected one of {ANALYSIS_MODES}")
         self.llm_manager = LLMManager(model_name=model_name, temperature=temperature)
-        self.supabase = SupabaseCaseClient()
+        self.lab_fanout = lab_fanout
+        self.lab_chunk_max_tokens = lab_chunk_max_tokens
+        self.mode = mode
+        self.supabase = get_supabase_client()
+        self.events = get_event_bus()
+        self.node_cache = node_cache or get_node_cache()
+        self.checkpointer = checkpointer or get_checkpointer()
         self.workflow = self.build_workflow()
 
     def build_workflow(self) -> StateGraph:
@@ -35,63 +121,166 @@ class MedicalInsightsAgent(BaseAgent):
         # Add processing nodes
         builder.add_node("process_lab_documents", self._process_lab_documents)
         builder.add_node("process_radiology_documents", self._process_radiology_documents)
-        builder.add_node("generate_case_summary", self._generate_case_summary)
-        builder.add_node("generate_soap_note", self._generate_soap_note)
-        builder.add_node("generate_diagnosis", self._generate_diagnosis)
-        # builder.add_node("generate_differential_diagnosis", self._generate_differential_diagnosis)
-        # builder.add_node("generate_recommendations", self._generate_recommendations)
+        # LLM nodes reuse their previous output for the case while their inputs are unchanged
+        builder.add_node("generate_case_summary", self._reusable(
+            "generate_case_summary", self._generate_case_summary, CASE_SUMMARY_PROMPT, self._case_context))
+        builder.add_node("generate_soap_note", self._reusable(
+            "generate_soap_note", self._generate_soap_note, SOAP_NOTE_PROMPT,
+            lambda state: _dump(state["case_summary"])))
+        builder.add_node("generate_diagnosis", self._reusable(
+            "generate_diagnosis", self._generate_diagnosis, DIAGNOSIS_PROMPT,
+            lambda state: _dump(state["soap_note"])))
+        builder.add_node("generate_differential_diagnosis", self._reusable(
+            "generate_differential_diagnosis", self._generate_differential_diagnosis, DIFFERENTIAL_DIAGNOSIS_PROMPT,
+            lambda state: [_dump(state["soap_note"]), _dump(state["primary_diagnosis"])]))
+        builder.add_node("generate_recommendations", self._reusable(
+            "generate_recommendations", self._generate_recommendations, RECOMMENDATIONS_PROMPT,
+            lambda state: [_dump(state["soap_note"]), _dump(state["primary_diagnosis"])]))
         builder.add_node("compile_insights", self._compile_insights)
         builder.add_node("save_results", self._save_results)
 
-        # Set up workflow
-        builder.set_entry_point("process_lab_documents")
-        
-        # Parallel processing of documents
-        builder.add_edge("process_lab_documents", "process_radiology_documents")
-        builder.add_edge("process_radiology_documents", "generate_case_summary")
+        # Parallel processing of documents; the summary waits for both branches.
+        # Nodes return only the keys they write, and keys written by parallel
+        # branches have reducers in MedicalAnalysisState.
+        builder.add_edge(START, "process_lab_documents")
+        builder.add_edge(START, "process_radiology_documents")
+        if self.mode == "fast":
+            builder.add_node("generate_fast_analysis", self._reusable(
+                "generate_fast_analysis", self._generate_fast_analysis, FAST_ANALYSIS_PROMPT, self._case_context))
+            builder.add_edge(["process_lab_documents", "process_radiology_documents"], "generate_fast_analysis")
+            builder.add_conditional_edges(
+                "generate_fast_analysis",
+                self._route_after_fast_analysis,
+                ["generate_case_summary", "generate_differential_diagnosis", "generate_recommendations"],
+            )
+        else:
+            builder.add_edge(["process_lab_documents", "process_radiology_documents"], "generate_case_summary")
         
         # Sequential medical analysis
         builder.add_edge("generate_case_summary", "generate_soap_note")
         builder.add_edge("generate_soap_note", "generate_diagnosis")
         
         # Parallel generation of differential diagnosis and recommendations
-        # builder.add_edge("generate_diagnosis", "generate_differential_diagnosis")
-        # builder.add_edge("generate_diagnosis", "generate_recommendations")
-        # builder.add_edge("generate_differential_diagnosis", "compile_insights")
-        # builder.add_edge("generate_recommendations", "compile_insights")
+        builder.add_edge("generate_diagnosis", "generate_differential_diagnosis")
+        builder.add_edge("generate_diagnosis", "generate_recommendations")
+        builder.add_edge(["generate_differential_diagnosis", "generate_recommendations"], "compile_insights")
 
-        builder.add_edge("generate_diagnosis", "compile_insights")
         builder.add_edge("compile_insights", "save_results")
         builder.add_edge("save_results", END)
 
-        return builder.compile()
+        # Checkpointed after every step under thread_id=case_id, see process() and resume()
+        return builder.compile(checkpointer=self.checkpointer)
+
+    def _reusable(self, node: str, run: Callable, prompt: str, inputs: Callable[[MedicalAnalysisState], Any]) -> Callable:
+        """
+        Wrap a node so it returns its stored output for the case when the
+        fingerprint of `inputs(state)`, the prompt, the model and its
+        temperature matches the run that produced it. Outputs with
+        processing errors are not stored.
+        """
+        if self.node_cache is None:
+            return run
+
+        async def reusable_node(state: MedicalAnalysisState) -> Dict[str, Any]:
+            case_id = state["case_input"].case_id
+            input_fingerprint = fingerprint(self.llm_manager.model_name, self.llm_manager.temperature, prompt, inputs(state))
+            stored = await self.node_cache.get(case_id, node, input_fingerprint)
+            if stored is not None:
+                logger.info(f"Inputs of {node} unchanged for case {case_id}, reusing its output")
+                return {**{key: _restore(key, value) for key, value in stored.items()}, "reused_nodes": [node]}
+
+            update = await run(state)
+            if not update.get("processing_errors"):
+                await self.node_cache.set(case_id, node, input_fingerprint, {key: _dump(value) for key, value in update.items()})
+            return update
+
+        return reusable_node
+
+    async def _analyze_lab_chunk(self, text: str, semaphore: asyncio.Semaphore) -> Dict[str, Any]:
+        """Analyze one lab document or chunk of it, bounded by the per-case fan-out semaphore"""
+        async with semaphore:
+            lab_analysis = await self.llm_manager.generate_response(system_prompt=LAB_ANALYSIS_PROMPT, user_input=text)
+        if not lab_analysis:
+            raise ValueError("LLM returned no parsable JSON")
+        return lab_analysis
 
+    async def _analyze_lab_file(self, lab_file, semaphore: asyncio.Semaphore) -> LabDocument:
+        """
+        Analyze a single lab file. Files over the token budget are split on
+        page boundaries and the chunks analyzed in parallel, then merged.
+        """
+        pages = split_pages(lab_file.text_data)
+        counts = [count_tokens(page) for page in pages]
+        total_tokens = sum(counts)
+        if total_tokens <= self.lab_chunk_max_tokens:
+            chunks = [lab_file.text_data]
+        else:
+            chunks = chunk_pages(pages, self.lab_chunk_max_tokens, counts)
+        logger.info(f"Lab file {lab_file.file_name}: {len(pages)} page(s), {total_tokens} tokens, {len(chunks)} chunk(s)")
 
+        analyses = await asyncio.gather(*(self._analyze_lab_chunk(chunk, semaphore) for chunk in chunks))
+        lab_analysis = analyses[0] if len(analyses) == 1 else _merge_lab_analyses(analyses)
+        logger.info(f"Lab analysis for {lab_file.file_name}: {lab_analysis}")
 
-    async def _process_lab_documents(self, state: MedicalAnalysisState) -> MedicalAnalysisState:
-        """Process laboratory documents"""
+        return LabDocument(
+            file_id=lab_file.file_id,
+            file_name=lab_file.file_name,
+            extracted_text=lab_file.text_data,
+            lab_values=lab_analysis.get("lab_values"),
+            summary=lab_analysis.get("summary")
+        )
+
+    async def _lab_document(self, case_id: str, lab_file, semaphore: asyncio.Semaphore) -> Tuple[LabDocument, bool]:
+        """Analysis of one lab file, reused from the node cache while its text is unchanged"""
+        if self.node_cache is None:
+            return await self._analyze_lab_file(lab_file, semaphore), False
+
+        node = f"lab_file:{lab_file.file_id}"
+        input_fingerprint = fingerprint(
+            self.llm_manager.model_name, self.llm_manager.temperature, LAB_ANALYSIS_PROMPT,
+            self.lab_chunk_max_tokens, lab_file.text_data,
+        )
+        stored = await self.node_cache.get(case_id, node, input_fingerprint)
+        if stored is not None:
+            return LabDocument.model_validate(stored), True
+
+        lab_doc = await self._analyze_lab_file(lab_file, semaphore)
+        await self.node_cache.set(case_id, node, input_fingerprint, lab_doc.model_dump(mode="json"))
+        return lab_doc, False
+
+    async def _process_lab_documents(self, state: MedicalAnalysisState) -> Dict[str, Any]:
+        """Process laboratory documents concurrently, keeping document order"""
         logger.info("Processing laboratory documents...")
+        case_id = state["case_input"].case_id
+        lab_files = [lab_file for lab_file in state["case_input"].lab_files if lab_file.text_data]
+        semaphore = asyncio.Semaphore(max(1, self.lab_fanout))
+
+        results = await asyncio.gather(
+            *(self._lab_document(case_id, lab_file, semaphore) for lab_file in lab_files),
+            return_exceptions=True
+        )
+
         processed_docs = []
-        
-        for lab_file in state["case_input"].lab_files:
-            if lab_file.text_data:
-                lab_analysis = await self.llm_manager.generate_response(system_prompt=LAB_ANALYSIS_PROMPT, user_input=lab_file.text_data)
-                logger.info(f"Lab analysis for {lab_file.file_name}: {lab_analysis}")
-                
-                lab_doc = LabDocument(
-                    file_id=lab_file.file_id,
-                    file_name=lab_file.file_name,
-                    extracted_text=lab_file.text_data,
-                    lab_values=lab_analysis.get("lab_values"),
-                    summary=lab_analysis.get("summary")
-                )
-                processed_docs.append(lab_doc)
-        
-        state["processed_lab_docs"] = processed_docs
-        state["processing_stage"] = "lab_documents_processed"
-        return state
+        reused = []
+        errors = []
+        for lab_file, result in zip(lab_files, results):
+            if isinstance(result, Exception):
+                logger.error(f"Error analyzing lab file {lab_file.file_name}: {result}")
+                errors.append(f"Error analyzing lab file {lab_file.file_name}: {str(result)}")
+                continue
+            lab_doc, was_reused = result
+            processed_docs.append(lab_doc)
+            if was_reused:
+                reused.append(f"lab_file:{lab_file.file_id}")
+        
+        return {
+            "processed_lab_docs": processed_docs,
+            "processing_errors": errors,
+            "reused_nodes": reused,
+            "processing_stage": "lab_documents_processed",
+        }
 
-    async def _process_radiology_documents(self, state: MedicalAnalysisState) -> MedicalAnalysisState:
+    async def _process_radiology_documents(self, state: MedicalAnalysisState) -> Dict[str, Any]:
         """Process radiology documents"""
         logger.info("Processing radiology documents...")
         processed_docs = []
@@ -114,23 +303,80 @@ class MedicalInsightsAgent(BaseAgent):
                 logger.info(f"Radiology document processed: {radiology_doc.file_name}, data: {radiology_doc}")
                 processed_docs.append(radiology_doc)
         
-        state["processed_radiology_docs"] = processed_docs
-        state["processing_stage"] = "radiology_documents_processed"
-        return state
+        return {
+            "processed_radiology_docs": processed_docs,
+            "processing_stage": "radiology_documents_processed",
+        }
 
-    async def _generate_case_summary(self, state: MedicalAnalysisState) -> MedicalAnalysisState:
-        """Generate comprehensive case summary"""
-        logger.info("Generating case summary...")
-        
+    @staticmethod
+    def _case_context(state: MedicalAnalysisState) -> Dict[str, str]:
+        """Prompt variables describing the patient and processed documents"""
         patient_data = state["case_input"].patient_data
         patient_info_str = f"Name: {patient_data.name}, Age: {patient_data.age}, Gender: {patient_data.gender}"
         
-        case_context = {
+        return {
             "patient_info": patient_info_str,
             "doctor_notes": state["case_input"].doctor_case_summary or "None provided",
             "lab_summaries": "; ".join([doc.summary for doc in state["processed_lab_docs"] if doc.summary]) or "No lab data available",
             "radiology_summaries": "; ".join([doc.summary for doc in state["processed_radiology_docs"] if doc.summary]) or "No radiology data available"
         }
+
+    async def _generate_fast_analysis(self, state: MedicalAnalysisState) -> Dict[str, Any]:
+        """Generate case summary, SOAP note and diagnosis from a single LLM call"""
+        logger.info("Generating case summary, SOAP note and diagnosis in one call...")
+
+        try:
+            response = await self.llm_manager.generate_response(
+                system_prompt=FAST_ANALYSIS_PROMPT,
+                user_input='',
+                prompt_variables=self._case_context(state),
+                json_mode=True
+            )
+            summary = response["case_summary"]
+            diagnosis = response["diagnosis"]
+            case_summary = CaseSummary(
+                comprehensive_summary=summary["comprehensive_summary"],
+                key_findings=summary["key_findings"],
+                patient_context=state["case_input"].patient_data,
+                doctor_notes=state["case_input"].doctor_case_summary,
+                lab_summary="; ".join([doc.summary for doc in state["processed_lab_docs"] if doc.summary]),
+                radiology_summary="; ".join([doc.summary for doc in state["processed_radiology_docs"] if doc.summary]),
+                confidence_score=summary["confidence_score"]
+            )
+            soap_note = SOAPNote.model_validate(response["soap_note"])
+            primary_diagnosis = Diagnosis(
+                primary_diagnosis=diagnosis["diagnosis"],
+                icd_code=diagnosis.get("icd_code"),
+                description=diagnosis["description"],
+                confidence_score=diagnosis["confidence_score"],
+                supporting_evidence=diagnosis["supporting_evidence"]
+            )
+        except (KeyError, TypeError, ValidationError) as e:
+            logger.warning(f"Fast analysis response did not validate, falling back to staged analysis: {e}")
+            # Recorded as an error so the fallback is visible and never stored as the node's reusable output
+            return {
+                "processing_stage": "fast_analysis_fallback",
+                "processing_errors": [f"Fast analysis response did not validate: {e}"],
+            }
+
+        return {
+            "case_summary": case_summary,
+            "soap_note": soap_note,
+            "primary_diagnosis": primary_diagnosis,
+            "processing_stage": "fast_analysis_generated",
+        }
+
+    @staticmethod
+    def _route_after_fast_analysis(state: MedicalAnalysisState):
+        if state.get("primary_diagnosis") is None:
+            return "generate_case_summary"
+        return ["generate_differential_diagnosis", "generate_recommendations"]
+
+    async def _generate_case_summary(self, state: MedicalAnalysisState) -> Dict[str, Any]:
+        """Generate comprehensive case summary"""
+        logger.info("Generating case summary...")
+        
+        case_context = self._case_context(state)
         
         summary_response = await self.llm_manager.generate_response(
             system_prompt=CASE_SUMMARY_PROMPT, 
@@ -157,17 +403,32 @@ class MedicalInsightsAgent(BaseAgent):
 
         logger.info(f"Case summary created in STATE: {case_summary}")
         
-        state["case_summary"] = case_summary
-        state["processing_stage"] = "case_summary_generated"
-        return state
+        return {"case_summary": case_summary, "processing_stage": "case_summary_generated"}
+
+    def _partial_publisher(self, case_id: str, section: str):
+        """on_partial callback forwarding a streaming section as throttled "partial" events"""
+        if not LLM_STREAM_PARTIALS:
+            return None
+        last_sent = 0.0
+
+        async def publish(partial: Dict[str, Any]) -> None:
+            nonlocal last_sent
+            now = time.monotonic()
+            if now - last_sent < LLM_STREAM_PARTIAL_INTERVAL:
+                return
+            last_sent = now
+            await self.events.publish(case_id, "partial", {"section": section, "content": partial})
+
+        return publish
 
-    async def _generate_soap_note(self, state: MedicalAnalysisState) -> MedicalAnalysisState:
+    async def _generate_soap_note(self, state: MedicalAnalysisState) -> Dict[str, Any]:
         """Generate SOAP note"""
         logger.info("Generating SOAP note...")
 
         soap_response = await self.llm_manager.generate_response(
                         system_prompt=SOAP_NOTE_PROMPT, 
-                        user_input="Case Summary" + state["case_summary"].model_dump_json())
+                        user_input="Case Summary" + state["case_summary"].model_dump_json(),
+                        on_partial=self._partial_publisher(state["case_input"].case_id, "soap_note"))
         
         logger.info(f"SOAP response from LLM: {soap_response}")
         
@@ -179,17 +440,16 @@ class MedicalInsightsAgent(BaseAgent):
             confidence_score=soap_response.get("confidence_score", 0.8)
         )
         
-        state["soap_note"] = soap_note
-        state["processing_stage"] = "soap_note_generated"
-        return state
+        return {"soap_note": soap_note, "processing_stage": "soap_note_generated"}
 
-    async def _generate_diagnosis(self, state: MedicalAnalysisState) -> MedicalAnalysisState:
+    async def _generate_diagnosis(self, state: MedicalAnalysisState) -> Dict[str, Any]:
         """Generate primary diagnosis"""
         logger.info("Generating primary diagnosis...")
         
         diagnosis_response = await self.llm_manager.generate_response(
                         system_prompt=DIAGNOSIS_PROMPT, 
-                        user_input= "SOAP Note: " + state["soap_note"].model_dump_json()
+                        user_input= "SOAP Note: " + state["soap_note"].model_dump_json(),
+                        on_partial=self._partial_publisher(state["case_input"].case_id, "primary_diagnosis")
                         )
         
         logger.info(f"Diagnosis response from LLM: {diagnosis_response}")
@@ -202,62 +462,104 @@ class MedicalInsightsAgent(BaseAgent):
             supporting_evidence=diagnosis_response.get("supporting_evidence", [])
         )
         
-        state["primary_diagnosis"] = diagnosis
-        state["processing_stage"] = "diagnosis_generated"
-        return state
+        return {"primary_diagnosis": diagnosis, "processing_stage": "diagnosis_generated"}
 
 
-    # async def _generate_differential_diagnosis(self, state: MedicalAnalysisState) -> MedicalAnalysisState:
-    #     """Generate differential diagnoses"""
-    #     logger.info("Generating differential diagnoses...")
+    async def _generate_differential_diagnosis(self, state: MedicalAnalysisState) -> Dict[str, Any]:
+        """Generate differential diagnoses"""
+        logger.info("Generating differential diagnoses...")
         
-    #     diff_diagnosis_response = await self._generate_differential_with_llm(state["soap_note"], state["primary_diagnosis"])
-        
-    #     differential_diagnoses = []
-    #     for diff_diag in diff_diagnosis_response["differential_diagnoses"]:
-    #         differential_diagnoses.append(DifferentialDiagnosis(
-    #             condition=diff_diag["condition"],
-    #             probability=diff_diag["probability"],
-    #             reasoning=diff_diag["reasoning"],
-    #             distinguishing_factors=diff_diag["distinguishing_factors"]
-    #         ))
-        
-    #     state["differential_diagnoses"] = differential_diagnoses
-    #     return state
+        try:
+            diff_diagnosis_response = await self.llm_manager.generate_response(
+                system_prompt=DIFFERENTIAL_DIAGNOSIS_PROMPT,
+                user_input='',
+                prompt_variables={
+                    "soap_note": state["soap_note"].model_dump_json(),
+                    "primary_diagnosis": state["primary_diagnosis"].model_dump_json(),
+                }
+            )
+        except Exception as e:
+            logger.error(f"Error generating differential diagnoses: {e}")
+            return {"processing_errors": [f"Error generating differential diagnoses: {str(e)}"]}
 
-    # async def _generate_recommendations(self, state: MedicalAnalysisState) -> MedicalAnalysisState:
-    #     """Generate investigation and treatment recommendations"""
-    #     logger.info("Generating recommendations...")
-        
-    #     recommendations_response = await self._generate_recommendations_with_llm(state["soap_note"], state["primary_diagnosis"])
-        
-    #     # Process investigations
-    #     investigations = []
-    #     for inv in recommendations_response["investigations"]:
-    #         investigations.append(InvestigationRecommendation(
-    #             investigation_type=inv["type"],
-    #             urgency=inv["urgency"],
-    #             rationale=inv["rationale"],
-    #             expected_findings=inv.get("expected_findings")
-    #         ))
-        
-    #     # Process treatments
-    #     treatments = []
-    #     for treat in recommendations_response["treatments"]:
-    #         treatments.append(TreatmentRecommendation(
-    #             treatment_type=treat["type"],
-    #             description=treat["description"],
-    #             dosage=treat.get("dosage"),
-    #             duration=treat.get("duration"),
-    #             precautions=treat.get("precautions")
-    #         ))
+        logger.info(f"Differential diagnosis response from LLM: {diff_diagnosis_response}")
+
+        differential_diagnoses = []
+        errors = []
+        for diff_diag in (diff_diagnosis_response or {}).get("differential_diagnoses", []):
+            try:
+                differential_diagnoses.append(DifferentialDiagnosis(
+                    condition=diff_diag["condition"],
+                    probability=diff_diag["probability"],
+                    reasoning=diff_diag["reasoning"],
+                    distinguishing_factors=diff_diag.get("distinguishing_factors", [])
+                ))
+            except (KeyError, TypeError, ValidationError) as e:
+                errors.append(f"Skipped invalid differential diagnosis: {str(e)}")
+        
+        return {
+            "differential_diagnoses": differential_diagnoses,
+            "processing_errors": errors,
+            "processing_stage": "differential_diagnosis_generated",
+        }
+
+    async def _generate_recommendations(self, state: MedicalAnalysisState) -> Dict[str, Any]:
+        """Generate investigation and treatment recommendations"""
+        logger.info("Generating recommendations...")
         
-    #     state["investigation_recommendations"] = investigations
-    #     state["treatment_recommendations"] = treatments
-    #     return state
+        try:
+            recommendations_response = await self.llm_manager.generate_response(
+                system_prompt=RECOMMENDATIONS_PROMPT,
+                user_input='',
+                prompt_variables={
+                    "soap_note": state["soap_note"].model_dump_json(),
+                    "diagnosis": state["primary_diagnosis"].model_dump_json(),
+                }
+            )
+        except Exception as e:
+            logger.error(f"Error generating recommendations: {e}")
+            return {"processing_errors": [f"Error generating recommendations: {str(e)}"]}
+
+        logger.info(f"Recommendations response from LLM: {recommendations_response}")
+        recommendations_response = recommendations_response or {}
+        errors = []
+        
+        # Process investigations
+        investigations = []
+        for inv in recommendations_response.get("investigations", []):
+            try:
+                investigations.append(InvestigationRecommendation(
+                    investigation_type=inv["type"],
+                    urgency=str(inv["urgency"]).lower(),
+                    rationale=inv["rationale"],
+                    expected_findings=inv.get("expected_findings")
+                ))
+            except (KeyError, TypeError, ValidationError) as e:
+                errors.append(f"Skipped invalid investigation recommendation: {str(e)}")
+        
+        # Process treatments
+        treatments = []
+        for treat in recommendations_response.get("treatments", []):
+            try:
+                treatments.append(TreatmentRecommendation(
+                    treatment_type=treat["type"],
+                    description=treat["description"],
+                    dosage=treat.get("dosage"),
+                    duration=treat.get("duration"),
+                    precautions=treat.get("precautions")
+                ))
+            except (KeyError, TypeError, ValidationError) as e:
+                errors.append(f"Skipped invalid treatment recommendation: {str(e)}")
+        
+        return {
+            "investigation_recommendations": investigations,
+            "treatment_recommendations": treatments,
+            "processing_errors": errors,
+            "processing_stage": "recommendations_generated",
+        }
 
 
-    async def _compile_insights(self, state: MedicalAnalysisState) -> MedicalAnalysisState:
+    async def _compile_insights(self, state: MedicalAnalysisState) -> Dict[str, Any]:
         """Compile all insights into final output"""
         logger.info("Compiling medical insights...")
         
@@ -273,19 +575,17 @@ class MedicalInsightsAgent(BaseAgent):
             case_summary=state["case_summary"],
             soap_note=state["soap_note"],
             primary_diagnosis=state["primary_diagnosis"],
-            # differential_diagnoses=state["differential_diagnoses"],
-            # investigation_recommendations=state["investigation_recommendations"],
-            # treatment_recommendations=state["treatment_recommendations"],
+            differential_diagnoses=state["differential_diagnoses"],
+            investigation_recommendations=state["investigation_recommendations"],
+            treatment_recommendations=state["treatment_recommendations"],
             overall_confidence_score=overall_confidence
         )
         logger.info("=="* 30)
         logger.info(f"----------- Compiled medical insights ------------")
         
-        state["medical_insights"] = medical_insights
-        state["processing_stage"] = "insights_compiled"
-        return state
+        return {"medical_insights": medical_insights, "processing_stage": "insights_compiled"}
 
-    async def _save_results(self, state: MedicalAnalysisState) -> MedicalAnalysisState:
+    async def _save_results(self, state: MedicalAnalysisState) -> Dict[str, Any]:
         """Save results to database"""
         logger.info("Saving results to database...")
         
@@ -299,20 +599,41 @@ class MedicalInsightsAgent(BaseAgent):
                 insights=insights_data
             )
             
-            state["processing_stage"] = "completed"
             logger.info(f"Successfully saved medical insights for case {state['case_input'].case_id}")
+            return {"processing_stage": "completed"}
             
         except Exception as e:
+            # Raised so the run fails here and can be resumed from the compiled insights
             logger.error(f"Error saving results: {e}")
-            state["processing_errors"].append(f"Error saving results: {str(e)}")
-            state["processing_stage"] = "error"
-        
-        return state
+            raise
+
+
 
+    @staticmethod
+    def _thread(case_id: str) -> Dict[str, Any]:
+        return {"configurable": {"thread_id": case_id}}
 
+    async def resumable(self, case_id: str) -> bool:
+        """Whether the case has a checkpointed run that did not finish"""
+        if self.checkpointer is None:
+            return False
+        snapshot = await self.workflow.aget_state(self._thread(case_id))
+        return bool(snapshot.next)
 
     async def process(self, case_input: CaseInput) -> MedicalInsights:
-        """Process case through the complete workflow"""
+        """
+        Process case through the complete workflow. An unfinished checkpointed
+        run of the same case input is resumed instead of started over.
+        """
+        case_id = case_input.case_id
+        if self.checkpointer is not None:
+            snapshot = await self.workflow.aget_state(self._thread(case_id))
+            if snapshot.next and snapshot.values.get("case_input") == case_input:
+                logger.info(f"Resuming analysis of case {case_id} at {snapshot.next}")
+                return await self._run(case_id, None)
+            # A finished run, or one for different inputs: start from scratch
+            await self.checkpointer.adelete_thread(case_id)
+
         initial_state = MedicalAnalysisState(
             case_input=case_input,
             processed_lab_docs=[],
@@ -320,14 +641,43 @@ class MedicalInsightsAgent(BaseAgent):
             case_summary=None,
             soap_note=None,
             primary_diagnosis=None,
-            # differential_diagnoses=[],
-            # investigation_recommendations=[],
-            # treatment_recommendations=[],
+            differential_diagnoses=[],
+            investigation_recommendations=[],
+            treatment_recommendations=[],
             medical_insights=None,
             processing_errors=[],
+            reused_nodes=[],
             processing_stage="initialized",
             confidence_scores={}
         )
         
-        final_state = await self.workflow.ainvoke(initial_state)
+        return await self._run(case_id, initial_state)
+
+    async def resume(self, case_id: str) -> MedicalInsights:
+        """Resume the case's failed or interrupted run from its last completed step"""
+        if not await self.resumable(case_id):
+            raise ValueError(f"No unfinished analysis to resume for case {case_id}")
+        return await self._run(case_id, None)
+
+    async def _run(self, case_id: str, graph_input: Optional[MedicalAnalysisState]) -> MedicalInsights:
+        """Stream the workflow from `graph_input` (None resumes the checkpoint), publishing stage events"""
+        final_state = graph_input
+        # "updates" reports each node separately, including parallel branches of one step
+        async for mode, chunk in self.workflow.astream(graph_input, self._thread(case_id), stream_mode=["updates", "values"]):
+            if mode == "values":
+                final_state = chunk
+                continue
+            for node, update in chunk.items():
+                if not update or "processing_stage" not in update:
+                    continue
+                data = {"stage": update["processing_stage"], "node": node, "errors": update.get("processing_errors", [])}
+                if update.get("reused_nodes"):
+                    data["reused"] = update["reused_nodes"]
+                result = {key: _dump(update[key]) for key in STAGE_RESULT_KEYS if update.get(key) is not None}
+                if result:
+                    data["result"] = result
+                await self.events.publish(case_id, "stage", data)
+
+        if self.checkpointer is not None:
+            await self.checkpointer.adelete_thread(case_id)
         return final_state["medical_insights"]
@@ -1,31 +1,154 @@
-from groq import Groq
+from groq import AsyncGroq
+import httpx
+import hashlib
+import json
+import time
+from typing import Any, Dict, Optional
 from dotenv import load_dotenv
 load_dotenv()
 # from core.config import GROQ_API_KEY
 import logging
 import asyncio
-from supabase_client.supabase_client import SupabaseCaseClient
+from supabase_client.supabase_client import get_supabase_client
 import os 
 from utils.medical_prompts import RADIOLOGY_ANALYSIS_PROMPT
 from utils.extractjson import extract_json_from_string
-from config import GROQ_API_KEY
+from config import (
+    GROQ_API_KEY, VISION_PREPROCESS_ENABLED, VISION_IMAGE_MAX_SIDE, VISION_IMAGE_FORMAT,
+    VISION_IMAGE_QUALITY, VISION_IMAGE_CACHE_PATH, VISION_IMAGE_CACHE_MAX_BYTES
+)
+from utils.rate_limiter import get_vision_limiter
+from utils.retry import retrying
+from utils.image_cache import image_cache, perceptual_hash
+from utils.image_preprocess import preprocess_image, data_url
+from utils.disk_cache import SQLiteCache
+from utils.events import get_event_bus
 
 logger = logging.getLogger(__name__)
 
-client = Groq(api_key=GROQ_API_KEY)
-supabase = SupabaseCaseClient()
+# Retries are ours (see utils/retry.py); responses update the vision limiter's view of the rate limits
+client = AsyncGroq(api_key=GROQ_API_KEY, max_retries=0, http_client=get_vision_limiter().http_client())
+supabase = get_supabase_client()
+events = get_event_bus()
 
+VISION_MODEL = "meta-llama/llama-4-scout-17b-16e-instruct"
+# Cached findings are only reused for the same model and prompt text
+PROMPT_VERSION = hashlib.sha256((VISION_MODEL + RADIOLOGY_ANALYSIS_PROMPT).encode("utf-8")).hexdigest()[:12]
 
-async def image_extraction(image_url: str):
+
+# Groq rejects base64 images over 4 MB; larger ones are sent by URL
+MAX_INLINE_IMAGE_BYTES = 4 * 1024 * 1024
+# Preprocessing settings that change the bytes sent; they are part of the cache key
+PREPROCESS_VERSION = f"{VISION_IMAGE_MAX_SIDE}:{VISION_IMAGE_FORMAT}:{VISION_IMAGE_QUALITY}"
+
+preprocess_cache: Optional[SQLiteCache] = (
+    SQLiteCache(VISION_IMAGE_CACHE_PATH, max_bytes=VISION_IMAGE_CACHE_MAX_BYTES) if VISION_PREPROCESS_ENABLED else None
+)
+
+
+async def fetch_image(image_url: str) -> bytes:
+    async with httpx.AsyncClient(timeout=30) as http:
+        response = await http.get(image_url)
+        response.raise_for_status()
+    return response.content
+
+
+async def prepare_image(image_url: str, file_id: Optional[str] = None) -> Dict[str, Any]:
     """
-    Vision agent for a image.
+    Download an image once, then hash it and preprocess it off the event loop.
+
+    Returns the URL to send (an inline data URL of the downscaled,
+    re-encoded image, or the original URL if preprocessing is off or
+    fails), its perceptual hash (None if unavailable) and the original
+    and sent sizes. Results are cached per file_id.
+    """
+    cache_key = f"{file_id}:{PREPROCESS_VERSION}" if file_id and preprocess_cache is not None else None
+    if cache_key is not None:
+        try:
+            cached = await preprocess_cache.get(cache_key)
+            if cached is not None:
+                return {**json.loads(cached), "cached": True}
+        except Exception as e:
+            logger.warning(f"Vision image cache lookup failed for {file_id}: {e}")
+
+    prepared = {"url": image_url, "phash": None, "original_bytes": None, "sent_bytes": None, "preprocess_ms": None}
+    if not VISION_PREPROCESS_ENABLED and image_cache is None:
+        return prepared
+    try:
+        image_bytes = await fetch_image(image_url)
+    except Exception as e:
+        logger.warning(f"Could not download image {image_url}: {str(e)}")
+        return prepared
+    prepared["original_bytes"] = len(image_bytes)
+
+    if image_cache is not None:
+        try:
+            prepared["phash"] = await asyncio.to_thread(perceptual_hash, image_bytes)
+        except Exception as e:
+            logger.warning(f"Could not hash image {image_url}: {str(e)}")
+
+    if VISION_PREPROCESS_ENABLED:
+        try:
+            start = time.perf_counter()
+            processed, mime = await asyncio.to_thread(
+                preprocess_image, image_bytes, VISION_IMAGE_MAX_SIDE, VISION_IMAGE_FORMAT, VISION_IMAGE_QUALITY
+            )
+            prepared["preprocess_ms"] = round((time.perf_counter() - start) * 1000, 1)
+            inline_url = data_url(processed, mime)
+            if len(inline_url) <= MAX_INLINE_IMAGE_BYTES:
+                prepared.update(url=inline_url, sent_bytes=len(processed))
+        except Exception as e:
+            logger.warning(f"Could not preprocess image {image_url}, sending its URL: {str(e)}")
+
+    if cache_key is not None and prepared["sent_bytes"] is not None:
+        try:
+            await preprocess_cache.set(cache_key, json.dumps(prepared))
+        except Exception as e:
+            logger.warning(f"Vision image cache store failed for {file_id}: {e}")
+    return prepared
+
+
+async def image_extraction(image_url: str, file_id: Optional[str] = None, case_id: Optional[str] = None):
+    """
+    Vision agent for a image. Findings are only reused from images of the
+    same case (`case_id`); without one the cache is skipped.
     """
 
     logger.info(f"Starting vision agent for image ------ {image_url}")
     print(f"Starting vision agent for image ------ {image_url}")
 
-    completion = client.chat.completions.create(
-        model="meta-llama/llama-4-scout-17b-16e-instruct",
+    image = await prepare_image(image_url, file_id)
+    phash = image["phash"] if case_id else None
+    if image_cache is not None and phash is not None:
+        cached = await image_cache.get(phash, PROMPT_VERSION, case_id)
+        if cached is not None:
+            logger.info(f"Reusing cached analysis for image ------ {image_url}")
+            return cached
+
+    start = time.perf_counter()
+    async for attempt in retrying("Groq vision", get_vision_limiter()):
+        with attempt:
+            async with get_vision_limiter():
+                completion = await _create_completion(image["url"])
+    if image["sent_bytes"] is not None:
+        logger.info(
+            f"Vision call for {file_id or image_url}: sent {image['sent_bytes']} bytes inline "
+            f"(original {image['original_bytes']} bytes, preprocessing {image['preprocess_ms']} ms"
+            f"{', cached' if image.get('cached') else ''}), call {time.perf_counter() - start:.2f}s"
+        )
+    else:
+        logger.info(f"Vision call for {file_id or image_url}: sent by URL, call {time.perf_counter() - start:.2f}s")
+
+    res = extract_json_from_string(completion.choices[0].message.content)
+
+    if image_cache is not None and phash is not None:
+        await image_cache.set(phash, PROMPT_VERSION, case_id, res)
+    return res
+
+
+async def _create_completion(image_url: str):
+    return await client.chat.completions.create(
+        model=VISION_MODEL,
         messages=[
             {
                 "role": "user",
@@ -50,13 +173,27 @@ async def image_extraction(image_url: str):
         stop=None,
     )
 
-    res = extract_json_from_string(completion.choices[0].message.content)
-    return res
+
+async def _analyze_radiology_file(case_id: str, file_record: dict):
+    """Analyze one radiology file and report its completion on the event bus"""
+    status = {"file_id": file_record.get("file_id"), "file_name": file_record.get("file_name"), "file_category": "radiology"}
+    try:
+        ai_summary = await image_extraction(file_record.get("file_url"), file_record.get("file_id"), case_id)
+    except Exception as e:
+        await events.publish(case_id, "file", {**status, "status": "error", "error": str(e)})
+        raise
+    await events.publish(case_id, "file", {**status, "status": "success"})
+    return ai_summary
 
 
 async def vision_agent(case_id: str):
     """
     Vision agent for a image.
+
+    Radiology images of the case without an ai_summary are analyzed
+    concurrently (bounded by the shared vision limiter) and their ai_summary
+    values are written back in a single batch. Images analyzed by an earlier
+    run of the case keep their stored analysis.
     
     Args:
         case_id: Case ID for which to process images
@@ -65,26 +202,32 @@ async def vision_agent(case_id: str):
     logger.info(f"Starting vision agent for case ------ {case_id}")
 
     results = await supabase.get_case_files(case_id=case_id)
-    # print(f"Results: {results}")
-    mapping = {}
-    
-    for result in results:
+    radiology_files = [
+        result for result in results
+        if result.get("file_category") == "radiology" and not result.get("ai_summary")
+    ]
+    if not radiology_files:
+        logger.info(f"All radiology files of case {case_id} already analyzed")
+        return True
+
+    summaries = await asyncio.gather(
+        *(_analyze_radiology_file(case_id, result) for result in radiology_files),
+        return_exceptions=True
+    )
+
+    updated_records = []
+    for result, ai_summary in zip(radiology_files, summaries):
         file_id = result.get("file_id")
-        file_url = result.get("file_url")
-        file_category = result.get("file_category")
-
-        if file_category == "radiology":
-            ai_summary = await image_extraction(file_url)
-            logger.info(f"AI Summary for file_id {file_id}: {ai_summary}")
-            mapping[file_id] = ai_summary
-            try:
-                await supabase.update_case_file_metadata(
-                    file_id=file_id, 
-                    metadata={"ai_summary": ai_summary}
-                )
-                logger.info(f"Updated ai_summary for file_id: {file_id}")
-            except Exception as e:
-                logger.error(f"Failed to update ai_summary for file_id {file_id}: {str(e)}")    
+        if isinstance(ai_summary, Exception):
+            logger.error(f"Failed to analyze image for file_id {file_id}: {str(ai_summary)}")
+            continue
+        logger.info(f"AI Summary for file_id {file_id}: {ai_summary}")
+        updated_records.append({**result, "ai_summary": ai_summary})
+
+    try:
+        await supabase.upsert_case_files(updated_records)
+        logger.info(f"Updated ai_summary for {len(updated_records)} files in case {case_id}")
+    except Exception as e:
+        logger.error(f"Failed to update ai_summary for case {case_id}: {str(e)}")
     
     return True
-
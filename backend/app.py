@@ -1,10 +1,54 @@
+from contextlib import asynccontextmanager
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.formparsers import MultiPartParser
 import uvicorn
 
 from routes.case import router as case_router
+from parsers.parse import parse_cache, shutdown_local_pool
+from utils.llm_cache import get_llm_cache
+from utils.image_cache import image_cache
+from agents.vision_agent import preprocess_cache as vision_image_cache
+from utils.node_cache import get_node_cache
+from supabase_client.read_cache import get_read_cache
+from jobs.queue import get_job_queue
+from utils.events import get_event_bus
+from utils.checkpoints import get_checkpointer
+from supabase_client.supabase_client import get_supabase_client, close_supabase_client
+from config import EMBEDDED_WORKERS, UPLOAD_SPOOL_MAX_MEMORY
 
-app = FastAPI(title="MedMitra Backend", description="Backend API for MedMitra medical case management", version="1.0.0")
+# In-memory ceiling of each uploaded file before it is spooled to a temp file
+MultiPartParser.spool_max_size = UPLOAD_SPOOL_MAX_MEMORY
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One shared, pooled Supabase client per process
+    get_supabase_client()
+
+    # Analysis normally runs in separate `python worker.py` processes;
+    # EMBEDDED_WORKERS > 0 also runs some inside the API process.
+    stop_workers = asyncio.Event()
+    workers = None
+    if EMBEDDED_WORKERS > 0:
+        from worker import run_workers
+        workers = asyncio.create_task(run_workers(EMBEDDED_WORKERS, stop=stop_workers))
+
+    yield
+
+    stop_workers.set()
+    if workers is not None:
+        await workers
+    await get_job_queue().close()
+    await get_event_bus().close()
+    if get_checkpointer() is not None:
+        await get_checkpointer().close()
+    await close_supabase_client()
+    shutdown_local_pool()
+
+
+app = FastAPI(title="MedMitra Backend", description="Backend API for MedMitra medical case management", version="1.0.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -21,5 +65,24 @@ def read_root():
     return {"message": "MedMitra Backend API is running!"}
 
 
+@app.get("/cache/stats")
+async def cache_stats():
+    """Hit rate, stored bytes and eviction counts for the local caches."""
+    return {
+        "parse_cache": await parse_cache.stats() if parse_cache else None,
+        "llm_cache": await get_llm_cache().stats() if get_llm_cache() else None,
+        "image_cache": image_cache.stats() if image_cache else None,
+        "supabase_cache": await get_read_cache().stats() if get_read_cache() else None,
+        "node_cache": await get_node_cache().stats() if get_node_cache() else None,
+        "vision_image_cache": await vision_image_cache.stats() if vision_image_cache else None,
+    }
+
+
+@app.get("/jobs/stats")
+async def job_stats():
+    """Number of analysis jobs per status."""
+    return await get_job_queue().stats()
+
+
 if __name__ == "__main__":
     uvicorn.run("app:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
@@ -0,0 +1,187 @@
+"""
+Staged vs fast analysis mode benchmark for MedicalInsightsAgent.
+
+Runs the whole workflow for one case (two lab documents, one radiology
+summary) against a stub chat model that charges a fixed round trip plus a
+per-token cost for input (prefill) and output (decode), and returns canned
+responses of realistic size. Tokens are approximated as words and
+punctuation marks.
+
+    staged:   summary -> SOAP note -> diagnosis, each re-sending the previous output
+    fast:     one call returning all three
+    fallback: fast mode whose response fails validation, then the staged path
+
+Run from the backend directory:
+
+    python -m benchmarks.analysis_modes
+"""
+import asyncio
+import json
+import os
+import re
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("GROQ_API_KEY", "benchmark")
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "benchmark")
+os.environ.setdefault("EVENTS_BACKEND", "memory")
+os.environ.setdefault("LLM_CACHE_ENABLED", "false")
+# Every run uses the same case_id; stored node outputs or checkpoints would skip the calls being measured
+os.environ.setdefault("NODE_CACHE_ENABLED", "false")
+os.environ.setdefault("CHECKPOINT_ENABLED", "false")
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from agents.medical_ai_agent import MedicalInsightsAgent
+from models.data_models import CaseInput, PatientData, ProcessedFile
+from utils.rate_limiter import AsyncRateLimiter
+
+ROUND_TRIP = 0.25
+PREFILL_PER_TOKEN = 0.00005
+DECODE_PER_TOKEN = 0.004
+
+SUMMARY = {
+    "comprehensive_summary": "58-year-old male with two weeks of progressive exertional dyspnoea, fatigue and pallor. "
+    "Labs show microcytic anaemia (Hb 8.9 g/dL, MCV 71 fL) with low ferritin and raised RDW; renal and liver "
+    "function are preserved. Chest radiograph shows no consolidation or effusion and a normal cardiac silhouette. "
+    "The picture is most consistent with iron deficiency anaemia, warranting evaluation for occult GI blood loss.",
+    "key_findings": ["Hb 8.9 g/dL", "MCV 71 fL", "Ferritin 6 ng/mL", "Normal chest radiograph", "Exertional dyspnoea"],
+    "confidence_score": 0.82,
+}
+SOAP = {
+    "subjective": "Two weeks of progressive breathlessness on exertion, fatigue and reduced exercise tolerance. "
+    "Denies chest pain, haematemesis or melaena. No known chronic illness; takes occasional NSAIDs for back pain.",
+    "objective": "Pallor. HR 98, BP 128/76, SpO2 97% on air. Hb 8.9 g/dL, MCV 71 fL, ferritin 6 ng/mL, RDW 17.8%. "
+    "Creatinine and LFTs within normal limits. Chest radiograph without acute findings.",
+    "assessment": "Microcytic anaemia with iron deficiency, likely from chronic GI blood loss given NSAID use and age. "
+    "No evidence of cardiopulmonary cause of dyspnoea on imaging.",
+    "plan": "Stop NSAIDs. Start oral iron or IV iron if intolerant. Refer for upper and lower endoscopy. "
+    "Faecal immunochemical test, coeliac serology. Repeat CBC in 4 weeks.",
+    "confidence_score": 0.8,
+}
+DIAGNOSIS = {
+    "diagnosis": "Iron deficiency anaemia",
+    "icd_code": "D50.9",
+    "description": "Microcytic hypochromic anaemia due to depleted iron stores, probably secondary to chronic "
+    "gastrointestinal blood loss in the setting of NSAID use.",
+    "supporting_evidence": ["Hb 8.9 g/dL", "MCV 71 fL", "Ferritin 6 ng/mL", "Raised RDW", "NSAID use"],
+    "confidence_score": 0.78,
+}
+DIFFERENTIAL = {"differential_diagnoses": [
+    {"condition": "Anaemia of chronic disease", "probability": 0.1, "reasoning": "Ferritin is low, not raised",
+     "distinguishing_factors": ["Ferritin", "CRP"]},
+    {"condition": "Thalassaemia trait", "probability": 0.08, "reasoning": "Microcytosis with raised RDW argues against",
+     "distinguishing_factors": ["Mentzer index", "Hb electrophoresis"]},
+]}
+RECOMMENDATIONS = {
+    "investigations": [{"type": "Upper and lower endoscopy", "urgency": "routine", "rationale": "Source of blood loss",
+                        "expected_findings": "Gastritis or colonic lesion"}],
+    "treatments": [{"type": "Iron replacement", "description": "Ferrous sulfate", "dosage": "200 mg daily",
+                    "duration": "3 months", "precautions": ["GI upset"]}],
+}
+LAB = {"lab_values": {"Hb": {"value": "8.9", "unit": "g/dL", "reference_range": "13-17", "status": "abnormal"}},
+       "summary": "Microcytic anaemia with low ferritin", "key_abnormalities": ["Hb", "MCV", "Ferritin"],
+       "confidence_score": 0.9}
+
+# First words of each system prompt -> canned response
+RESPONSES = [
+    ("Analyze the provided laboratory", LAB),
+    ("Generate a comprehensive medical case summary", SUMMARY),
+    ("Generate a SOAP note", SOAP),
+    ("Generate a primary diagnosis", DIAGNOSIS),
+    ("Generate differential diagnoses", DIFFERENTIAL),
+    ("Generate investigation and treatment", RECOMMENDATIONS),
+    ("Generate a case summary, a SOAP note", {"case_summary": SUMMARY, "soap_note": SOAP, "diagnosis": DIAGNOSIS}),
+]
+
+LAB_TEXT = " ".join(["Haemoglobin 8.9 g/dL (13.0-17.0) L. MCV 71 fL (80-100) L. Ferritin 6 ng/mL (30-400) L."] * 40)
+
+
+def count_tokens(text: str) -> int:
+    return len(re.findall(r"\w+|[^\w\s]", text))
+
+
+class StubChatModel(BaseChatModel):
+    """Chat model with a token-proportional latency model and canned responses."""
+
+    break_fast_mode: bool = False
+    stats: Any = None
+
+    def _respond(self, messages: List[BaseMessage]) -> str:
+        system = messages[0].content.strip()
+        for prefix, response in RESPONSES:
+            if system.startswith(prefix):
+                if self.break_fast_mode and prefix.startswith("Generate a case summary,"):
+                    response = {"case_summary": SUMMARY, "soap_note": {"subjective": "incomplete"}}
+                return json.dumps(response)
+        raise ValueError(f"Unexpected prompt: {system[:60]}")
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        raise NotImplementedError
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        content = self._respond(messages)
+        input_tokens = sum(count_tokens(message.content) for message in messages)
+        output_tokens = count_tokens(content)
+        self.stats.update(calls=1, input_tokens=input_tokens, output_tokens=output_tokens)
+        await asyncio.sleep(ROUND_TRIP + input_tokens * PREFILL_PER_TOKEN + output_tokens * DECODE_PER_TOKEN)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=content))])
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+
+
+def _case_input() -> CaseInput:
+    return CaseInput(
+        case_id="benchmark",
+        patient_data=PatientData(name="Benchmark", age=58, gender="Male"),
+        doctor_case_summary="Progressive exertional dyspnoea and fatigue for two weeks.",
+        lab_files=[
+            ProcessedFile(file_id=f"lab{i}", file_name=f"lab{i}.pdf", file_type="application/pdf",
+                          file_category="lab", text_data=LAB_TEXT)
+            for i in range(2)
+        ],
+        radiology_files=[
+            ProcessedFile(file_id="xr", file_name="chest.png", file_type="image/png", file_category="radiology",
+                          ai_summary=json.dumps({"summary": "No acute cardiopulmonary abnormality"}))
+        ],
+    )
+
+
+async def _run(mode: str, break_fast_mode: bool = False):
+    agent = MedicalInsightsAgent(mode=mode)
+    stats = Counter()
+    agent.llm_manager.llm = StubChatModel(break_fast_mode=break_fast_mode, stats=stats)
+    # No request pacing, so runs don't slow each other down
+    agent.llm_manager.limiter = AsyncRateLimiter(max_concurrency=8)
+
+    async def _skip_save(case_id, insights):
+        return None
+
+    agent.supabase.upload_ai_insights = _skip_save
+    start = time.perf_counter()
+    insights = await agent.process(_case_input())
+    elapsed = time.perf_counter() - start
+    assert insights.primary_diagnosis.primary_diagnosis == DIAGNOSIS["diagnosis"]
+    return elapsed, stats
+
+
+async def main() -> None:
+    print(f"stub model: {ROUND_TRIP * 1000:.0f}ms round trip, "
+          f"{PREFILL_PER_TOKEN * 1e6:.0f}us/input token, {DECODE_PER_TOKEN * 1000:.0f}ms/output token")
+    print(f"{'mode':<9} {'wall':>7} {'calls':>6} {'input tok':>10} {'output tok':>11}")
+    for label, mode, broken in (("staged", "staged", False), ("fast", "fast", False), ("fallback", "fast", True)):
+        elapsed, stats = await _run(mode, broken)
+        print(f"{label:<9} {elapsed:6.2f}s {stats['calls']:>6} {stats['input_tokens']:>10} {stats['output_tokens']:>11}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
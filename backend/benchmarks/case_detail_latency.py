@@ -0,0 +1,101 @@
+"""
+Case detail read path benchmark against a local PostgREST stand-in.
+
+Every request to the stand-in takes RTT seconds. Compares:
+
+    sequential: get_case_by_id, get_case_files, get_ai_insights_by_case_id
+                awaited one after another (old GET /cases/cases/{case_id})
+    concurrent: get_case_detail with the embedded select unavailable
+    embedded:   get_case_detail with one embedded select
+
+Run from the backend directory:
+
+    python -m benchmarks.case_detail_latency
+"""
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "benchmark")
+# Measure round trips, not hits in the read-through cache
+os.environ.setdefault("SUPABASE_CACHE_ENABLED", "false")
+
+import supabase_client.supabase_client as supabase_module
+
+RTT = 0.03
+RUNS = 20
+
+CASE = {"case_id": "c1", "patient_name": "Jane", "status": "completed", "created_at": "2025-01-01T00:00:00Z"}
+FILES = [{"file_id": f"f{i}", "case_id": "c1", "file_name": f"lab{i}.pdf", "file_category": "lab"} for i in range(4)]
+INSIGHTS = {
+    "case_id": "c1",
+    "comprehensive_summary": "summary",
+    "key_findings": json.dumps(["a", "b"]),
+    "patient_context": json.dumps({"name": "Jane", "age": 31, "gender": "Female"}),
+    "supporting_evidence": json.dumps(["x"]),
+}
+
+
+async def _stand_in(request: httpx.Request) -> httpx.Response:
+    await asyncio.sleep(RTT)
+    path = request.url.path
+    select = request.url.params.get("select", "")
+    if path.endswith("/cases") and "case_files" in select:
+        if not EMBED_SUPPORTED:
+            return httpx.Response(400, json={"code": "PGRST200", "message": "no relationship", "details": None, "hint": None})
+        return httpx.Response(200, json=[{**CASE, "case_files": FILES, "ai_insights": [INSIGHTS]}])
+    if path.endswith("/cases"):
+        return httpx.Response(200, json=[CASE])
+    if path.endswith("/case_files"):
+        return httpx.Response(200, json=FILES)
+    return httpx.Response(200, json=[INSIGHTS])
+
+
+EMBED_SUPPORTED = True
+supabase_module._pooled_http_client = lambda: httpx.AsyncClient(transport=httpx.MockTransport(_stand_in))
+
+
+async def _sequential(client) -> None:
+    await client.get_case_by_id(case_id="c1")
+    await client.get_case_files(case_id="c1")
+    await client.get_ai_insights_by_case_id(case_id="c1")
+
+
+async def _detail(client) -> None:
+    await client.get_case_detail(case_id="c1")
+
+
+async def _measure(call, embed: bool) -> float:
+    global EMBED_SUPPORTED
+    EMBED_SUPPORTED = embed
+    client = supabase_module.SupabaseCaseClient()
+    await call(client)  # warm up (and detect embedding support)
+    timings = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        await call(client)
+        timings.append(time.perf_counter() - start)
+    await client.aclose()
+    return statistics.median(timings) * 1000
+
+
+async def main() -> None:
+    print(f"stand-in RTT {RTT * 1000:.0f}ms, median of {RUNS} runs")
+    for label, call, embed in (
+        ("sequential", _sequential, True),
+        ("concurrent", _detail, False),
+        ("embedded", _detail, True),
+    ):
+        print(f"{label:<11} {await _measure(call, embed):6.1f}ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,169 @@
+"""
+extract_json_from_string: single-pass scanner vs the previous regex cascade.
+
+Inputs are shaped like the responses this backend gets from its prompts
+(lab analysis, SOAP note, fast analysis, radiology findings), in the
+forms models actually produce them: bare JSON, fenced, with a preamble,
+with trailing prose containing braces, truncated. Three stress inputs
+show the worst cases: long prose full of stray braces, prose full of
+braces that look like the start of an object, and a truncated response
+with many open braces. A hostile input nests arrays far deeper than the
+json module can parse.
+
+Before anything is timed, the scanner's result for every input is checked
+against the object the response was generated from (None for the
+truncated, stress-without-object and hostile cases); a mismatch exits
+with an error. Timings are the min and median per call and ops per
+second.
+
+Run from the backend directory (--check runs only the correctness check):
+
+    python -m benchmarks.extractjson [--check]
+"""
+import json
+import re
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils.extractjson import extract_json_from_string
+
+LAB = {
+    "lab_values": {
+        name: {"value": value, "unit": unit, "reference_range": ref, "status": status}
+        for name, value, unit, ref, status in [
+            ("Haemoglobin", "8.9", "g/dL", "13.0-17.0", "abnormal"),
+            ("MCV", "71", "fL", "80-100", "abnormal"),
+            ("Ferritin", "6", "ng/mL", "30-400", "critical"),
+            ("WBC", "6.2", "10^9/L", "4.0-11.0", "normal"),
+            ("Platelets", "412", "10^9/L", "150-400", "abnormal"),
+            ("Sodium", "138", "mmol/L", "135-145", "normal"),
+            ("Potassium", "4.1", "mmol/L", "3.5-5.1", "normal"),
+            ("Creatinine", "0.9", "mg/dL", "0.7-1.3", "normal"),
+            ("ALT", "22", "U/L", "7-56", "normal"),
+            ("TSH", "2.1", "mIU/L", "0.4-4.0", "normal"),
+        ]
+    },
+    "summary": "Microcytic anaemia with depleted iron stores {ferritin 6 ng/mL}; renal, liver and thyroid function normal.",
+    "key_abnormalities": ["Haemoglobin 8.9 g/dL", "MCV 71 fL", "Ferritin 6 ng/mL", "Platelets 412 x10^9/L"],
+    "confidence_score": 0.91,
+}
+SOAP = {
+    "subjective": "Two weeks of progressive exertional dyspnoea and fatigue. Occasional NSAID use for back pain. "
+    "Denies melaena, haematemesis or chest pain.",
+    "objective": "Pallor, HR 98, BP 128/76, SpO2 97% on air. Hb 8.9 g/dL, MCV 71 fL, ferritin 6 ng/mL.",
+    "assessment": "Iron deficiency anaemia, likely from chronic GI blood loss.",
+    "plan": "Stop NSAIDs; oral iron; upper and lower endoscopy; repeat CBC in 4 weeks.",
+    "confidence_score": 0.8,
+}
+FAST = {
+    "case_summary": {"comprehensive_summary": SOAP["assessment"], "key_findings": LAB["key_abnormalities"], "confidence_score": 0.82},
+    "soap_note": SOAP,
+    "diagnosis": {"diagnosis": "Iron deficiency anaemia", "icd_code": "D50.9", "description": SOAP["assessment"],
+                  "supporting_evidence": LAB["key_abnormalities"], "confidence_score": 0.78},
+}
+RADIOLOGY = {
+    "findings": ["No focal consolidation", "No pleural effusion", "Normal cardiomediastinal silhouette"],
+    "impression": "No acute cardiopulmonary abnormality.",
+    "summary": "Normal PA chest radiograph.",
+    "confidence_score": 0.88,
+}
+
+_lab = json.dumps(LAB, indent=2)
+_fast = json.dumps(FAST, indent=2)
+
+# name -> (model output, expected result)
+CASES = {
+    "lab bare": (json.dumps(LAB), LAB),
+    "lab fenced": (f"```json\n{_lab}\n```", LAB),
+    "soap preamble": ("Here is the SOAP note in the requested format:\n\n" + json.dumps(SOAP, indent=2), SOAP),
+    "fast fenced+prose": (f"Sure! Below is the combined analysis.\n```json\n{_fast}\n```\n"
+                          "Notes: values in {braces} are approximate; let me know if you need {more} detail.", FAST),
+    "radiology trailing {}": (json.dumps(RADIOLOGY) + "\n\nNote: the {impression} field summarises {findings}.", RADIOLOGY),
+    "lab truncated": (_lab[: len(_lab) * 2 // 3], None),
+    "stress stray braces": ("Reasoning: " + " ".join(f"step {i} uses {{x{i}}} and }} then" for i in range(2000))
+                            + "\n" + json.dumps(LAB), LAB),
+    "stress quoted braces": (" ".join(f'step {i} reads {{"x{i}" and }} then' for i in range(2000))
+                             + "\n" + json.dumps(LAB), LAB),
+    "stress open braces": ("{" + "{ note ".join(str(i) for i in range(3000)), None),
+    "stress deep nesting": ('{"a": ' + "[" * 100000 + "]" * 100000 + "}", None),
+}
+
+ROUNDS = 200
+STRESS_ROUNDS = 5
+
+
+def legacy_extract(input_string: str) -> Optional[Dict[Any, Any]]:
+    """The regex cascade extract_json_from_string used before the scanner."""
+    if not input_string or not isinstance(input_string, str):
+        return None
+    cleaned_string = input_string.strip()
+    match = re.search(r'```(?:json)?\s*(\{.*?\})\s*```', cleaned_string, re.DOTALL | re.IGNORECASE)
+    if match:
+        try:
+            return json.loads(match.group(1).strip())
+        except json.JSONDecodeError:
+            pass
+    match = re.search(r'\{.*\}', cleaned_string, re.DOTALL)
+    if match:
+        try:
+            return json.loads(match.group(0).strip())
+        except json.JSONDecodeError:
+            pass
+    try:
+        return json.loads(cleaned_string)
+    except json.JSONDecodeError:
+        pass
+    match = re.search(r'\[.*\]', cleaned_string, re.DOTALL)
+    if match:
+        try:
+            return json.loads(match.group(0).strip())
+        except json.JSONDecodeError:
+            pass
+    return None
+
+
+def _bench(function, text: str, rounds: int):
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        result = function(text)
+        timings.append(time.perf_counter() - start)
+    return result, min(timings), statistics.median(timings)
+
+
+def check() -> None:
+    """Exit with an error unless the scanner returns the expected value for every case."""
+    wrong = [name for name, (text, expected) in CASES.items() if extract_json_from_string(text) != expected]
+    if wrong:
+        sys.exit(f"extract_json_from_string returned the wrong value for: {', '.join(wrong)}")
+    print(f"extract_json_from_string: all {len(CASES)} cases correct")
+
+
+def _legacy(text: str):
+    # The regex cascade has no guard against deep nesting
+    try:
+        return legacy_extract(text)
+    except RecursionError:
+        return "RecursionError"
+
+
+def main() -> None:
+    check()
+    if "--check" in sys.argv[1:]:
+        return
+    print(f"\n{'case':<24} {'chars':>7} {'impl':<7} {'min':>10} {'median':>10} {'ops/s':>10}  correct")
+    for name, (text, expected) in CASES.items():
+        rounds = STRESS_ROUNDS if name.startswith("stress") else ROUNDS
+        for label, function in (("legacy", _legacy), ("scanner", extract_json_from_string)):
+            result, best, median = _bench(function, text, rounds)
+            print(f"{name:<24} {len(text):>7} {label:<7} {best * 1e6:8.1f}us {median * 1e6:8.1f}us {1 / median:10.0f}  "
+                  f"{'yes' if result == expected else 'NO'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Event-loop latency benchmark for LLMManager.
+
+Runs 20 concurrent "cases" (3 sequential LLM calls each, like summary -> SOAP
+-> diagnosis) against a stub chat model that takes LLM_LATENCY seconds per
+call, and measures how late a 10ms ticker on the same loop wakes up.
+
+    before: chain.invoke(...)  (blocking call inside async code, old behaviour)
+    after:  LLMManager.generate_response(...)  (ainvoke behind the shared limiter)
+
+Run from the backend directory:
+
+    python -m benchmarks.llm_event_loop_latency
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("GROQ_API_KEY", "benchmark")
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.prompts import ChatPromptTemplate
+
+from utils.llm_utils import LLMManager
+from utils.rate_limiter import AsyncRateLimiter
+
+CASES = 20
+CALLS_PER_CASE = 3
+LLM_LATENCY = 0.2
+TICK = 0.01
+
+
+class StubChatModel(BaseChatModel):
+    """Chat model that sleeps like a network round trip and returns fixed JSON."""
+
+    latency: float = LLM_LATENCY
+
+    def _result(self) -> ChatResult:
+        message = AIMessage(content='{"summary": "stub", "confidence_score": 0.9}')
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        time.sleep(self.latency)
+        return self._result()
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return self._result()
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+
+
+async def _ticker(lags: List[float], stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(TICK)
+        lags.append(time.perf_counter() - start - TICK)
+
+
+async def _blocking_call(manager: LLMManager) -> None:
+    prompt = ChatPromptTemplate.from_messages([("system", "stub"), ("user", "{input}")])
+    (prompt | manager.llm).invoke({"input": "case"})
+
+
+async def _async_call(manager: LLMManager) -> None:
+    await manager.generate_response(system_prompt="stub", user_input="case")
+
+
+async def _run(call) -> dict:
+    manager = LLMManager(limiter=AsyncRateLimiter(max_concurrency=CASES))
+    manager.llm = StubChatModel()
+
+    async def case() -> None:
+        for _ in range(CALLS_PER_CASE):
+            await call(manager)
+
+    lags: List[float] = []
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(_ticker(lags, stop))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(case() for _ in range(CASES)))
+    wall = time.perf_counter() - start
+
+    stop.set()
+    await ticker
+    lags = lags or [wall]
+    return {
+        "wall_s": wall,
+        "p50_lag_ms": statistics.median(lags) * 1000,
+        "max_lag_ms": max(lags) * 1000,
+        "ticks": len(lags),
+    }
+
+
+def main() -> None:
+    print(f"{CASES} cases x {CALLS_PER_CASE} calls, stub latency {LLM_LATENCY * 1000:.0f}ms")
+    for label, call in (("before (invoke)", _blocking_call), ("after (ainvoke)", _async_call)):
+        r = asyncio.run(_run(call))
+        print(
+            f"{label:<16} wall={r['wall_s']:.2f}s  loop lag p50={r['p50_lag_ms']:.1f}ms  "
+            f"max={r['max_lag_ms']:.1f}ms  ticks={r['ticks']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
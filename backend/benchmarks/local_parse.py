@@ -0,0 +1,91 @@
+"""
+Local text-layer fast path vs LlamaParse for every page, on the PDFs in sample/.
+
+LlamaParse itself can't be called from a benchmark, so it is replaced by a
+stub with a fixed per-job latency plus a per-page latency, charging the
+list price per page. The local path is measured for real: pypdf text
+extraction in the process pool, then the stub for whatever pages still
+need OCR.
+
+    remote: every page through (stub) LlamaParse, as before
+    local:  text-layer pages extracted locally, the rest through the stub
+
+Run from the backend directory:
+
+    python -m benchmarks.local_parse
+"""
+import asyncio
+import io
+import os
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("PARSE_CACHE_ENABLED", "false")
+
+from pypdf import PdfReader
+
+import parsers.parse as parse
+
+SAMPLES = Path(__file__).resolve().parent.parent.parent / "sample"
+
+JOB_LATENCY = 4.0
+PAGE_LATENCY = 1.0
+# LlamaParse: 3 credits per page in the default mode, $1 per 1000 credits
+PRICE_PER_PAGE = 0.003
+
+
+class StubLlamaParse:
+    def __init__(self):
+        self.pages = 0
+        self.jobs = 0
+
+    async def aparse(self, source, extra_info=None):
+        pdf = io.BytesIO(source) if isinstance(source, bytes) else source
+        pages = len(PdfReader(pdf).pages)
+        self.jobs += 1
+        self.pages += pages
+        await asyncio.sleep(JOB_LATENCY + pages * PAGE_LATENCY)
+        return SimpleNamespace(pages=[SimpleNamespace(md=f"page {i + 1}") for i in range(pages)])
+
+
+async def _run(file_path: Path, local: bool):
+    parse.LOCAL_PARSE_ENABLED = local
+    stub = StubLlamaParse()
+    parse.parser = stub
+    start = time.perf_counter()
+    result = await parse.process_pdf_async(str(file_path))
+    elapsed = time.perf_counter() - start
+    assert result["status"] == "success", result.get("error")
+    sources = [page.source for page in result["pages"]]
+    return elapsed, stub, sources.count("pypdf"), len(sources)
+
+
+async def main() -> None:
+    print(f"stub LlamaParse: {JOB_LATENCY:.1f}s per job + {PAGE_LATENCY:.1f}s per page, ${PRICE_PER_PAGE:.3f} per page")
+
+    # The first use of the pool spawns its workers; report that separately
+    parse.LOCAL_PARSE_ENABLED = True
+    start = time.perf_counter()
+    await parse._text_layer(str(next(SAMPLES.glob("*.pdf"))))
+    print(f"process pool start: {time.perf_counter() - start:.2f}s (once per process)\n")
+
+    print(f"{'file':<48} {'mode':<7} {'pages':>5} {'local':>5} {'jobs':>4} {'wall':>7} {'cost':>8}")
+    totals = {"remote": [0.0, 0.0], "local": [0.0, 0.0]}
+    for file_path in sorted(SAMPLES.glob("*.pdf")):
+        for mode in ("remote", "local"):
+            elapsed, stub, local_pages, pages = await _run(file_path, mode == "local")
+            cost = stub.pages * PRICE_PER_PAGE
+            totals[mode][0] += elapsed
+            totals[mode][1] += cost
+            print(f"{file_path.name:<48} {mode:<7} {pages:>5} {local_pages:>5} {stub.jobs:>4} {elapsed:6.2f}s ${cost:.3f}")
+    print()
+    for mode, (elapsed, cost) in totals.items():
+        print(f"{'total':<48} {mode:<7} {'':>5} {'':>5} {'':>4} {elapsed:6.2f}s ${cost:.3f}")
+    parse.shutdown_local_pool()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
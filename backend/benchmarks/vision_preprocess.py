@@ -0,0 +1,76 @@
+"""
+Radiology image preprocessing: bytes sent and latency per image.
+
+For sample/radiology.jpeg and larger synthetic exports of it (a 16-bit-style
+full-resolution PNG, as PACS exports often are), measures the real
+preprocessing time and output size, and estimates the transfer part of
+the vision call at a fixed bandwidth:
+
+    url:    the provider downloads the original from storage
+    inline: the preprocessed image travels base64-encoded in the request
+
+Run from the backend directory:
+
+    python -m benchmarks.vision_preprocess
+"""
+import io
+import math
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from PIL import Image
+
+from config import VISION_IMAGE_MAX_SIDE, VISION_IMAGE_FORMAT, VISION_IMAGE_QUALITY
+from utils.image_preprocess import data_url, preprocess_image
+
+SAMPLE = Path(__file__).resolve().parent.parent.parent / "sample" / "radiology.jpeg"
+
+BANDWIDTH = 50e6 / 8  # bytes per second (50 Mbit/s)
+TILE = 336  # Llama 4 image tile size
+RUNS = 5
+
+
+def _images():
+    original = SAMPLE.read_bytes()
+    yield "radiology.jpeg", original
+    with Image.open(io.BytesIO(original)) as image:
+        for side in (2048, 4096):
+            scale = side / max(image.size)
+            large = image.resize((round(image.width * scale), round(image.height * scale)), Image.Resampling.BICUBIC)
+            buffer = io.BytesIO()
+            large.save(buffer, format="PNG")
+            yield f"radiology@{side}.png", buffer.getvalue()
+
+
+def _tiles(image_bytes: bytes) -> int:
+    with Image.open(io.BytesIO(image_bytes)) as image:
+        return math.ceil(image.width / TILE) * math.ceil(image.height / TILE)
+
+
+def main() -> None:
+    print(f"preprocessing: max side {VISION_IMAGE_MAX_SIDE}, {VISION_IMAGE_FORMAT} q{VISION_IMAGE_QUALITY}; "
+          f"transfer at {BANDWIDTH * 8 / 1e6:.0f} Mbit/s")
+    print(f"{'image':<20} {'original':>10} {'sent':>9} {'ratio':>6} {'tiles':>9} {'prep':>8} {'url xfer':>9} {'inline':>8} {'saved':>8}")
+    for name, original in _images():
+        timings = []
+        for _ in range(RUNS):
+            start = time.perf_counter()
+            processed, mime = preprocess_image(original, VISION_IMAGE_MAX_SIDE, VISION_IMAGE_FORMAT, VISION_IMAGE_QUALITY)
+            timings.append(time.perf_counter() - start)
+        prep = statistics.median(timings)
+        inline_bytes = len(data_url(processed, mime))
+        url_transfer = len(original) / BANDWIDTH
+        inline_total = prep + inline_bytes / BANDWIDTH
+        print(
+            f"{name:<20} {len(original):>10} {len(processed):>9} {len(original) / len(processed):5.1f}x "
+            f"{_tiles(original):>3} -> {_tiles(processed):<3} {prep * 1000:6.1f}ms "
+            f"{url_transfer * 1000:7.1f}ms {inline_total * 1000:6.1f}ms {(url_transfer - inline_total) * 1000:6.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -10,4 +10,131 @@ LLAMAPARSE_API_KEY=os.getenv("LLAMAPARSE_API_KEY")
 GROQ_API_KEY=os.getenv("GROQ_API_KEY")
 
 WEAVIATE_API_KEY=os.getenv("WEAVIATE_API_KEY")
-WEAVIATE_REST_URL=os.getenv("WEAVIATE_REST_URL")
\ No newline at end of file
+WEAVIATE_REST_URL=os.getenv("WEAVIATE_REST_URL")
+
+# Process-wide limits for Groq LLM calls (shared by every case in this process)
+LLM_MAX_CONCURRENCY=int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_REQUESTS_PER_MINUTE=float(os.getenv("LLM_REQUESTS_PER_MINUTE", "30"))
+
+# Max lab documents analyzed concurrently within a single case
+LAB_ANALYSIS_FANOUT=int(os.getenv("LAB_ANALYSIS_FANOUT", "4"))
+
+# Lab documents over this many tokens are split on page boundaries and analyzed in parallel chunks
+LAB_CHUNK_MAX_TOKENS=int(os.getenv("LAB_CHUNK_MAX_TOKENS", "4000"))
+# tiktoken encoding used for token accounting (Llama 3's tokenizer extends cl100k_base)
+TOKENIZER_ENCODING=os.getenv("TOKENIZER_ENCODING", "cl100k_base")
+
+# Process-wide cap on concurrent Groq vision calls for radiology images
+VISION_MAX_CONCURRENCY=int(os.getenv("VISION_MAX_CONCURRENCY", "4"))
+
+# Process-wide cap on concurrent LlamaParse jobs (shared by every case in this process)
+PARSE_MAX_CONCURRENCY=int(os.getenv("PARSE_MAX_CONCURRENCY", "4"))
+# Pages sent to LlamaParse are split into concurrent jobs of at most this many pages,
+# so the first pages of a long PDF are available before the last ones are parsed
+PARSE_PAGE_BATCH=int(os.getenv("PARSE_PAGE_BATCH", "10"))
+
+# Pages of born-digital PDFs with a usable embedded text layer are extracted locally
+# with pypdf (in a process pool); only scanned or low-quality pages go to LlamaParse
+LOCAL_PARSE_ENABLED=os.getenv("LOCAL_PARSE_ENABLED", "true").lower() == "true"
+LOCAL_PARSE_WORKERS=int(os.getenv("LOCAL_PARSE_WORKERS", "2"))
+# Minimum non-whitespace characters for a page's text layer to count as usable
+LOCAL_PARSE_MIN_CHARS=int(os.getenv("LOCAL_PARSE_MIN_CHARS", "100"))
+
+# Content-addressed cache of parsed PDF text (local SQLite file, LRU by size)
+PARSE_CACHE_ENABLED=os.getenv("PARSE_CACHE_ENABLED", "true").lower() == "true"
+PARSE_CACHE_PATH=os.getenv("PARSE_CACHE_PATH", ".cache/parse_cache.sqlite3")
+PARSE_CACHE_MAX_BYTES=int(os.getenv("PARSE_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+# Opt-in memoizing cache of LLM responses (in-memory LRU + SQLite tier, both with TTL)
+LLM_CACHE_ENABLED=os.getenv("LLM_CACHE_ENABLED", "false").lower() == "true"
+LLM_CACHE_TTL=float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_ENTRIES=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024"))
+LLM_CACHE_PATH=os.getenv("LLM_CACHE_PATH", ".cache/llm_cache.sqlite3")
+LLM_CACHE_MAX_BYTES=int(os.getenv("LLM_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# Opt-in perceptual-hash cache of radiology image analyses, scoped to one case.
+# Exact hash matches only by default: similar images are not the same findings.
+IMAGE_CACHE_ENABLED=os.getenv("IMAGE_CACHE_ENABLED", "false").lower() == "true"
+IMAGE_CACHE_PATH=os.getenv("IMAGE_CACHE_PATH", ".cache/image_cache.sqlite3")
+IMAGE_CACHE_MAX_DISTANCE=int(os.getenv("IMAGE_CACHE_MAX_DISTANCE", "0"))
+
+# Radiology images are downscaled and re-encoded locally and sent inline (base64) to the
+# vision model instead of as a storage URL the provider has to fetch at full resolution.
+# Llama 4 tiles images into 336px squares, so 1344 keeps up to 4 tiles per side.
+VISION_PREPROCESS_ENABLED=os.getenv("VISION_PREPROCESS_ENABLED", "true").lower() == "true"
+VISION_IMAGE_MAX_SIDE=int(os.getenv("VISION_IMAGE_MAX_SIDE", "1344"))
+VISION_IMAGE_FORMAT=os.getenv("VISION_IMAGE_FORMAT", "jpeg")  # "jpeg" or "webp"
+VISION_IMAGE_QUALITY=int(os.getenv("VISION_IMAGE_QUALITY", "85"))
+# Preprocessed images per file_id, so retries and re-analyses skip the download and re-encode
+VISION_IMAGE_CACHE_PATH=os.getenv("VISION_IMAGE_CACHE_PATH", ".cache/vision_images.sqlite3")
+VISION_IMAGE_CACHE_MAX_BYTES=int(os.getenv("VISION_IMAGE_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# Durable job queue for the analysis pipeline (run workers with `python worker.py`)
+JOB_QUEUE_BACKEND=os.getenv("JOB_QUEUE_BACKEND", "sqlite")
+JOB_QUEUE_PATH=os.getenv("JOB_QUEUE_PATH", ".cache/jobs.sqlite3")
+JOB_SPOOL_DIR=os.getenv("JOB_SPOOL_DIR", ".cache/spool")
+JOB_MAX_ATTEMPTS=int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_LEASE_SECONDS=float(os.getenv("JOB_LEASE_SECONDS", "120"))
+JOB_RETRY_BASE_DELAY=float(os.getenv("JOB_RETRY_BASE_DELAY", "30"))
+JOB_RETRY_MAX_DELAY=float(os.getenv("JOB_RETRY_MAX_DELAY", "900"))
+# Seconds a re-analysis or resume request may hold a case's job slot while it uploads files
+JOB_RESERVATION_SECONDS=float(os.getenv("JOB_RESERVATION_SECONDS", "600"))
+WORKER_CONCURRENCY=int(os.getenv("WORKER_CONCURRENCY", "2"))
+# Workers started inside the API process (0 = run `python worker.py` separately)
+EMBEDDED_WORKERS=int(os.getenv("EMBEDDED_WORKERS", "0"))
+
+# Uploads are streamed to the spool directory in chunks of this size (bytes held in memory per upload)
+UPLOAD_CHUNK_SIZE=int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+# Multipart uploads are kept in memory up to this size before the framework spools them to disk
+UPLOAD_SPOOL_MAX_MEMORY=int(os.getenv("UPLOAD_SPOOL_MAX_MEMORY", str(1024 * 1024)))
+
+# Shared HTTP/2 connection pool of the process-wide Supabase client
+SUPABASE_MAX_CONNECTIONS=int(os.getenv("SUPABASE_MAX_CONNECTIONS", "50"))
+SUPABASE_MAX_KEEPALIVE_CONNECTIONS=int(os.getenv("SUPABASE_MAX_KEEPALIVE_CONNECTIONS", "20"))
+SUPABASE_KEEPALIVE_EXPIRY=float(os.getenv("SUPABASE_KEEPALIVE_EXPIRY", "30"))
+SUPABASE_TIMEOUT=float(os.getenv("SUPABASE_TIMEOUT", "30"))
+
+# Read-through cache of case, file and insight reads. "sqlite" shares it between
+# the API and worker processes on one host so their writes invalidate each other's reads.
+SUPABASE_CACHE_ENABLED=os.getenv("SUPABASE_CACHE_ENABLED", "true").lower() == "true"
+SUPABASE_CACHE_BACKEND=os.getenv("SUPABASE_CACHE_BACKEND", "memory")
+SUPABASE_CACHE_TTL=float(os.getenv("SUPABASE_CACHE_TTL", "10"))
+SUPABASE_CACHE_MAX_ENTRIES=int(os.getenv("SUPABASE_CACHE_MAX_ENTRIES", "2048"))
+SUPABASE_CACHE_PATH=os.getenv("SUPABASE_CACHE_PATH", ".cache/supabase_cache.sqlite3")
+SUPABASE_CACHE_MAX_BYTES=int(os.getenv("SUPABASE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Pipeline progress events for GET /cases/{case_id}/events. "sqlite" relays events
+# from separate worker processes to the API process; "memory" only works with EMBEDDED_WORKERS.
+EVENTS_BACKEND=os.getenv("EVENTS_BACKEND", "sqlite")
+EVENTS_PATH=os.getenv("EVENTS_PATH", ".cache/events.sqlite3")
+EVENTS_HISTORY=int(os.getenv("EVENTS_HISTORY", "100"))
+EVENTS_RETENTION=float(os.getenv("EVENTS_RETENTION", "3600"))
+EVENTS_POLL_INTERVAL=float(os.getenv("EVENTS_POLL_INTERVAL", "0.25"))
+EVENTS_QUEUE_SIZE=int(os.getenv("EVENTS_QUEUE_SIZE", "256"))
+# Seconds between SSE keep-alive comments
+EVENTS_HEARTBEAT=float(os.getenv("EVENTS_HEARTBEAT", "15"))
+
+# Stream SOAP note and diagnosis generation, publishing partial results as "partial" events
+LLM_STREAM_PARTIALS=os.getenv("LLM_STREAM_PARTIALS", "true").lower() == "true"
+# Minimum seconds between partial parses (and so partial events) of one section
+LLM_STREAM_PARTIAL_INTERVAL=float(os.getenv("LLM_STREAM_PARTIAL_INTERVAL", "0.25"))
+
+# "staged" (summary -> SOAP note -> diagnosis) or "fast" (all three in one LLM call)
+ANALYSIS_MODE=os.getenv("ANALYSIS_MODE", "staged")
+
+# Per-case outputs of analysis workflow nodes, keyed by a fingerprint of their inputs,
+# so re-analysing a changed case only recomputes the nodes whose inputs changed
+NODE_CACHE_ENABLED=os.getenv("NODE_CACHE_ENABLED", "true").lower() == "true"
+NODE_CACHE_PATH=os.getenv("NODE_CACHE_PATH", ".cache/node_cache.sqlite3")
+NODE_CACHE_MAX_BYTES=int(os.getenv("NODE_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# Persistent LangGraph checkpoints of analysis runs, keyed by case, so a failed or
+# interrupted run resumes from its last completed step (see POST /cases/{case_id}/resume)
+CHECKPOINT_ENABLED=os.getenv("CHECKPOINT_ENABLED", "true").lower() == "true"
+CHECKPOINT_PATH=os.getenv("CHECKPOINT_PATH", ".cache/checkpoints.sqlite3")
+
+# Retries of rate-limited (429), transient 5xx and dropped Groq/LlamaParse calls:
+# exponential backoff with jitter, or the wait the server asks for (Retry-After)
+RETRY_MAX_ATTEMPTS=int(os.getenv("RETRY_MAX_ATTEMPTS", "5"))
+RETRY_BASE_DELAY=float(os.getenv("RETRY_BASE_DELAY", "1"))
+RETRY_MAX_DELAY=float(os.getenv("RETRY_MAX_DELAY", "60"))
@@ -0,0 +1,337 @@
+import asyncio
+import json
+import os
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+import aiosqlite
+from pydantic import BaseModel
+
+from config import (
+    JOB_QUEUE_BACKEND, JOB_QUEUE_PATH, JOB_MAX_ATTEMPTS,
+    JOB_RETRY_BASE_DELAY, JOB_RETRY_MAX_DELAY, JOB_RESERVATION_SECONDS
+)
+
+
+class JobQueueError(Exception):
+    """Base exception for job queue errors."""
+
+    pass
+
+
+class DuplicateJobError(JobQueueError):
+    """Raised when a case already has a reserved, queued or running job."""
+
+    pass
+
+
+class Job(BaseModel):
+    job_id: str
+    kind: str
+    payload: Dict[str, Any]
+    status: str
+    attempts: int
+    max_attempts: int
+    last_error: Optional[str] = None
+
+
+class SQLiteJobQueue:
+    """
+    Durable job queue stored in a local SQLite file.
+
+    Workers claim a job by taking a time-limited lease on it and must renew
+    the lease with `heartbeat` while the job runs. A job whose lease expires
+    (worker crash, deploy) is handed back to the queue by `recover_orphans`.
+    Failed jobs are retried with exponential backoff until `max_attempts`.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._db: Optional[aiosqlite.Connection] = None
+        self._lock = asyncio.Lock()
+
+    async def _connect(self) -> aiosqlite.Connection:
+        if self._db is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = aiosqlite.connect(self.path, isolation_level=None, timeout=30)
+            connection.daemon = True
+            db = await connection
+            await db.execute("PRAGMA journal_mode=WAL")
+            await db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    max_attempts INTEGER NOT NULL,
+                    run_after REAL NOT NULL,
+                    lease_owner TEXT,
+                    lease_expires REAL,
+                    last_error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+            await db.execute("CREATE INDEX IF NOT EXISTS idx_jobs_ready ON jobs(status, run_after)")
+            self._db = db
+        return self._db
+
+    @staticmethod
+    def _row_to_job(row) -> Job:
+        return Job(
+            job_id=row[0],
+            kind=row[1],
+            payload=json.loads(row[2]),
+            status=row[3],
+            attempts=row[4],
+            max_attempts=row[5],
+            last_error=row[6],
+        )
+
+    async def enqueue(self, kind: str, payload: Dict[str, Any], max_attempts: int = JOB_MAX_ATTEMPTS) -> str:
+        """Add a job to the queue and return its ID."""
+        job_id = str(uuid.uuid4())
+        now = time.time()
+        async with self._lock:
+            db = await self._connect()
+            await db.execute(
+                """
+                INSERT INTO jobs (job_id, kind, payload, status, attempts, max_attempts, run_after, created_at, updated_at)
+                VALUES (?, ?, ?, 'queued', 0, ?, ?, ?, ?)
+                """,
+                (job_id, kind, json.dumps(payload), max_attempts, now, now, now),
+            )
+        return job_id
+
+    async def reserve(self, kind: str, case_id: str, max_attempts: int = JOB_MAX_ATTEMPTS) -> str:
+        """
+        Reserve the next job of a case and return its ID; `activate` queues it
+        once its payload is ready, `release` gives the reservation up.
+
+        Raises DuplicateJobError if the case already has a reserved, queued or
+        running job: two runs of a case would write to the same checkpoint
+        thread. Reservations not activated within JOB_RESERVATION_SECONDS
+        lapse.
+        """
+        job_id = str(uuid.uuid4())
+        now = time.time()
+        async with self._lock:
+            db = await self._connect()
+            await db.execute("BEGIN IMMEDIATE")
+            try:
+                async with db.execute(
+                    """
+                    SELECT job_id FROM jobs
+                    WHERE json_extract(payload, '$.case_id') = ?
+                        AND (status IN ('queued', 'running') OR (status = 'reserved' AND lease_expires >= ?))
+                    LIMIT 1
+                    """,
+                    (case_id, now),
+                ) as cursor:
+                    active = await cursor.fetchone()
+                if active:
+                    raise DuplicateJobError(f"Case {case_id} already has an analysis in progress (job {active[0]})")
+                await db.execute(
+                    """
+                    INSERT INTO jobs (job_id, kind, payload, status, attempts, max_attempts, run_after,
+                        lease_expires, created_at, updated_at)
+                    VALUES (?, ?, ?, 'reserved', 0, ?, ?, ?, ?, ?)
+                    """,
+                    (job_id, kind, json.dumps({"case_id": case_id}), max_attempts, now,
+                     now + JOB_RESERVATION_SECONDS, now, now),
+                )
+                await db.execute("COMMIT")
+            except BaseException:
+                await db.execute("ROLLBACK")
+                raise
+        return job_id
+
+    async def activate(self, job_id: str, payload: Dict[str, Any]) -> None:
+        """Queue a reserved job with its payload."""
+        now = time.time()
+        async with self._lock:
+            db = await self._connect()
+            cursor = await db.execute(
+                """
+                UPDATE jobs SET status = 'queued', payload = ?, run_after = ?, lease_expires = NULL, updated_at = ?
+                WHERE job_id = ? AND status = 'reserved' AND lease_expires >= ?
+                """,
+                (json.dumps(payload), now, now, job_id, now),
+            )
+            if cursor.rowcount == 0:
+                raise JobQueueError(f"Reservation {job_id} has lapsed")
+
+    async def release(self, job_id: str) -> None:
+        """Give up a reservation that was not activated."""
+        async with self._lock:
+            db = await self._connect()
+            await db.execute("DELETE FROM jobs WHERE job_id = ? AND status = 'reserved'", (job_id,))
+
+    async def claim(self, worker_id: str, lease_seconds: float) -> Optional[Job]:
+        """Lease the oldest ready job to `worker_id`, or return None."""
+        now = time.time()
+        async with self._lock:
+            db = await self._connect()
+            await db.execute("BEGIN IMMEDIATE")
+            try:
+                async with db.execute(
+                    """
+                    SELECT job_id, kind, payload, status, attempts, max_attempts, last_error FROM jobs
+                    WHERE status = 'queued' AND run_after <= ?
+                    ORDER BY run_after, created_at LIMIT 1
+                    """,
+                    (now,),
+                ) as cursor:
+                    row = await cursor.fetchone()
+
+                if row is None:
+                    await db.execute("COMMIT")
+                    return None
+
+                await db.execute(
+                    """
+                    UPDATE jobs SET status = 'running', attempts = attempts + 1,
+                        lease_owner = ?, lease_expires = ?, updated_at = ?
+                    WHERE job_id = ?
+                    """,
+                    (worker_id, now + lease_seconds, now, row[0]),
+                )
+                await db.execute("COMMIT")
+            except BaseException:
+                await db.execute("ROLLBACK")
+                raise
+
+        job = self._row_to_job(row)
+        job.status = "running"
+        job.attempts += 1
+        return job
+
+    async def heartbeat(self, job_id: str, worker_id: str, lease_seconds: float) -> None:
+        """Extend the lease of a running job."""
+        now = time.time()
+        async with self._lock:
+            db = await self._connect()
+            cursor = await db.execute(
+                """
+                UPDATE jobs SET lease_expires = ?, updated_at = ?
+                WHERE job_id = ? AND lease_owner = ? AND status = 'running'
+                """,
+                (now + lease_seconds, now, job_id, worker_id),
+            )
+            if cursor.rowcount == 0:
+                raise JobQueueError(f"Lease on job {job_id} was lost")
+
+    async def complete(self, job_id: str) -> None:
+        async with self._lock:
+            db = await self._connect()
+            await db.execute(
+                "UPDATE jobs SET status = 'done', lease_owner = NULL, lease_expires = NULL, updated_at = ? WHERE job_id = ?",
+                (time.time(), job_id),
+            )
+
+    async def fail(self, job: Job, error: str) -> bool:
+        """
+        Record a failed attempt. Returns True if the job will be retried,
+        False if it has used up its attempts and is now marked failed.
+        """
+        now = time.time()
+        retry = job.attempts < job.max_attempts
+        delay = min(JOB_RETRY_BASE_DELAY * (2 ** (job.attempts - 1)), JOB_RETRY_MAX_DELAY)
+        async with self._lock:
+            db = await self._connect()
+            await db.execute(
+                """
+                UPDATE jobs SET status = ?, run_after = ?, last_error = ?,
+                    lease_owner = NULL, lease_expires = NULL, updated_at = ?
+                WHERE job_id = ?
+                """,
+                ("queued" if retry else "failed", now + delay, error, now, job.job_id),
+            )
+        return retry
+
+    async def recover_orphans(self) -> Dict[str, Any]:
+        """
+        Hand jobs whose lease has expired back to the queue. Jobs that have
+        already used all their attempts are marked failed instead, and
+        lapsed reservations are deleted.
+
+        Returns:
+            {"requeued": <count>, "failed": [<Job>, ...]}
+        """
+        now = time.time()
+        async with self._lock:
+            db = await self._connect()
+            await db.execute("BEGIN IMMEDIATE")
+            try:
+                async with db.execute(
+                    """
+                    SELECT job_id, kind, payload, status, attempts, max_attempts, last_error FROM jobs
+                    WHERE status = 'running' AND lease_expires < ?
+                    """,
+                    (now,),
+                ) as cursor:
+                    rows = await cursor.fetchall()
+
+                # Reservations whose request died before activating them
+                await db.execute("DELETE FROM jobs WHERE status = 'reserved' AND lease_expires < ?", (now,))
+
+                orphans = [self._row_to_job(row) for row in rows]
+                failed = [job for job in orphans if job.attempts >= job.max_attempts]
+                for job in orphans:
+                    job.status = "failed" if job in failed else "queued"
+                    job.last_error = "lease expired"
+                    await db.execute(
+                        """
+                        UPDATE jobs SET status = ?, run_after = ?, last_error = ?,
+                            lease_owner = NULL, lease_expires = NULL, updated_at = ?
+                        WHERE job_id = ?
+                        """,
+                        (job.status, now, job.last_error, now, job.job_id),
+                    )
+                await db.execute("COMMIT")
+            except BaseException:
+                await db.execute("ROLLBACK")
+                raise
+
+        return {"requeued": len(orphans) - len(failed), "failed": failed}
+
+    async def get_job(self, job_id: str) -> Optional[Job]:
+        async with self._lock:
+            db = await self._connect()
+            async with db.execute(
+                "SELECT job_id, kind, payload, status, attempts, max_attempts, last_error FROM jobs WHERE job_id = ?",
+                (job_id,),
+            ) as cursor:
+                row = await cursor.fetchone()
+        return self._row_to_job(row) if row else None
+
+    async def stats(self) -> Dict[str, int]:
+        async with self._lock:
+            db = await self._connect()
+            async with db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status") as cursor:
+                rows = await cursor.fetchall()
+        return {status: count for status, count in rows}
+
+    async def close(self) -> None:
+        if self._db is not None:
+            await self._db.close()
+            self._db = None
+
+
+_job_queue: Optional[SQLiteJobQueue] = None
+
+
+def get_job_queue() -> SQLiteJobQueue:
+    """Return the process-wide job queue for the configured backend."""
+    global _job_queue
+    if _job_queue is None:
+        if JOB_QUEUE_BACKEND != "sqlite":
+            raise ValueError(f"Unsupported JOB_QUEUE_BACKEND: {JOB_QUEUE_BACKEND}")
+        _job_queue = SQLiteJobQueue(JOB_QUEUE_PATH)
+    return _job_queue
@@ -0,0 +1,38 @@
+import os
+import shutil
+from typing import Tuple
+
+import aiofiles
+from fastapi import UploadFile
+
+from config import JOB_SPOOL_DIR, UPLOAD_CHUNK_SIZE
+
+
+def case_spool_dir(case_id: str) -> str:
+    """Directory holding the uploaded files of a case until its job finishes"""
+    return os.path.join(JOB_SPOOL_DIR, case_id)
+
+
+async def spool_upload(case_id: str, file_id: str, upload: UploadFile) -> Tuple[str, int]:
+    """
+    Stream an uploaded file to the case spool directory in UPLOAD_CHUNK_SIZE
+    chunks, so memory use does not grow with the file size.
+
+    Returns:
+        The spooled file path and its size in bytes
+    """
+    directory = case_spool_dir(case_id)
+    os.makedirs(directory, exist_ok=True)
+    # Keep the original extension, parsers use it to detect the file type
+    file_path = os.path.join(directory, file_id + os.path.splitext(upload.filename or "")[1])
+
+    file_size = 0
+    async with aiofiles.open(file_path, "wb") as f:
+        while chunk := await upload.read(UPLOAD_CHUNK_SIZE):
+            await f.write(chunk)
+            file_size += len(chunk)
+    return file_path, file_size
+
+
+def remove_case_spool(case_id: str) -> None:
+    shutil.rmtree(case_spool_dir(case_id), ignore_errors=True)
@@ -19,6 +19,11 @@ class ProcessedFile(BaseModel):
     text_data: Optional[str] = None
     ai_summary: Optional[str] = None
 
+class ParsedPage(BaseModel):
+    page_number: int  # 1-based
+    text: str
+    source: Literal["pypdf", "llamaparse"] = "llamaparse"
+
 class LabDocument(BaseModel):
     file_id: str
     file_name: str
@@ -97,9 +102,9 @@ class MedicalInsights(BaseModel):
     case_summary: CaseSummary
     soap_note: SOAPNote
     primary_diagnosis: Diagnosis
-    # differential_diagnoses: List[DifferentialDiagnosis]
-    # investigation_recommendations: List[InvestigationRecommendation]
-    # treatment_recommendations: List[TreatmentRecommendation]
+    differential_diagnoses: List[DifferentialDiagnosis] = []
+    investigation_recommendations: List[InvestigationRecommendation] = []
+    treatment_recommendations: List[TreatmentRecommendation] = []
     overall_confidence_score: float = Field(ge=0.0, le=1.0)
     generated_at: datetime = Field(default_factory=datetime.now)
 
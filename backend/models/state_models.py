@@ -1,4 +1,5 @@
 # FILE: STATE_MODELS.PY
+import operator
 from typing import List, Dict, Optional, Annotated, Union
 from typing_extensions import TypedDict, Any
 from models.data_models import (
@@ -17,6 +18,15 @@ class DocumentAnalysisState(TypedDict):
     confidence_score: float
 
 
+def _latest(current: Any, new: Any) -> Any:
+    """Reducer for keys that parallel branches may both set: keep the newest value"""
+    return new
+
+
+def _merge_dicts(current: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    return {**(current or {}), **(new or {})}
+
+
 class MedicalAnalysisState(TypedDict):
     """Tracks the complete medical analysis pipeline state"""
     
@@ -31,15 +41,17 @@ class MedicalAnalysisState(TypedDict):
     case_summary: Optional[CaseSummary]
     soap_note: Optional[SOAPNote]
     primary_diagnosis: Optional[Diagnosis]
-    # differential_diagnoses: List[DifferentialDiagnosis]
-    # investigation_recommendations: List[InvestigationRecommendation]
-    # treatment_recommendations: List[TreatmentRecommendation]
+    differential_diagnoses: List[DifferentialDiagnosis]
+    investigation_recommendations: List[InvestigationRecommendation]
+    treatment_recommendations: List[TreatmentRecommendation]
     
     # Final output
     medical_insights: Optional[MedicalInsights]
     
-    # Processing metadata
-    processing_errors: List[str]
-    processing_stage: str
-    confidence_scores: Dict[str, float]
+    # Processing metadata (written by parallel branches, so merged by reducers)
+    processing_errors: Annotated[List[str], operator.add]
+    # Nodes (and lab files) whose stored output was reused because their inputs were unchanged
+    reused_nodes: Annotated[List[str], operator.add]
+    processing_stage: Annotated[str, _latest]
+    confidence_scores: Annotated[Dict[str, float], _merge_dicts]
 
@@ -0,0 +1,56 @@
+from typing import List, Optional
+
+# Line written between pages of a parsed document
+PAGE_SEPARATOR = "=" * 80
+
+
+def join_pages(pages: List[str]) -> str:
+    """Flatten parsed pages into the text_data stored for a lab file"""
+    return "".join(page + "\n" + PAGE_SEPARATOR + "\n" for page in pages)
+
+
+def split_pages(text: str) -> List[str]:
+    """Pages of a document flattened by join_pages (non-empty ones only)"""
+    return [page.strip() for page in text.split("\n" + PAGE_SEPARATOR + "\n") if page.strip()]
+
+
+def clean_text_layer(text: str) -> str:
+    """Trailing spaces and runs of blank lines removed from extracted text"""
+    lines = [line.rstrip() for line in text.strip().splitlines()]
+    cleaned: List[str] = []
+    for line in lines:
+        if line or (cleaned and cleaned[-1]):
+            cleaned.append(line)
+    return "\n".join(cleaned)
+
+
+def usable_text(text: str, min_chars: int) -> bool:
+    """
+    Whether a page's embedded text layer can stand in for OCR: enough
+    characters, mostly letters and digits, and few unmapped glyphs.
+    Scanned pages have no text layer at all.
+    """
+    visible = "".join(text.split())
+    if len(visible) < min_chars:
+        return False
+    unmapped = visible.count("\ufffd") + text.count("(cid:")
+    if unmapped > 0.02 * len(visible):
+        return False
+    return sum(char.isalnum() for char in visible) >= 0.5 * len(visible)
+
+
+def extract_text_layer(file_path: str, min_chars: int) -> List[Optional[str]]:
+    """
+    Embedded text of every page of a PDF, or None for pages whose text is
+    missing or unusable. Runs in a worker process, so it imports only pypdf.
+    """
+    from pypdf import PdfReader
+
+    pages: List[Optional[str]] = []
+    for page in PdfReader(file_path).pages:
+        try:
+            text = clean_text_layer(page.extract_text() or "")
+        except Exception:
+            text = ""
+        pages.append(text if usable_text(text, min_chars) else None)
+    return pages
@@ -1,32 +1,289 @@
+import asyncio
+import hashlib
+import io
+import json
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
 from llama_cloud_services import LlamaParse
-from config import LLAMAPARSE_API_KEY
+from pypdf import PdfReader, PdfWriter
+from config import (
+    LLAMAPARSE_API_KEY, PARSE_MAX_CONCURRENCY, PARSE_PAGE_BATCH,
+    LOCAL_PARSE_ENABLED, LOCAL_PARSE_WORKERS, LOCAL_PARSE_MIN_CHARS,
+    PARSE_CACHE_ENABLED, PARSE_CACHE_PATH, PARSE_CACHE_MAX_BYTES
+)
+from models.data_models import ParsedPage
+from parsers.pages import join_pages, split_pages, extract_text_layer
+from utils.rate_limiter import get_parse_limiter
+from utils.retry import retrying
+from utils.disk_cache import SQLiteCache
+
+logger = logging.getLogger(__name__)
+
+# Parser settings that change the output; they are part of the cache key
+PARSER_SETTINGS = {
+    "language": "en",
+    "result_type": "markdown",
+}
 
 parser = LlamaParse(
     api_key=LLAMAPARSE_API_KEY,
-    num_workers=4,
+    num_workers=PARSE_MAX_CONCURRENCY,
     verbose=False,
-    language="en",
-    result_type="markdown",
+    **PARSER_SETTINGS,
 )
 
-async def process_pdf_async(file_path) -> dict:
+parse_cache: Optional[SQLiteCache] = (
+    SQLiteCache(PARSE_CACHE_PATH, max_bytes=PARSE_CACHE_MAX_BYTES) if PARSE_CACHE_ENABLED else None
+)
+
+
+# Local text-layer extraction settings; they change which pages LlamaParse sees, so they are part of the cache key
+LOCAL_PARSE_SETTINGS = {
+    "enabled": LOCAL_PARSE_ENABLED,
+    "min_chars": LOCAL_PARSE_MIN_CHARS,
+}
+
+_local_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_local_pool() -> ProcessPoolExecutor:
+    """Process pool for pypdf text extraction, which is CPU-bound and would stall the event loop"""
+    global _local_pool
+    if _local_pool is None:
+        # spawn, not fork: the parent runs threads (SQLite, HTTP pools) that must not be forked mid-lock
+        _local_pool = ProcessPoolExecutor(max_workers=LOCAL_PARSE_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _local_pool
+
+
+def shutdown_local_pool() -> None:
+    global _local_pool
+    if _local_pool is not None:
+        _local_pool.shutdown(wait=False, cancel_futures=True)
+        _local_pool = None
+
+
+def file_cache_key(file_path: str) -> str:
+    """Hash of the file bytes plus the parser settings"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    digest.update(json.dumps(PARSER_SETTINGS, sort_keys=True).encode("utf-8"))
+    digest.update(json.dumps(LOCAL_PARSE_SETTINGS, sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _page_count(file_path: str) -> int:
+    return len(PdfReader(file_path).pages)
+
+
+def _extract_pages(file_path: str, page_indices: List[int]) -> bytes:
+    """A new PDF holding the given (0-based) pages of the file"""
+    writer = PdfWriter()
+    reader = PdfReader(file_path)
+    for index in page_indices:
+        writer.add_page(reader.pages[index])
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+def _page_ranges(page_indices: List[int]) -> str:
+    """1-based page ranges such as "1-3,7" for logs and job names"""
+    ranges = []
+    for index in page_indices:
+        if ranges and ranges[-1][1] == index:
+            ranges[-1][1] = index + 1
+        else:
+            ranges.append([index + 1, index + 1])
+    return ",".join(str(first) if first == last else f"{first}-{last}" for first, last in ranges)
+
+
+async def _text_layer(file_path: str) -> List[Optional[str]]:
+    """Usable embedded text of each page (None where OCR is needed), or [] if the PDF can't be read"""
+    try:
+        if not LOCAL_PARSE_ENABLED:
+            return [None] * await asyncio.to_thread(_page_count, file_path)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(get_local_pool(), extract_text_layer, file_path, LOCAL_PARSE_MIN_CHARS)
+    except Exception as e:
+        # Not readable locally; LlamaParse may still manage it as one job
+        logger.warning(f"Could not read the text layer of {file_path}: {e}")
+        return []
+
+
+async def _parse_pages(file_path: str, page_indices: Optional[List[int]] = None) -> List[ParsedPage]:
+    """One LlamaParse job for the whole file, or for the given (0-based) pages of it"""
+    if page_indices is None:
+        source, extra_info = file_path, None
+    else:
+        source = await asyncio.to_thread(_extract_pages, file_path, page_indices)
+        extra_info = {"file_name": f"{os.path.basename(file_path)}#pages={_page_ranges(page_indices)}"}
+
+    # Rate limits and transient errors of the job are retried with backoff
+    async for attempt in retrying("LlamaParse", get_parse_limiter()):
+        with attempt:
+            async with get_parse_limiter():
+                results = await parser.aparse(source, extra_info=extra_info)
+
+    if page_indices is None:
+        return [ParsedPage(page_number=i + 1, text=page.md, source="llamaparse") for i, page in enumerate(results.pages)]
+    texts = [page.md for page in results.pages]
+    if len(texts) != len(page_indices):
+        logger.warning(f"LlamaParse returned {len(texts)} pages for pages {_page_ranges(page_indices)} of {file_path}")
+    return [
+        ParsedPage(page_number=index + 1, text=texts[i] if i < len(texts) else "", source="llamaparse")
+        for i, index in enumerate(page_indices)
+    ]
+
+
+class ParsedDocument:
+    """
+    Page-aware parse result of one PDF. Iterating it parses the file and
+    yields its pages in order, each as soon as it and all earlier pages
+    are parsed:
+
+        document = ParsedDocument(file_path)
+        async for page in document:
+            ...
+
+    Pages with a usable embedded text layer (born-digital PDFs) are
+    extracted locally with pypdf in a process pool; only scanned or
+    low-quality pages go to LlamaParse, in jobs of at most
+    PARSE_PAGE_BATCH pages that run concurrently within the process-wide
+    parse limit. Each page records its `source`. Parsed pages are kept
+    on `pages`; a document can be iterated only once.
+    """
+
+    def __init__(self, file_path: str, page_batch: int = PARSE_PAGE_BATCH):
+        self.file_path = file_path
+        self.page_batch = page_batch
+        self.pages: List[ParsedPage] = []
+        self.cached = False
+
+    @property
+    def text(self) -> str:
+        """The parsed pages flattened into the text_data format"""
+        return join_pages([page.text for page in self.pages])
+
+    async def _cached_pages(self, cache_key: str) -> Optional[List[ParsedPage]]:
+        raw = await parse_cache.get(cache_key)
+        if raw is None:
+            return None
+        if raw.startswith('{"pages"'):
+            entry = json.loads(raw)
+            texts = entry["pages"]
+            sources = entry.get("sources") or ["llamaparse"] * len(texts)
+        else:
+            # Entries written before pages were kept hold the flattened text
+            texts = split_pages(raw)
+            sources = ["llamaparse"] * len(texts)
+        return [ParsedPage(page_number=i + 1, text=text, source=source) for i, (text, source) in enumerate(zip(texts, sources))]
+
+    def _remote_jobs(self, remote: List[int], page_count: int) -> Dict[int, "asyncio.Future[List[ParsedPage]]"]:
+        """LlamaParse jobs for the pages that need OCR, keyed by each page they cover"""
+        if page_count == 0 or (len(remote) == page_count and page_count <= self.page_batch):
+            # Nothing to cut out: send the file as it is
+            job = asyncio.ensure_future(_parse_pages(self.file_path))
+            return {index: job for index in (remote or [0])}
+        jobs = {}
+        for start in range(0, len(remote), self.page_batch):
+            batch = remote[start:start + self.page_batch]
+            job = asyncio.ensure_future(_parse_pages(self.file_path, batch))
+            jobs.update({index: job for index in batch})
+        return jobs
+
+    async def __aiter__(self) -> AsyncIterator[ParsedPage]:
+        if self.pages:
+            raise RuntimeError(f"{self.file_path} has already been parsed")
+
+        cache_key = None
+        if parse_cache is not None:
+            try:
+                cache_key = await asyncio.to_thread(file_cache_key, self.file_path)
+                cached_pages = await self._cached_pages(cache_key)
+                if cached_pages is not None:
+                    self.cached = True
+                    for page in cached_pages:
+                        self.pages.append(page)
+                        yield page
+                    return
+            except Exception as e:
+                logger.warning(f"Parse cache lookup failed for {self.file_path}: {e}")
+
+        texts = await _text_layer(self.file_path)
+        remote = [index for index, text in enumerate(texts) if text is None]
+        jobs = self._remote_jobs(remote, len(texts)) if remote or not texts else {}
+        logger.info(f"Parsing {self.file_path}: {len(texts) - len(remote)} page(s) from the text layer, "
+                    f"{len(remote) if texts else 'all'} via LlamaParse in {len(set(jobs.values()))} job(s)")
+        try:
+            if not texts:
+                for page in await jobs[0]:
+                    self.pages.append(page)
+                    yield page
+            for index, text in enumerate(texts):
+                if text is not None:
+                    page = ParsedPage(page_number=index + 1, text=text, source="pypdf")
+                else:
+                    job_pages = await jobs[index]
+                    page = next((page for page in job_pages if page.page_number == index + 1), None)
+                    if page is None:
+                        page = ParsedPage(page_number=index + 1, text="", source="llamaparse")
+                self.pages.append(page)
+                yield page
+        finally:
+            for job in jobs.values():
+                job.cancel()
+
+        if cache_key is not None:
+            try:
+                entry = {"pages": [page.text for page in self.pages], "sources": [page.source for page in self.pages]}
+                await parse_cache.set(cache_key, json.dumps(entry, ensure_ascii=False))
+            except Exception as e:
+                logger.warning(f"Parse cache store failed for {self.file_path}: {e}")
+
+
+async def process_pdf_async(file_path, on_page: Optional[Callable[[ParsedPage], Awaitable[None]]] = None) -> dict:
     """
     Async function to process a single PDF file and extract page-wise content.
 
     Args:
         file_path: Single file path as string
+        on_page: Awaited with each page, in order, as soon as it is parsed
 
     Returns:
-        Dictionary containing document and page information
+        Dictionary containing the flattened document text and its pages
     """
+    document = ParsedDocument(file_path)
     try:
-        results = await parser.aparse(file_path)
-        text = ""
-        for page in results.pages:
-            text += page.md + "\n"
-            text += "=" * 80 + "\n"
-        return {"text": text, "status": "success"}
+        async for page in document:
+            if on_page is not None:
+                await on_page(page)
+
+        return {"text": document.text, "pages": document.pages, "status": "success", "cached": document.cached}
 
     except Exception as e:
-        error_result = {"text": "", "status": "error", "error": str(e)}
+        error_result = {"text": "", "pages": [], "status": "error", "error": str(e)}
         return error_result
+
+
+async def process_pdfs_async(file_paths: List[str]) -> List[dict]:
+    """
+    Submit several PDF files for parsing at once.
+
+    Every file goes through process_pdf_async, so the process-wide parse
+    limiter (PARSE_MAX_CONCURRENCY) still bounds the total number of jobs
+    in flight across all cases.
+
+    Args:
+        file_paths: List of file paths
+
+    Returns:
+        One result per input path, in the same order, each with its own
+        "file_path" and "status" ("success" or "error")
+    """
+    results = await asyncio.gather(*(process_pdf_async(file_path) for file_path in file_paths))
+    return [{**result, "file_path": file_path} for file_path, result in zip(file_paths, results)]
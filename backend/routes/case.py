@@ -1,14 +1,19 @@
-from fastapi import APIRouter, HTTPException, File, UploadFile, Form, Depends, BackgroundTasks
-from fastapi.responses import JSONResponse
-from typing import Optional, List
+from fastapi import APIRouter, HTTPException, File, UploadFile, Form, Depends, Query, Header
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import Optional, List, Literal
+from datetime import datetime
 from pydantic import BaseModel
 import json
 import uuid
 import asyncio
 import logging
 
-from supabase_client.supabase_client import SupabaseCaseClient, SupabaseClientError
-from agentic import agentic_process
+from supabase_client.supabase_client import get_supabase_client, SupabaseClientError
+from jobs.queue import get_job_queue, DuplicateJobError
+from jobs.spool import spool_upload, remove_case_spool
+from utils.events import get_event_bus, TERMINAL_STATUSES
+from utils.checkpoints import get_checkpointer
+from config import EVENTS_HEARTBEAT
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -20,7 +25,7 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
-supabase_client = SupabaseCaseClient()
+supabase_client = get_supabase_client()
 
 class CaseCreate(BaseModel):
     patient_name: str
@@ -40,9 +45,41 @@ class AnalysisRequest(BaseModel):
 async def get_current_user_id() -> str:
     return "b8acad4b-4944-4d66-b405-de70886e7248"
 
+
+async def _upload_case_files(case_id: str, files: Optional[List[UploadFile]], category: str, uploaded_files: list) -> list:
+    """Spool and upload a case's files, returning the job payload entry for each"""
+    processed_files = []
+    for file in files or []:
+        if file.filename:
+            file_id = str(uuid.uuid4())
+            # Streamed to disk in chunks; the bytes are never held in memory as a whole
+            file_path, file_size = await spool_upload(case_id, file_id, file)
+            file_data = {
+                "file_id": file_id,
+                "file_name": file.filename,
+                "file_type": file.content_type,
+                "file_size": file_size,
+                "file_url": f"{category}_files/{case_id}/{file.filename}",
+                "file_category": category,
+            }
+            
+            # Upload to storage, streamed from the spooled file
+            file_result = await supabase_client.upload_case_file(
+                file_id = file_id,
+                case_id=case_id,
+                file_data=file_data,
+                file_content=file_path
+            )
+            uploaded_files.append(file_result)
+            
+            # The job payload only carries the spooled path
+            processed_files.append({**file_data, "file_path": file_path})
+    
+    return processed_files
+
+
 @router.post("/create_case")
 async def create_case(
-    background_tasks: BackgroundTasks,
     user_id: str = Form(...),
     patient_name: str = Form(...),
     patient_age: int = Form(...),
@@ -52,10 +89,9 @@ async def create_case(
     radiology_files: Optional[List[UploadFile]] = File(None),
 ):
     """Create a new case for a doctor with optional file uploads."""
+    case_id = str(uuid.uuid4())
+    job_id = None
     try:
-        
-        case_id = str(uuid.uuid4())
-
         result = await supabase_client.create_new_case(
             case_id=case_id,
             user_id=user_id,
@@ -65,51 +101,23 @@ async def create_case(
             case_summary=case_summary,
         )
         
-        # Process all files with a helper function to avoid redundancy
-        async def process_files(files, category):
-            processed_files = []
-            for file in files or []:
-                if file.filename:
-                    file_id = str(uuid.uuid4())
-                    file_content = await file.read()
-                    file_data = {
-                        "file_id": file_id,
-                        "file_name": file.filename,
-                        "file_type": file.content_type,
-                        "file_size": len(file_content),
-                        "file_url": f"{category}_files/{case_id}/{file.filename}",
-                        "file_category": category,
-                    }
-                    
-                    # Upload to storage
-                    file_result = await supabase_client.upload_case_file(
-                        file_id = file_id,
-                        case_id=case_id,
-                        file_data=file_data,
-                        file_content=file_content
-                    )
-                    uploaded_files.append(file_result)
-                    
-                    # Store for background processing (with actual content)
-                    processed_files.append({**file_data, "file_content": file_content})
-            
-            return processed_files
-        
         uploaded_files = []
-        lab_files_data = await process_files(lab_files, "lab")
-        radiology_files_data = await process_files(radiology_files, "radiology")
+        lab_files_data = await _upload_case_files(case_id, lab_files, "lab", uploaded_files)
+        radiology_files_data = await _upload_case_files(case_id, radiology_files, "radiology", uploaded_files)
 
-        # Schedule background task after successful case creation with all parameters including file content
-        background_tasks.add_task(
-            agentic_process,
-            case_id=case_id,
-            user_id=user_id,
-            patient_name=patient_name,
-            patient_age=patient_age,
-            patient_gender=patient_gender,
-            case_summary=case_summary,
-            lab_files=lab_files_data if lab_files_data else None,
-            radiology_files=radiology_files_data if radiology_files_data else None,
+        # Queue the analysis pipeline for a worker (see worker.py)
+        job_id = await get_job_queue().enqueue(
+            "agentic_process",
+            {
+                "case_id": case_id,
+                "user_id": user_id,
+                "patient_name": patient_name,
+                "patient_age": patient_age,
+                "patient_gender": patient_gender,
+                "case_summary": case_summary,
+                "lab_files": lab_files_data if lab_files_data else None,
+                "radiology_files": radiology_files_data if radiology_files_data else None,
+            },
         )
         
         return JSONResponse(
@@ -117,7 +125,8 @@ async def create_case(
             content={
                 "message": "Case created successfully", 
                 "case": result,
-                "uploaded_files": uploaded_files
+                "uploaded_files": uploaded_files,
+                "job_id": job_id
             }
         )
 
@@ -125,17 +134,46 @@ async def create_case(
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+    finally:
+        # Without a job nothing will read the spooled uploads or clean them up
+        if job_id is None:
+            remove_case_spool(case_id)
 
 
 
 @router.get("/all_cases")
-async def get_all_cases(user_id: str):
-    """Get all cases for the authenticated doctor."""
+async def get_all_cases(
+    user_id: str,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    search: Optional[str] = Query(None, max_length=100),
+    min_age: Optional[int] = Query(None, ge=0),
+    max_age: Optional[int] = Query(None, ge=0),
+    view: Literal["list", "full"] = "list",
+):
+    """
+    Get a page of cases for the authenticated doctor, newest first.
+    Pass the returned `next_cursor` as `cursor` to fetch the next page.
+    """
     try:
-        cases = await supabase_client.get_all_cases(user_id=user_id)
+        page = await supabase_client.get_all_cases(
+            user_id=user_id,
+            limit=limit,
+            cursor=cursor,
+            status=status,
+            created_after=created_after,
+            created_before=created_before,
+            search=search,
+            min_age=min_age,
+            max_age=max_age,
+            full=view == "full",
+        )
         return JSONResponse(
             status_code=200,
-            content={"cases": cases}
+            content=page
         )
     except SupabaseClientError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -149,21 +187,206 @@ async def get_case_by_id(
 ):
     """Get a specific case by ID."""
     try:
-        case = await supabase_client.get_case_by_id(case_id=case_id)
-        case_files_data = await supabase_client.get_case_files(case_id=case_id)
-        ai_insights = await supabase_client.get_ai_insights_by_case_id(case_id=case_id)
+        case_detail = await supabase_client.get_case_detail(case_id=case_id)
 
         return JSONResponse(
             status_code=200,
-            content={"case": case, "files": case_files_data, "ai_insights": ai_insights}
+            content=case_detail
+        )
+    except SupabaseClientError as e:
+        if "not found" in str(e).lower():
+            raise HTTPException(status_code=404, detail=str(e))
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+
+def _sse(event: str, data, event_id: Optional[int] = None) -> str:
+    """Format one server-sent event"""
+    lines = [f"id: {event_id}"] if event_id is not None else []
+    lines += [f"event: {event}", f"data: {json.dumps(data, default=str)}"]
+    return "\n".join(lines) + "\n\n"
+
+
+@router.get("/{case_id}/events")
+async def case_events(
+    case_id: str,
+    last_event_id: Optional[str] = Header(None),
+):
+    """
+    Server-sent events stream of a case's pipeline progress.
+
+    Starts with a `snapshot` of the case status, then sends `stage`, `file`,
+    `insights` and `status` events as the pipeline publishes them. The stream
+    ends after a `completed` or `failed` status. Reconnecting clients send
+    Last-Event-ID and get the events they missed.
+    """
+    try:
+        case = await supabase_client.get_case_by_id(case_id=case_id)
+    except SupabaseClientError as e:
+        if "not found" in str(e).lower():
+            raise HTTPException(status_code=404, detail=str(e))
+        raise HTTPException(status_code=400, detail=str(e))
+
+    after_id = int(last_event_id) if last_event_id and last_event_id.isdigit() else 0
+
+    async def stream():
+        yield _sse("snapshot", {"case_id": case_id, "status": case.get("status")})
+        if case.get("status") in TERMINAL_STATUSES:
+            return
+
+        events = get_event_bus().subscribe(case_id, last_event_id=after_id)
+        next_event = None
+        try:
+            while True:
+                if next_event is None:
+                    next_event = asyncio.ensure_future(events.__anext__())
+                done, _ = await asyncio.wait({next_event}, timeout=EVENTS_HEARTBEAT)
+                if not done:
+                    yield ": keep-alive\n\n"
+                    continue
+                try:
+                    case_event = next_event.result()
+                except StopAsyncIteration:
+                    return
+                next_event = None
+                yield _sse(case_event.event, case_event.data, case_event.id)
+        finally:
+            if next_event is not None:
+                next_event.cancel()
+                await asyncio.gather(next_event, return_exceptions=True)
+            await events.aclose()
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _abandon_reservation(case_id: str, job_id: str, previous_status: Optional[str]) -> None:
+    """Undo a re-analysis or resume request that failed before its job was queued"""
+    await get_job_queue().release(job_id)
+    # The reservation kept other runs off the case, so its spool only holds this request's uploads
+    remove_case_spool(case_id)
+    if previous_status is not None:
+        try:
+            await supabase_client.update_case_status(case_id=case_id, status=previous_status)
+        except Exception as e:
+            logger.error(f"Could not restore status of case {case_id}: {e}")
+
+
+@router.post("/{case_id}/reanalyze")
+async def reanalyze_case(
+    case_id: str,
+    case_summary: Optional[str] = Form(None),
+    lab_files: Optional[List[UploadFile]] = File(None),
+    radiology_files: Optional[List[UploadFile]] = File(None),
+):
+    """
+    Add files to a case and/or replace its doctor's notes, then re-run the
+    analysis. Only the new files are parsed and analyzed; workflow nodes whose
+    inputs did not change reuse their previous output.
+    """
+    queue = get_job_queue()
+    job_id = None
+    previous_status = None
+    queued = False
+    try:
+        case = await supabase_client.get_case_by_id(case_id=case_id)
+        # Taken before the case is touched: a concurrent request gets a 409, not a second run
+        job_id = await queue.reserve("agentic_process", case_id)
+        if case_summary is not None:
+            case = await supabase_client.update_case_summary(case_id=case_id, case_summary=case_summary)
+
+        uploaded_files = []
+        lab_files_data = await _upload_case_files(case_id, lab_files, "lab", uploaded_files)
+        radiology_files_data = await _upload_case_files(case_id, radiology_files, "radiology", uploaded_files)
+
+        previous_status = case.get("status")
+        await supabase_client.update_case_status(case_id=case_id, status="processing")
+        # Marks the end of the previous run for event subscribers
+        await get_event_bus().publish(case_id, "status", {"status": "processing"})
+        await queue.activate(
+            job_id,
+            {
+                "case_id": case_id,
+                "user_id": case.get("doctor_id"),
+                "patient_name": case.get("patient_name"),
+                "patient_age": case.get("patient_age"),
+                "patient_gender": case.get("patient_gender"),
+                "case_summary": case.get("case_summary"),
+                "lab_files": lab_files_data if lab_files_data else None,
+                "radiology_files": radiology_files_data if radiology_files_data else None,
+            },
         )
+        queued = True
+
+        return JSONResponse(
+            status_code=202,
+            content={
+                "message": "Case re-analysis queued",
+                "uploaded_files": uploaded_files,
+                "job_id": job_id
+            }
+        )
+
+    except HTTPException:
+        raise
+    except DuplicateJobError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except SupabaseClientError as e:
         if "not found" in str(e).lower():
             raise HTTPException(status_code=404, detail=str(e))
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+    finally:
+        if job_id is not None and not queued:
+            await _abandon_reservation(case_id, job_id, previous_status)
+
+@router.post("/{case_id}/resume")
+async def resume_case(case_id: str):
+    """Resume a failed or interrupted analysis from its last completed workflow step."""
+    queue = get_job_queue()
+    job_id = None
+    previous_status = None
+    queued = False
+    try:
+        case = await supabase_client.get_case_by_id(case_id=case_id)
+        # A run in flight has a checkpoint too; it must not get a second writer
+        job_id = await queue.reserve("resume_analysis", case_id)
+
+        # Runs that finish delete their checkpoints, so with no other job for the case any left over is unfinished
+        checkpointer = get_checkpointer()
+        checkpoint = await checkpointer.aget_tuple({"configurable": {"thread_id": case_id}}) if checkpointer else None
+        if checkpoint is None:
+            raise HTTPException(status_code=409, detail="No unfinished analysis to resume for this case")
 
+        previous_status = case.get("status")
+        await supabase_client.update_case_status(case_id=case_id, status="processing")
+        await get_event_bus().publish(case_id, "status", {"status": "processing"})
+        await queue.activate(job_id, {"case_id": case_id})
+        queued = True
+
+        return JSONResponse(
+            status_code=202,
+            content={"message": "Case analysis resume queued", "job_id": job_id}
+        )
+
+    except HTTPException:
+        raise
+    except DuplicateJobError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except SupabaseClientError as e:
+        if "not found" in str(e).lower():
+            raise HTTPException(status_code=404, detail=str(e))
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+    finally:
+        if job_id is not None and not queued:
+            await _abandon_reservation(case_id, job_id, previous_status)
 
 # I'll Later finish these routes. Below are incomplete routes.
 
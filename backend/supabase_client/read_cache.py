@@ -0,0 +1,131 @@
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+from cachetools import TTLCache
+
+from config import (
+    SUPABASE_CACHE_ENABLED, SUPABASE_CACHE_BACKEND, SUPABASE_CACHE_TTL,
+    SUPABASE_CACHE_MAX_ENTRIES, SUPABASE_CACHE_PATH, SUPABASE_CACHE_MAX_BYTES
+)
+from utils.disk_cache import SQLiteCache
+
+logger = logging.getLogger(__name__)
+
+
+class ReadThroughCache:
+    """
+    Read-through cache of Supabase rows, keyed by "<kind>:<id>".
+
+    Values are stored as JSON, so every caller gets its own copy. Entries live
+    in an in-process LRU with TTL, or, when `shared` is given, only in that
+    SQLiteCache so invalidations made by one worker process are seen by all
+    others on the host.
+
+    Concurrent misses for the same key share one load. A key invalidated
+    while its load is in flight is not stored, so a read that raced a write
+    cannot put the pre-write row back into the cache.
+    """
+
+    def __init__(self, max_entries: int, ttl: float, shared: Optional[SQLiteCache] = None):
+        self.memory = TTLCache(maxsize=max_entries, ttl=ttl) if shared is None else None
+        self.shared = shared
+        self.invalidations = 0
+        self.counters: Dict[str, Dict[str, int]] = defaultdict(lambda: {"hits": 0, "misses": 0, "coalesced": 0})
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._stale: Set[str] = set()
+
+    async def _get(self, key: str) -> Optional[str]:
+        if self.shared is None:
+            return self.memory.get(key)
+        try:
+            return await self.shared.get(key)
+        except Exception as e:
+            logger.warning(f"Supabase cache lookup failed: {e}")
+            return None
+
+    async def _set(self, key: str, raw: str) -> None:
+        if self.shared is None:
+            self.memory[key] = raw
+            return
+        try:
+            await self.shared.set(key, raw)
+        except Exception as e:
+            logger.warning(f"Supabase cache store failed: {e}")
+
+    async def _load(self, key: str, loader: Callable[[], Awaitable[Any]]) -> str:
+        try:
+            raw = json.dumps(await loader(), default=str)
+            if key not in self._stale:
+                await self._set(key, raw)
+            return raw
+        finally:
+            self._inflight.pop(key, None)
+            self._stale.discard(key)
+
+    async def get_or_load(self, kind: str, key_id: Any, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the cached value for kind:key_id, calling `loader` on a miss. Errors are not cached."""
+        key = f"{kind}:{key_id}"
+        raw = await self._get(key)
+        if raw is not None:
+            self.counters[kind]["hits"] += 1
+            return json.loads(raw)
+
+        load = self._inflight.get(key)
+        if load is None:
+            self.counters[kind]["misses"] += 1
+            load = asyncio.ensure_future(self._load(key, loader))
+            self._inflight[key] = load
+        else:
+            self.counters[kind]["coalesced"] += 1
+        # Shielded so one cancelled caller doesn't cancel the load for the others
+        return json.loads(await asyncio.shield(load))
+
+    async def invalidate(self, *keys: str) -> None:
+        """Drop "<kind>:<id>" keys after a write touching them."""
+        for key in keys:
+            self.invalidations += 1
+            if key in self._inflight:
+                self._stale.add(key)
+            if self.shared is None:
+                self.memory.pop(key, None)
+                continue
+            try:
+                await self.shared.delete(key)
+            except Exception as e:
+                logger.warning(f"Supabase cache invalidation failed: {e}")
+
+    async def stats(self) -> Dict[str, Any]:
+        hits = sum(counts["hits"] for counts in self.counters.values())
+        lookups = hits + sum(counts["misses"] for counts in self.counters.values())
+        return {
+            "backend": "memory" if self.shared is None else "sqlite",
+            "memory_entries": len(self.memory) if self.memory is not None else None,
+            "shared": await self.shared.stats() if self.shared is not None else None,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "kinds": {kind: dict(counts) for kind, counts in self.counters.items()},
+        }
+
+    async def close(self) -> None:
+        if self.shared is not None:
+            await self.shared.close()
+
+
+_read_cache: Optional[ReadThroughCache] = None
+
+
+def get_read_cache() -> Optional[ReadThroughCache]:
+    """Return the process-wide Supabase read cache, or None when disabled."""
+    global _read_cache
+    if SUPABASE_CACHE_ENABLED and _read_cache is None:
+        if SUPABASE_CACHE_BACKEND not in ("memory", "sqlite"):
+            raise ValueError(f"Unsupported SUPABASE_CACHE_BACKEND: {SUPABASE_CACHE_BACKEND}")
+        shared = (
+            SQLiteCache(SUPABASE_CACHE_PATH, max_bytes=SUPABASE_CACHE_MAX_BYTES, ttl=SUPABASE_CACHE_TTL)
+            if SUPABASE_CACHE_BACKEND == "sqlite" else None
+        )
+        _read_cache = ReadThroughCache(max_entries=SUPABASE_CACHE_MAX_ENTRIES, ttl=SUPABASE_CACHE_TTL, shared=shared)
+    return _read_cache
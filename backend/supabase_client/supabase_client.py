@@ -1,11 +1,21 @@
-from typing import Optional, Dict, List, Union, Any
+from typing import Optional, Dict, List, Union, Any, Tuple
 import os, json
+import asyncio
+import base64
+import functools
+import inspect
 import uuid
-from supabase import create_client, Client
+import httpx
+from supabase import AsyncClient, AsyncClientOptions
+from postgrest.exceptions import APIError
 from datetime import datetime
 import pytz
 
-from config import SUPABASE_SERVICE_ROLE_KEY, SUPABASE_URL
+from config import (
+    SUPABASE_SERVICE_ROLE_KEY, SUPABASE_URL, SUPABASE_MAX_CONNECTIONS,
+    SUPABASE_MAX_KEEPALIVE_CONNECTIONS, SUPABASE_KEEPALIVE_EXPIRY, SUPABASE_TIMEOUT
+)
+from supabase_client.read_cache import ReadThroughCache, get_read_cache
 import logging
 
 # Simple logger setup
@@ -25,6 +35,83 @@ class UserNotVerifiedError(SupabaseClientError):
 
             
 
+def _pooled_http_client() -> httpx.AsyncClient:
+    """HTTP/2 client with the connection pool limits from config"""
+    return httpx.AsyncClient(
+        http2=True,
+        follow_redirects=True,
+        timeout=SUPABASE_TIMEOUT,
+        limits=httpx.Limits(
+            max_connections=SUPABASE_MAX_CONNECTIONS,
+            max_keepalive_connections=SUPABASE_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=SUPABASE_KEEPALIVE_EXPIRY,
+        ),
+    )
+
+
+# ai_insights columns holding differential diagnoses and recommendations;
+# older schemas may not have them yet
+INSIGHTS_OPTIONAL_FIELDS = ("differential_diagnoses", "investigation_recommendations", "treatment_recommendations")
+
+# ai_insights columns stored as JSON strings
+INSIGHTS_JSON_FIELDS = ("key_findings", "patient_context", "supporting_evidence") + INSIGHTS_OPTIONAL_FIELDS
+
+
+def _decode_insights(insights: Dict[str, Any]) -> Dict[str, Any]:
+    """Parse the JSON-string columns of an ai_insights row in place."""
+    for field in INSIGHTS_JSON_FIELDS:
+        if isinstance(insights.get(field), str) and insights[field]:
+            insights[field] = json.loads(insights[field])
+    return insights
+
+
+# Columns returned by case listings. The long case_summary is replaced by a
+# case_summary_preview of at most CASE_SUMMARY_PREVIEW_CHARS characters.
+CASE_LIST_COLUMNS = "id, case_id, doctor_id, patient_name, patient_age, patient_gender, status, created_at, updated_at"
+CASE_SUMMARY_PREVIEW_CHARS = 120
+MAX_CASES_PAGE_SIZE = 200
+
+
+def _summary_preview(case: Dict[str, Any]) -> Dict[str, Any]:
+    summary = case.pop("case_summary", None)
+    case["case_summary_preview"] = summary[:CASE_SUMMARY_PREVIEW_CHARS] if summary else None
+    return case
+
+
+def _search_pattern(search: str) -> str:
+    """Quoted PostgREST ilike pattern; characters that would break the quoting are dropped"""
+    term = search.replace('"', "").replace("\\", "").strip()
+    return f'"*{term}*"'
+
+
+def encode_case_cursor(created_at: str, case_id: str) -> str:
+    """Opaque keyset cursor pointing just after the given case."""
+    return base64.urlsafe_b64encode(json.dumps([created_at, case_id]).encode("utf-8")).decode("ascii")
+
+
+def decode_case_cursor(cursor: str) -> Tuple[str, str]:
+    try:
+        created_at, case_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return str(created_at), str(case_id)
+    except Exception:
+        raise SupabaseClientError("Invalid cursor")
+
+
+def _read_through(kind: str, key_arg: str):
+    """Serve the decorated read from the client's read cache, keyed on `key_arg`."""
+    def decorator(method):
+        signature = inspect.signature(method)
+
+        @functools.wraps(method)
+        async def wrapper(self, *args, **kwargs):
+            if self.cache is None:
+                return await method(self, *args, **kwargs)
+            key_id = signature.bind(self, *args, **kwargs).arguments[key_arg]
+            return await self.cache.get_or_load(kind, key_id, lambda: method(self, *args, **kwargs))
+        return wrapper
+    return decorator
+
+
 class SupabaseCaseClient:
     """Client for interacting with Supabase cases."""
     
@@ -32,6 +119,7 @@ class SupabaseCaseClient:
         self,
         url: Optional[str] = None,
         key: Optional[str] = None,
+        cache: Optional[ReadThroughCache] = None,
     ):
         """
         Initialize the Supabase Case Client.
@@ -39,6 +127,7 @@ class SupabaseCaseClient:
         Args:
             url (Optional[str]): Supabase URL. Defaults to SUPABASE_URL environment variable.
             key (Optional[str]): Supabase service role key. Defaults to SUPABASE_SERVICE_ROLE_KEY environment variable.
+            cache (Optional[ReadThroughCache]): Cache for case, file and insight reads. Defaults to the process-wide one (None when disabled).
 
         Raises:
             ValueError: If URL or key is not provided and not found in environment variables.
@@ -52,7 +141,51 @@ class SupabaseCaseClient:
                 "(SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY)"
             )
 
-        self.supabase: Client = create_client(self.url, self.key)
+        self.supabase: AsyncClient = AsyncClient(self.url, self.key, AsyncClientOptions())
+
+        # PostgREST and Storage each get their own pooled client: the
+        # supabase library rebinds base_url on a shared httpx client, so one
+        # client cannot serve both.
+        self._http_clients = [_pooled_http_client(), _pooled_http_client()]
+        self.supabase._postgrest = AsyncClient._init_postgrest_client(
+            rest_url=self.supabase.rest_url,
+            headers=self.supabase.options.headers,
+            schema=self.supabase.options.schema,
+            http_client=self._http_clients[0],
+        )
+        self.supabase._storage = AsyncClient._init_storage_client(
+            storage_url=self.supabase.storage_url,
+            headers=self.supabase.options.headers,
+            http_client=self._http_clients[1],
+        )
+
+        # Cleared if the schema has no FK relationships to embed case_files/ai_insights
+        self._embedded_case_detail = True
+        # Cleared if ai_insights lacks the INSIGHTS_OPTIONAL_FIELDS columns
+        self._insights_optional_fields = True
+
+        self.cache = cache or get_read_cache()
+
+    async def aclose(self) -> None:
+        """Close the pooled HTTP connections."""
+        for http_client in self._http_clients:
+            await http_client.aclose()
+        if self.cache is not None:
+            await self.cache.close()
+
+    async def _invalidate_case(self, case_id: Any, *kinds: str) -> None:
+        """Drop the cached reads of a case after a write (case detail always included)."""
+        if self.cache is not None:
+            await self.cache.invalidate(f"detail:{case_id}", *(f"{kind}:{case_id}" for kind in kinds))
+
+    async def _invalidate_files(self, file_records: List[Dict[str, Any]]) -> None:
+        """Drop the cached reads touched by writes to these case_files rows."""
+        if self.cache is None:
+            return
+        keys = set()
+        for record in file_records:
+            keys.update((f"files:{record.get('case_id')}", f"detail:{record.get('case_id')}", f"file:{record.get('id')}"))
+        await self.cache.invalidate(*keys)
 
 
     async def create_new_case(self, case_id: str, user_id: str, patient_name: str,  patient_age: int, patient_gender: str, case_summary: str = None) -> Dict[str, Any]:
@@ -85,7 +218,7 @@ class SupabaseCaseClient:
             }
 
             insert_response = (
-                self.supabase.table("cases").insert(case_data).execute()
+                await self.supabase.table("cases").insert(case_data).execute()
             )
 
             response_data = insert_response.model_dump().get("data", [])
@@ -97,34 +230,93 @@ class SupabaseCaseClient:
         except Exception as e:
             raise SupabaseClientError(f"Error creating case: {str(e)}")
 
-    async def get_all_cases(self, user_id: str) -> List[Dict[str, Any]]:
+    async def get_all_cases(
+        self,
+        user_id: str,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        status: Optional[str] = None,
+        created_after: Optional[datetime] = None,
+        created_before: Optional[datetime] = None,
+        search: Optional[str] = None,
+        min_age: Optional[int] = None,
+        max_age: Optional[int] = None,
+        full: bool = False,
+    ) -> Dict[str, Any]:
         """
-        Get all cases for a doctor.
+        Get one page of a doctor's cases, newest first.
+
+        Pages are keyed on (created_at, case_id), so each page is an index
+        range scan no matter how deep the doctor pages.
 
         Args:
             user_id (str): The ID of the doctor.
+            limit (int): Page size, capped at MAX_CASES_PAGE_SIZE.
+            cursor (Optional[str]): `next_cursor` from the previous page.
+            status (Optional[str]): Only return cases with this status.
+            created_after (Optional[datetime]): Only cases created at or after this time.
+            created_before (Optional[datetime]): Only cases created before this time.
+            search (Optional[str]): Case-insensitive match on patient name or case summary.
+            min_age (Optional[int]): Only patients at least this old.
+            max_age (Optional[int]): Only patients at most this old.
+            full (bool): Return every column instead of the list projection
+                (list columns plus case_summary_preview).
 
         Returns:
-            List[Dict[str, Any]]: List of cases belonging to the doctor.
+            Dict[str, Any]: {"cases": [...], "next_cursor": str or None}
 
         Raises:
             SupabaseClientError: If there's an error retrieving cases.
         """
+        limit = max(1, min(limit, MAX_CASES_PAGE_SIZE))
         try:
-            result = (
+            query = (
                 self.supabase.table("cases")
-                .select("*")
+                .select("*" if full else f"{CASE_LIST_COLUMNS}, case_summary")
                 .eq("doctor_id", user_id)
-                .order("created_at", desc=True)
+            )
+            if status:
+                query = query.eq("status", status)
+            if search and search.strip():
+                pattern = _search_pattern(search)
+                query = query.or_(f"patient_name.ilike.{pattern},case_summary.ilike.{pattern}")
+            if min_age is not None:
+                query = query.gte("patient_age", min_age)
+            if max_age is not None:
+                query = query.lte("patient_age", max_age)
+            if created_after:
+                query = query.gte("created_at", created_after.isoformat())
+            if created_before:
+                query = query.lt("created_at", created_before.isoformat())
+            if cursor:
+                cursor_created_at, cursor_case_id = decode_case_cursor(cursor)
+                query = query.or_(
+                    f'created_at.lt."{cursor_created_at}",'
+                    f'and(created_at.eq."{cursor_created_at}",case_id.lt."{cursor_case_id}")'
+                )
+
+            result = await (
+                query.order("created_at", desc=True)
+                .order("case_id", desc=True)
+                .limit(limit + 1)
                 .execute()
             )
 
             data = result.model_dump().get("data", [])
-            return data
-
+            next_cursor = None
+            if len(data) > limit:
+                data = data[:limit]
+                next_cursor = encode_case_cursor(data[-1]["created_at"], data[-1]["case_id"])
+            if not full:
+                data = [_summary_preview(case) for case in data]
+            return {"cases": data, "next_cursor": next_cursor}
+
+        except SupabaseClientError:
+            raise
         except Exception as e:
             raise SupabaseClientError(f"Error retrieving cases: {str(e)}")
 
+    @_read_through("case", "case_id")
     async def get_case_by_id(self, case_id: str) -> Dict[str, Any]:
         """
         Get a specific case by ID.
@@ -141,7 +333,7 @@ class SupabaseCaseClient:
         """
         try:
             result = (
-                self.supabase.table("cases")
+                await self.supabase.table("cases")
                 .select("*")
                 .eq("case_id", case_id)
                 .execute()
@@ -169,8 +361,9 @@ class SupabaseCaseClient:
         """
         try:
             update_response = (
-                self.supabase.table("cases").update({"status": status}).eq("case_id", case_id).execute()
+                await self.supabase.table("cases").update({"status": status}).eq("case_id", case_id).execute()
             )
+            await self._invalidate_case(case_id, "case")
             response_data = update_response.model_dump().get("data", [])
             
             if response_data:
@@ -182,6 +375,34 @@ class SupabaseCaseClient:
 
 
 
+    async def update_case_summary(self, case_id: str, case_summary: Optional[str]) -> Dict[str, Any]:
+        """
+        Replace the doctor's notes of a case.
+
+        Args:
+            case_id (str): The ID of the case to update.
+            case_summary (Optional[str]): The new notes.
+
+        Returns:
+            Dict[str, Any]: The updated case data.
+        """
+        try:
+            update_response = (
+                await self.supabase.table("cases")
+                .update({"case_summary": case_summary, "updated_at": datetime.now(pytz.UTC).isoformat()})
+                .eq("case_id", case_id)
+                .execute()
+            )
+            await self._invalidate_case(case_id, "case")
+            response_data = update_response.model_dump().get("data", [])
+
+            if response_data:
+                return response_data[0]
+            else:
+                raise SupabaseClientError("Failed to update case summary")
+        except Exception as e:
+            raise SupabaseClientError(f"Error updating case summary: {str(e)}")
+
     async def upload_case_file(self, file_id: str, case_id: int, file_data: Dict[str, Any], file_content) -> Dict[str, Any]:
         """
         Upload a file for a case.
@@ -189,6 +410,7 @@ class SupabaseCaseClient:
         Args:
             case_id (int): The ID of the case to upload file for.
             file_data (Dict[str, Any]): File data including name, type, size, url, etc.
+            file_content: File bytes, or the path of a local file to stream from.
 
         Returns:
             Dict[str, Any]: The uploaded file record.
@@ -198,9 +420,14 @@ class SupabaseCaseClient:
         """
         try:
             logger.info(f"Uploading file: {file_data.get('file_url')}")
-            results = self.supabase.storage.from_('labdocs').upload(file_data.get('file_url'), file=file_content)
+            if isinstance(file_content, (str, os.PathLike)):
+                # Let the HTTP client stream the file instead of loading it into memory
+                with open(file_content, "rb") as f:
+                    results = await self.supabase.storage.from_('labdocs').upload(file_data.get('file_url'), file=f)
+            else:
+                results = await self.supabase.storage.from_('labdocs').upload(file_data.get('file_url'), file=file_content)
             
-            public_url = self.supabase.storage.from_('labdocs').get_public_url(file_data.get('file_url'))
+            public_url = await self.supabase.storage.from_('labdocs').get_public_url(file_data.get('file_url'))
             file_record = {
                 "file_id": file_id,
                 "case_id": case_id,
@@ -213,8 +440,9 @@ class SupabaseCaseClient:
             }
             
             insert_response = (
-                self.supabase.table("case_files").insert(file_record).execute()
+                await self.supabase.table("case_files").insert(file_record).execute()
             )
+            await self._invalidate_case(case_id, "files")
 
             response_data = insert_response.model_dump().get("data", [])
             if response_data:
@@ -225,6 +453,7 @@ class SupabaseCaseClient:
         except Exception as e:
             raise SupabaseClientError(f"Error uploading file: {str(e)}")
 
+    @_read_through("files", "case_id")
     async def get_case_files(self, case_id: int) -> List[Dict[str, Any]]:
         """
         Get all files for a case.
@@ -240,7 +469,7 @@ class SupabaseCaseClient:
         """
         try:
             result = (
-                self.supabase.table("case_files")
+                await self.supabase.table("case_files")
                 .select("*")
                 .eq("case_id", case_id)
                 .execute()
@@ -268,12 +497,13 @@ class SupabaseCaseClient:
         """
         try:
             update_response = (
-                self.supabase.table("case_files")
+                await self.supabase.table("case_files")
                 .update(metadata)
                 .eq("file_id", file_id)
                 .execute()
             )
             response_data = update_response.model_dump().get("data", [])
+            await self._invalidate_files(response_data)
             if response_data:
                 return response_data[0]
             else:
@@ -284,6 +514,39 @@ class SupabaseCaseClient:
 
     
 
+    async def upsert_case_files(self, file_records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Write several case file records back in a single request.
+
+        Records must be complete rows (as returned by get_case_files) so the
+        upsert only ever resolves to an update of the existing file.
+
+        Args:
+            file_records (List[Dict[str, Any]]): Full file records with updated fields.
+
+        Returns:
+            List[Dict[str, Any]]: The updated file records.
+
+        Raises:
+            SupabaseClientError: If there's an error writing the records.
+        """
+        if not file_records:
+            return []
+
+        try:
+            upsert_response = (
+                await self.supabase.table("case_files")
+                .upsert(file_records, on_conflict="file_id")
+                .execute()
+            )
+            response_data = upsert_response.model_dump().get("data", [])
+            await self._invalidate_files(file_records + response_data)
+            return response_data
+
+        except Exception as e:
+            raise SupabaseClientError(f"Error updating case files: {str(e)}")
+
+    @_read_through("file", "file_id")
     async def get_file_by_id(self, file_id: int) -> Dict[str, Any]:
         """
         Get a specific file by ID.
@@ -299,7 +562,7 @@ class SupabaseCaseClient:
         """
         try:
             result = (
-                self.supabase.table("case_files")
+                await self.supabase.table("case_files")
                 .select("*")
                 .eq("id", file_id)
                 .execute()
@@ -330,12 +593,13 @@ class SupabaseCaseClient:
         """
         try:
             delete_response = (
-                self.supabase.table("case_files")
+                await self.supabase.table("case_files")
                 .delete()
                 .eq("case_id", case_id)
                 .eq("id", file_id)
                 .execute()
             )
+            await self._invalidate_files([{"case_id": case_id, "id": file_id}])
 
             if delete_response.model_dump().get("data", []):
                 return True
@@ -345,7 +609,72 @@ class SupabaseCaseClient:
         except Exception as e:
             raise SupabaseClientError(f"Error deleting file: {str(e)}")
 
-   
+    async def replace_file_pages(self, file_id: str, pages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Store the parsed text of a file page by page, replacing any pages
+        stored by an earlier parse of the same file.
+
+        Args:
+            file_id (str): The file_id of the case file.
+            pages (List[Dict[str, Any]]): Pages with "page_number" (1-based) and "text".
+
+        Returns:
+            List[Dict[str, Any]]: The stored page records.
+
+        Raises:
+            SupabaseClientError: If there's an error storing the pages.
+        """
+        try:
+            records = [{**page, "file_id": file_id} for page in pages]
+            response_data = []
+            if records:
+                upsert_response = (
+                    await self.supabase.table("case_file_pages")
+                    .upsert(records, on_conflict="file_id,page_number")
+                    .execute()
+                )
+                response_data = upsert_response.model_dump().get("data", [])
+            await (
+                self.supabase.table("case_file_pages")
+                .delete()
+                .eq("file_id", file_id)
+                .gt("page_number", len(records))
+                .execute()
+            )
+            return response_data
+
+        except Exception as e:
+            raise SupabaseClientError(f"Error storing file pages: {str(e)}")
+
+    async def get_file_pages(self, file_id: str, page_numbers: Optional[List[int]] = None) -> List[Dict[str, Any]]:
+        """
+        Get the parsed text of a file's pages, in page order.
+
+        Args:
+            file_id (str): The file_id of the case file.
+            page_numbers (Optional[List[int]]): 1-based pages to fetch; all pages if omitted.
+
+        Returns:
+            List[Dict[str, Any]]: Page records with "page_number" and "text".
+
+        Raises:
+            SupabaseClientError: If there's an error retrieving the pages.
+        """
+        try:
+            query = (
+                self.supabase.table("case_file_pages")
+                .select("page_number, text")
+                .eq("file_id", file_id)
+            )
+            if page_numbers is not None:
+                query = query.in_("page_number", page_numbers)
+            result = await query.order("page_number").execute()
+            return result.model_dump().get("data", [])
+
+        except Exception as e:
+            raise SupabaseClientError(f"Error retrieving file pages: {str(e)}")
+
+
     # AI insights part 
 
     async def upload_ai_insights(self, case_id: str, insights: Dict[str, Any]) -> Dict[str, Any]:
@@ -396,6 +725,9 @@ class SupabaseCaseClient:
                 "diagnosis_confidence_score": primary_diagnosis.get("confidence_score"),
                 "supporting_evidence": json.dumps(primary_diagnosis.get("supporting_evidence", [])),
                 
+                # Differential diagnoses and recommendations
+                **{field: json.dumps(insights.get(field) or [], default=str) for field in INSIGHTS_OPTIONAL_FIELDS},
+                
                 # Overall metrics
                 "overall_confidence_score": insights.get("overall_confidence_score"),
                 
@@ -405,10 +737,27 @@ class SupabaseCaseClient:
                 "updated_at": datetime.now(pytz.UTC).isoformat(),
             }
             
+            if not self._insights_optional_fields:
+                for field in INSIGHTS_OPTIONAL_FIELDS:
+                    insights_record.pop(field)
+
             # Insert the insights record
-            insert_response = (
-                self.supabase.table("ai_insights").insert(insights_record).execute()
-            )
+            try:
+                insert_response = (
+                    await self.supabase.table("ai_insights").insert(insights_record).execute()
+                )
+            except APIError as e:
+                # PGRST204: column not found in the schema cache
+                if e.code != "PGRST204" or not self._insights_optional_fields:
+                    raise
+                logger.warning(f"ai_insights has no differential/recommendation columns, saving without them: {e.message}")
+                self._insights_optional_fields = False
+                for field in INSIGHTS_OPTIONAL_FIELDS:
+                    insights_record.pop(field)
+                insert_response = (
+                    await self.supabase.table("ai_insights").insert(insights_record).execute()
+                )
+            await self._invalidate_case(case_id, "insights")
 
             response_data = insert_response.model_dump().get("data", [])
             if response_data:
@@ -421,6 +770,7 @@ class SupabaseCaseClient:
             logger.error(f"Error uploading AI insights for case {case_id}: {str(e)}")
             raise SupabaseClientError(f"Error uploading AI insights: {str(e)}")
 
+    @_read_through("insights", "case_id")
     async def get_ai_insights_by_case_id(self, case_id: str) -> Dict[str, Any]:
         """
         Get AI insights for a specific case.
@@ -436,7 +786,7 @@ class SupabaseCaseClient:
         """
         try:
             result = (
-                self.supabase.table("ai_insights")
+                await self.supabase.table("ai_insights")
                 .select("*")
                 .eq("case_id", case_id)
                 .order("created_at", desc=True)
@@ -449,19 +799,64 @@ class SupabaseCaseClient:
                 raise SupabaseClientError(f"AI insights for case {case_id} not found")
 
             # Parse JSON fields back to objects
-            insights = data[0]
-            if insights.get("key_findings"):
-                insights["key_findings"] = json.loads(insights["key_findings"])
-            if insights.get("patient_context"):
-                insights["patient_context"] = json.loads(insights["patient_context"])
-            if insights.get("supporting_evidence"):
-                insights["supporting_evidence"] = json.loads(insights["supporting_evidence"])
-
-            return insights
+            return _decode_insights(data[0])
 
         except Exception as e:
             raise SupabaseClientError(f"Error retrieving AI insights: {str(e)}")
 
+    @_read_through("detail", "case_id")
+    async def get_case_detail(self, case_id: str) -> Dict[str, Any]:
+        """
+        Get a case together with its files and latest AI insights.
+
+        Uses a single PostgREST select that embeds case_files and ai_insights.
+        If the schema has no foreign keys to embed through, falls back to
+        fetching the three concurrently.
+
+        Args:
+            case_id (str): The ID of the case to retrieve.
+
+        Returns:
+            Dict[str, Any]: {"case": ..., "files": [...], "ai_insights": ...}
+
+        Raises:
+            SupabaseClientError: If the case or its insights are not found, or on query errors.
+        """
+        if self._embedded_case_detail:
+            try:
+                result = (
+                    await self.supabase.table("cases")
+                    .select("*, case_files(*), ai_insights(*)")
+                    .eq("case_id", case_id)
+                    .order("created_at", desc=True, foreign_table="ai_insights")
+                    .limit(1, foreign_table="ai_insights")
+                    .execute()
+                )
+            except APIError as e:
+                # PGRST200: no relationship found between the tables
+                if e.code != "PGRST200":
+                    raise SupabaseClientError(f"Error retrieving case: {str(e)}")
+                logger.warning(f"Embedded case detail select unavailable, using concurrent fetches: {e.message}")
+                self._embedded_case_detail = False
+            else:
+                data = result.model_dump().get("data", [])
+                if not data:
+                    raise SupabaseClientError(f"Case with ID {case_id} not found")
+
+                case = data[0]
+                files = case.pop("case_files", None) or []
+                insights = case.pop("ai_insights", None) or []
+                if not insights:
+                    raise SupabaseClientError(f"Error retrieving AI insights: AI insights for case {case_id} not found")
+                return {"case": case, "files": files, "ai_insights": _decode_insights(insights[0])}
+
+        case, files, insights = await asyncio.gather(
+            self.get_case_by_id(case_id=case_id),
+            self.get_case_files(case_id=case_id),
+            self.get_ai_insights_by_case_id(case_id=case_id),
+        )
+        return {"case": case, "files": files, "ai_insights": insights}
+
     async def update_ai_insights(self, case_id: str, insights: Dict[str, Any]) -> Dict[str, Any]:
         """
         Update AI insights for a case (if insights already exist).
@@ -506,11 +901,12 @@ class SupabaseCaseClient:
             }
             
             update_response = (
-                self.supabase.table("ai_insights")
+                await self.supabase.table("ai_insights")
                 .update(update_data)
                 .eq("case_id", case_id)
                 .execute()
             )
+            await self._invalidate_case(case_id, "insights")
             
             response_data = update_response.model_dump().get("data", [])
             if response_data:
@@ -520,3 +916,20 @@ class SupabaseCaseClient:
 
         except Exception as e:
             raise SupabaseClientError(f"Error updating AI insights: {str(e)}")
+
+
+_shared_client: Optional[SupabaseCaseClient] = None
+
+
+def get_supabase_client() -> SupabaseCaseClient:
+    """Return the process-wide SupabaseCaseClient, creating it on first use."""
+    global _shared_client
+    if _shared_client is None:
+        _shared_client = SupabaseCaseClient()
+    return _shared_client
+
+
+async def close_supabase_client() -> None:
+    """Close the process-wide client's connections; called once on shutdown."""
+    if _shared_client is not None:
+        await _shared_client.aclose()
@@ -0,0 +1,132 @@
+import asyncio
+import os
+import time
+from typing import Any, Dict, Optional
+
+import aiosqlite
+
+
+class SQLiteCache:
+    """
+    Persistent string cache backed by a local SQLite file.
+
+    Entries are evicted least-recently-used first once the total stored size
+    exceeds `max_bytes`. An optional `ttl` (seconds) expires entries on read.
+    """
+
+    def __init__(self, path: str, max_bytes: int, ttl: Optional[float] = None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._db: Optional[aiosqlite.Connection] = None
+        self._lock = asyncio.Lock()
+
+    async def _connect(self) -> aiosqlite.Connection:
+        if self._db is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = aiosqlite.connect(self.path)
+            # Don't let a cache that was never closed keep the process alive
+            connection.daemon = True
+            db = await connection
+            await db.execute("PRAGMA journal_mode=WAL")
+            await db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+                """
+            )
+            await db.execute("CREATE INDEX IF NOT EXISTS idx_entries_last_access ON entries(last_access)")
+            await db.commit()
+            self._db = db
+        return self._db
+
+    async def get(self, key: str) -> Optional[str]:
+        """Return the cached value for `key`, or None on a miss."""
+        async with self._lock:
+            db = await self._connect()
+            async with db.execute("SELECT value, created_at FROM entries WHERE key = ?", (key,)) as cursor:
+                row = await cursor.fetchone()
+
+            now = time.time()
+            if row is None or (self.ttl is not None and now - row[1] > self.ttl):
+                if row is not None:
+                    await db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                    await db.commit()
+                self.misses += 1
+                return None
+
+            await db.execute("UPDATE entries SET last_access = ? WHERE key = ?", (now, key))
+            await db.commit()
+            self.hits += 1
+            return row[0]
+
+    async def set(self, key: str, value: str) -> None:
+        """Store `value` under `key`, evicting old entries if over budget."""
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+
+        async with self._lock:
+            db = await self._connect()
+            now = time.time()
+            await db.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now, now),
+            )
+            await self._evict(db)
+            await db.commit()
+
+    async def delete(self, key: str) -> None:
+        async with self._lock:
+            db = await self._connect()
+            await db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            await db.commit()
+
+    async def _evict(self, db: aiosqlite.Connection) -> None:
+        async with db.execute("SELECT COALESCE(SUM(size), 0) FROM entries") as cursor:
+            total = (await cursor.fetchone())[0]
+        if total <= self.max_bytes:
+            return
+
+        async with db.execute("SELECT key, size FROM entries ORDER BY last_access ASC") as cursor:
+            candidates = await cursor.fetchall()
+
+        for key, size in candidates:
+            if total <= self.max_bytes:
+                break
+            await db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total -= size
+            self.evictions += 1
+
+    async def stats(self) -> Dict[str, Any]:
+        """Return hit/miss/eviction counters and the current stored size."""
+        async with self._lock:
+            db = await self._connect()
+            async with db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries") as cursor:
+                entries, size = await cursor.fetchone()
+
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+        }
+
+    async def close(self) -> None:
+        if self._db is not None:
+            await self._db.close()
+            self._db = None
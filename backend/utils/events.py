@@ -0,0 +1,276 @@
+import asyncio
+import itertools
+import json
+import logging
+import os
+import time
+from collections import defaultdict, deque
+from typing import Any, AsyncIterator, Dict, List, Optional, Set
+
+import aiosqlite
+from cachetools import TTLCache
+from pydantic import BaseModel
+
+from config import (
+    EVENTS_BACKEND, EVENTS_PATH, EVENTS_HISTORY, EVENTS_RETENTION,
+    EVENTS_POLL_INTERVAL, EVENTS_QUEUE_SIZE
+)
+
+logger = logging.getLogger(__name__)
+
+# Cases whose in-memory history is kept when there is no event log
+MAX_CASE_HISTORIES = 1024
+
+# Case statuses after which no more events are published for a case
+TERMINAL_STATUSES = ("completed", "failed")
+
+
+class CaseEvent(BaseModel):
+    id: int
+    case_id: str
+    event: str
+    data: Dict[str, Any]
+    created_at: float
+
+    @property
+    def is_terminal(self) -> bool:
+        return self.event == "status" and self.data.get("status") in TERMINAL_STATUSES
+
+
+class SQLiteEventLog:
+    """
+    Append-only log of case events in a local SQLite file. Lets workers
+    running in separate processes publish to subscribers in the API process.
+    Rows older than `retention` seconds are pruned as new ones are written.
+    """
+
+    PRUNE_EVERY = 500
+
+    def __init__(self, path: str, retention: float):
+        self.path = path
+        self.retention = retention
+        self._db: Optional[aiosqlite.Connection] = None
+        self._lock = asyncio.Lock()
+        self._appends = 0
+
+    async def _connect(self) -> aiosqlite.Connection:
+        if self._db is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = aiosqlite.connect(self.path, timeout=30)
+            connection.daemon = True
+            db = await connection
+            await db.execute("PRAGMA journal_mode=WAL")
+            await db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS events (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    case_id TEXT NOT NULL,
+                    event TEXT NOT NULL,
+                    data TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+            await db.execute("CREATE INDEX IF NOT EXISTS idx_events_case ON events(case_id, id)")
+            await db.commit()
+            self._db = db
+        return self._db
+
+    @staticmethod
+    def _row_to_event(row) -> CaseEvent:
+        return CaseEvent(id=row[0], case_id=row[1], event=row[2], data=json.loads(row[3]), created_at=row[4])
+
+    async def append(self, case_id: str, event: str, data: Dict[str, Any]) -> None:
+        now = time.time()
+        async with self._lock:
+            db = await self._connect()
+            await db.execute(
+                "INSERT INTO events (case_id, event, data, created_at) VALUES (?, ?, ?, ?)",
+                (case_id, event, json.dumps(data, default=str), now),
+            )
+            self._appends += 1
+            if self._appends % self.PRUNE_EVERY == 0:
+                await db.execute("DELETE FROM events WHERE created_at < ?", (now - self.retention,))
+            await db.commit()
+
+    async def last_id(self) -> int:
+        async with self._lock:
+            db = await self._connect()
+            async with db.execute("SELECT COALESCE(MAX(id), 0) FROM events") as cursor:
+                return (await cursor.fetchone())[0]
+
+    async def since(self, last_id: int) -> List[CaseEvent]:
+        """Events of all cases written after `last_id`, oldest first."""
+        async with self._lock:
+            db = await self._connect()
+            async with db.execute(
+                "SELECT id, case_id, event, data, created_at FROM events WHERE id > ? ORDER BY id", (last_id,)
+            ) as cursor:
+                rows = await cursor.fetchall()
+        return [self._row_to_event(row) for row in rows]
+
+    async def history(self, case_id: str, after_id: int, limit: int) -> List[CaseEvent]:
+        """The most recent `limit` events of one case after `after_id`, oldest first."""
+        async with self._lock:
+            db = await self._connect()
+            async with db.execute(
+                """
+                SELECT id, case_id, event, data, created_at FROM events
+                WHERE case_id = ? AND id > ? ORDER BY id DESC LIMIT ?
+                """,
+                (case_id, after_id, limit),
+            ) as cursor:
+                rows = await cursor.fetchall()
+        return [self._row_to_event(row) for row in reversed(rows)]
+
+    async def close(self) -> None:
+        if self._db is not None:
+            await self._db.close()
+            self._db = None
+
+
+class _Subscriber:
+    def __init__(self, queue_size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.overflowed = False
+
+
+class EventBus:
+    """
+    Pub/sub of pipeline progress events, keyed by case.
+
+    Without a log, events are delivered to subscribers in this process and the
+    last `history` events of recently active cases are kept in memory for late
+    subscribers.
+    With a SQLiteEventLog, publishing appends to the log and a single polling
+    task delivers new rows to this process's subscribers, so events published
+    by separate worker processes reach them too.
+
+    A subscriber that falls `queue_size` events behind is disconnected; it can
+    reconnect with the last event id it saw and replay the rest.
+    """
+
+    def __init__(
+        self,
+        history: int,
+        queue_size: int,
+        log: Optional[SQLiteEventLog] = None,
+        poll_interval: float = 0.25,
+        retention: float = 3600,
+    ):
+        self.history_size = history
+        self.queue_size = queue_size
+        self.log = log
+        self.poll_interval = poll_interval
+        self._ids = itertools.count(1)
+        self._history: TTLCache = TTLCache(maxsize=MAX_CASE_HISTORIES, ttl=retention)
+        self._subscribers: Dict[str, Set[_Subscriber]] = defaultdict(set)
+        self._tail_task: Optional[asyncio.Task] = None
+
+    async def publish(self, case_id: str, event: str, data: Optional[Dict[str, Any]] = None) -> None:
+        """Publish an event. Never raises: progress reporting must not fail the pipeline."""
+        try:
+            if self.log is not None:
+                await self.log.append(case_id, event, data or {})
+                return
+
+            case_event = CaseEvent(id=next(self._ids), case_id=case_id, event=event, data=data or {}, created_at=time.time())
+            history = self._history.get(case_id)
+            if history is None:
+                history = self._history[case_id] = deque(maxlen=self.history_size)
+            history.append(case_event)
+            self._deliver(case_event)
+        except Exception as e:
+            logger.warning(f"Could not publish {event} event for case {case_id}: {e}")
+
+    def _deliver(self, case_event: CaseEvent) -> None:
+        for subscriber in self._subscribers.get(case_event.case_id, ()):
+            try:
+                subscriber.queue.put_nowait(case_event)
+            except asyncio.QueueFull:
+                subscriber.overflowed = True
+
+    async def _replay(self, case_id: str, after_id: int) -> List[CaseEvent]:
+        if self.log is not None:
+            return await self.log.history(case_id, after_id, self.history_size)
+        history = self._history.get(case_id) or ()
+        return [case_event for case_event in history if case_event.id > after_id]
+
+    async def _tail(self, last_id: int) -> None:
+        while self._subscribers:
+            try:
+                for case_event in await self.log.since(last_id):
+                    last_id = case_event.id
+                    self._deliver(case_event)
+            except Exception as e:
+                logger.warning(f"Event log poll failed: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    async def subscribe(self, case_id: str, last_event_id: int = 0) -> AsyncIterator[CaseEvent]:
+        """
+        Yield the case's recent events after `last_event_id`, then new ones as
+        they are published. Ends after a terminal status event.
+        """
+        subscriber = _Subscriber(self.queue_size)
+        self._subscribers[case_id].add(subscriber)
+        try:
+            if self.log is not None and (self._tail_task is None or self._tail_task.done()):
+                # Anything the replay below also returns is skipped by id
+                self._tail_task = asyncio.create_task(self._tail(await self.log.last_id()))
+
+            seen = last_event_id
+            replay = await self._replay(case_id, last_event_id)
+            for case_event in replay:
+                seen = case_event.id
+                yield case_event
+                # A terminal event followed by others ended an earlier run of a re-analyzed case
+                if case_event.is_terminal and case_event is replay[-1]:
+                    return
+
+            while not subscriber.overflowed:
+                case_event = await subscriber.queue.get()
+                if case_event.id <= seen:
+                    continue
+                seen = case_event.id
+                yield case_event
+                if case_event.is_terminal:
+                    return
+        finally:
+            self._subscribers[case_id].discard(subscriber)
+            if not self._subscribers[case_id]:
+                del self._subscribers[case_id]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "sqlite" if self.log is not None else "memory",
+            "subscribers": sum(len(subscribers) for subscribers in self._subscribers.values()),
+            "cases_watched": len(self._subscribers),
+        }
+
+    async def close(self) -> None:
+        if self._tail_task is not None:
+            self._tail_task.cancel()
+        if self.log is not None:
+            await self.log.close()
+
+
+_event_bus: Optional[EventBus] = None
+
+
+def get_event_bus() -> EventBus:
+    """Return the process-wide event bus for the configured backend."""
+    global _event_bus
+    if _event_bus is None:
+        if EVENTS_BACKEND not in ("memory", "sqlite"):
+            raise ValueError(f"Unsupported EVENTS_BACKEND: {EVENTS_BACKEND}")
+        log = SQLiteEventLog(EVENTS_PATH, retention=EVENTS_RETENTION) if EVENTS_BACKEND == "sqlite" else None
+        _event_bus = EventBus(
+            history=EVENTS_HISTORY,
+            queue_size=EVENTS_QUEUE_SIZE,
+            log=log,
+            poll_interval=EVENTS_POLL_INTERVAL,
+            retention=EVENTS_RETENTION,
+        )
+    return _event_bus
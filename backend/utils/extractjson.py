@@ -3,14 +3,107 @@ import json
 from typing import Optional, Dict, Any
 
 
+_CLOSERS = {"{": "}", "[": "]"}
+# Where a JSON object or array can start; braces in prose ("{x}", "{ note") never match
+_STARTS = {
+    "{": re.compile(r'\{\s*["}]'),
+    "[": re.compile(r'\[\s*[-"{\[\]0-9tfn]'),
+}
+# Characters that matter when matching brackets; everything else is skipped in C
+_STRUCTURAL = re.compile(r'[][{}"\\]')
+_decoder = json.JSONDecoder()
+# Deepest nesting parse_partial_json will close; model responses never come near it
+_MAX_PARTIAL_DEPTH = 256
+
+
+def _span_end(text: str, start: int) -> Optional[int]:
+    """
+    End of the bracketed span opening at `start`, matching brackets while
+    skipping over JSON strings: the index after its closing bracket, the
+    index of a mismatched closing bracket, or None if it never closes.
+    """
+    stack = []
+    in_string = False
+    match = _STRUCTURAL.search(text, start)
+    while match is not None:
+        char = match.group()
+        position = match.end()
+        if in_string:
+            if char == "\\":
+                position += 1
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in _CLOSERS:
+            stack.append(_CLOSERS[char])
+        elif char in "}]":
+            if char != stack.pop():
+                return match.start()
+            if not stack:
+                return position
+        match = _STRUCTURAL.search(text, position)
+    return None
+
+
+def _first_value(text: str, opener: str) -> Optional[Any]:
+    """
+    The first top-level span starting with `opener` that parses as JSON.
+
+    Only brackets that can start a JSON value are tried, so braces in
+    prose cost nothing. The first candidate, almost always the answer,
+    goes straight to raw_decode, which stops at the end of a valid value
+    and ignores whatever follows it. After that, the bracket matcher
+    finds each candidate's span and only that span is parsed. Spans
+    never overlap, so the whole search is O(n).
+    """
+    start = _STARTS[opener].search(text)
+    if start is None:
+        return None
+    first = start.start()
+    try:
+        return _decoder.raw_decode(text, first)[0]
+    except json.JSONDecodeError as e:
+        if e.pos >= len(text):
+            # Valid so far but cut off (e.g. a truncated response)
+            return None
+
+    while start is not None:
+        i = start.start()
+        end = _span_end(text, i)
+        if end is None:
+            return None
+        if i != first:
+            try:
+                return json.loads(text[i:end])
+            except json.JSONDecodeError:
+                pass
+        start = _STARTS[opener].search(text, end)
+    return None
+
+
+def _fenced_body(text: str) -> Optional[str]:
+    """Content of the first ``` code fence, if there is one (a language tag is just skipped as prose)"""
+    fence = text.find("```")
+    if fence == -1:
+        return None
+    body_end = text.find("```", fence + 3)
+    return text[fence + 3:body_end if body_end != -1 else len(text)]
+
+
 def extract_json_from_string(input_string: str) -> Optional[Dict[Any, Any]]:
     """
-    Extract JSON from a string using regex patterns.
+    Extract JSON from a string in linear time.
     
     This function handles various input formats:
     - JSON wrapped in code blocks (```json ... ``` or ``` ... ```)
     - Plain JSON strings
-    - Mixed content with JSON embedded
+    - Mixed content with JSON embedded, including prose before or after
+      it that contains stray braces
+    
+    The first valid top-level object is returned (one inside a code
+    block is preferred); failing that, the whole string parsed as JSON,
+    then the first valid top-level array.
     
     Args:
         input_string (str): The input string that may contain JSON
@@ -23,49 +116,31 @@ def extract_json_from_string(input_string: str) -> Optional[Dict[Any, Any]]:
     
     # Clean the input string
     cleaned_string = input_string.strip()
-    
-    # Pattern 1: JSON wrapped in code blocks with optional language specifier
-    # Matches: ```json {...} ``` or ``` {...} ```
-    code_block_pattern = r'```(?:json)?\s*(\{.*?\})\s*```'
-    code_block_match = re.search(code_block_pattern, cleaned_string, re.DOTALL | re.IGNORECASE)
-    
-    if code_block_match:
-        try:
-            json_str = code_block_match.group(1).strip()
-            return json.loads(json_str)
-        except json.JSONDecodeError:
-            pass
-    
-    # Pattern 2: Look for JSON object that starts with { and ends with }
-    # This handles cases where JSON is embedded in other text
-    json_pattern = r'\{.*\}'
-    json_match = re.search(json_pattern, cleaned_string, re.DOTALL)
-    
-    if json_match:
-        try:
-            json_str = json_match.group(0).strip()
-            return json.loads(json_str)
-        except json.JSONDecodeError:
-            pass
-    
-    # Pattern 3: Try to parse the entire string as JSON
+
+    try:
+        return _extract(cleaned_string)
+    except RecursionError:
+        # Nested deeper than the json module can parse: as unusable as a truncated response
+        return None
+
+
+def _extract(cleaned_string: str) -> Optional[Any]:
+    fenced = _fenced_body(cleaned_string)
+    if fenced is not None:
+        result = _first_value(fenced, "{")
+        if result is not None:
+            return result
+
+    result = _first_value(cleaned_string, "{")
+    if result is not None:
+        return result
+
     try:
         return json.loads(cleaned_string)
     except json.JSONDecodeError:
         pass
-    
-    # Pattern 4: Look for JSON array that starts with [ and ends with ]
-    array_pattern = r'\[.*\]'
-    array_match = re.search(array_pattern, cleaned_string, re.DOTALL)
-    
-    if array_match:
-        try:
-            json_str = array_match.group(0).strip()
-            return json.loads(json_str)
-        except json.JSONDecodeError:
-            pass
-    
-    return None
+
+    return _first_value(cleaned_string, "[")
 
 
 def extract_json_strict(input_string: str) -> Optional[Dict[Any, Any]]:
@@ -87,6 +162,79 @@ def extract_json_strict(input_string: str) -> Optional[Dict[Any, Any]]:
     return None
 
 
+def parse_partial_json(input_string: str) -> Optional[Dict[Any, Any]]:
+    """
+    Parse the JSON object at the start of a response that is still streaming in.
+
+    Unterminated strings, objects and arrays are closed, and a trailing member
+    that cannot be completed yet (half a key, a key without a value, a partial
+    number or literal) is dropped. So '{"plan": "Start IV fl' parses to
+    {"plan": "Start IV fl"}. Input nested deeper than _MAX_PARTIAL_DEPTH
+    gives None.
+
+    Args:
+        input_string (str): The response text received so far
+
+    Returns:
+        Optional[Dict[Any, Any]]: The object parsed so far, or None if nothing usable yet
+    """
+    if not input_string or not isinstance(input_string, str):
+        return None
+
+    start = input_string.find("{")
+    if start == -1:
+        return None
+
+    closers = []
+    # (prefix end, closers) pairs where the prefix can be closed into valid JSON
+    cut_points = []
+    in_string = False
+    escape = False
+    for i in range(start, len(input_string)):
+        char = input_string[i]
+        if in_string:
+            if escape:
+                escape = False
+            elif char == "\\":
+                escape = True
+            elif char == '"':
+                in_string = False
+            continue
+
+        if char == '"':
+            in_string = True
+        elif char in "{[":
+            closers.append("}" if char == "{" else "]")
+            if len(closers) > _MAX_PARTIAL_DEPTH:
+                return None
+            cut_points.append((i + 1, "".join(reversed(closers))))
+        elif char in "}]":
+            if closers:
+                closers.pop()
+            if not closers:
+                try:
+                    return json.loads(input_string[start:i + 1])
+                except json.JSONDecodeError:
+                    return None
+        elif char == ",":
+            cut_points.append((i, "".join(reversed(closers))))
+
+    text = input_string[start:]
+    if in_string:
+        # Drop a dangling escape so the closing quote isn't escaped
+        text = (text[:-1] if escape else text) + '"'
+    candidates = [(text, "".join(reversed(closers)))]
+    candidates += [(input_string[start:end], suffix) for end, suffix in reversed(cut_points)]
+
+    for prefix, suffix in candidates:
+        try:
+            parsed = json.loads(prefix + suffix)
+        except json.JSONDecodeError:
+            continue
+        return parsed if isinstance(parsed, dict) else None
+    return None
+
+
 # Example usage and test function
 def test_extraction():
     """Test the JSON extraction function with various input formats."""
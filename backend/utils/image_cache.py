@@ -0,0 +1,153 @@
+import asyncio
+import io
+import json
+import os
+import time
+from typing import Any, Dict, Optional
+
+import aiosqlite
+import numpy as np
+from PIL import Image
+
+from config import IMAGE_CACHE_ENABLED, IMAGE_CACHE_PATH, IMAGE_CACHE_MAX_DISTANCE
+
+HASH_SIZE = 8
+_DCT_SIZE = 32
+
+
+def _dct_matrix(n: int) -> np.ndarray:
+    k = np.arange(n)
+    matrix = np.cos(np.pi * (2 * k[None, :] + 1) * k[:, None] / (2 * n))
+    matrix[0] *= 1 / np.sqrt(2)
+    return matrix * np.sqrt(2 / n)
+
+
+_DCT = _dct_matrix(_DCT_SIZE)
+
+
+def perceptual_hash(image_bytes: bytes) -> int:
+    """
+    64-bit DCT perceptual hash of the decoded image.
+
+    Re-encoded, resized or lightly compressed copies of an image hash to the
+    same or nearby values (small Hamming distance).
+    """
+    with Image.open(io.BytesIO(image_bytes)) as image:
+        pixels = np.asarray(
+            image.convert("L").resize((_DCT_SIZE, _DCT_SIZE), Image.Resampling.LANCZOS),
+            dtype=np.float64,
+        )
+
+    low_freq = (_DCT @ pixels @ _DCT.T)[:HASH_SIZE, :HASH_SIZE].flatten()
+    # The DC term is left out of the median so overall brightness doesn't skew it
+    bits = low_freq > np.median(low_freq[1:])
+
+    value = 0
+    for bit in bits:
+        value = (value << 1) | int(bit)
+    return value
+
+
+class ImageHashCache:
+    """
+    Persistent cache of image analyses keyed by perceptual hash and prompt
+    version, scoped to one case: findings are only ever reused for images
+    of the same patient, since different patients' radiographs (normal
+    chest X-rays, adjacent slices) can hash identically. A lookup loads the
+    scope's hashes and compares them in one vectorized XOR + popcount.
+    """
+
+    def __init__(self, path: str, max_distance: int):
+        self.path = path
+        self.max_distance = max_distance
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self._db: Optional[aiosqlite.Connection] = None
+        self._lock = asyncio.Lock()
+
+    async def _connect(self) -> aiosqlite.Connection:
+        if self._db is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = aiosqlite.connect(self.path)
+            connection.daemon = True
+            db = await connection
+            # Entries of the earlier unscoped table (image_analyses) are shared across
+            # patients and are deliberately never read
+            await db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS case_image_analyses (
+                    scope TEXT NOT NULL,
+                    phash TEXT NOT NULL,
+                    prompt_version TEXT NOT NULL,
+                    result TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (scope, prompt_version, phash)
+                )
+                """
+            )
+            await db.commit()
+            self._db = db
+        return self._db
+
+    async def get(self, phash: int, prompt_version: str, scope: str) -> Optional[Any]:
+        """Return the stored result of the closest image in `scope` within max_distance."""
+        async with self._lock:
+            db = await self._connect()
+            async with db.execute(
+                "SELECT phash, result FROM case_image_analyses WHERE scope = ? AND prompt_version = ?",
+                (scope, prompt_version),
+            ) as cursor:
+                rows = await cursor.fetchall()
+
+        if rows:
+            hashes = np.array([int(stored, 16) for stored, _ in rows], dtype=np.uint64)
+            distances = np.bitwise_count(hashes ^ np.uint64(phash))
+            best = int(np.argmin(distances))
+            if distances[best] <= self.max_distance:
+                self.hits += 1
+                if distances[best] > 0:
+                    self.near_hits += 1
+                return json.loads(rows[best][1])
+
+        self.misses += 1
+        return None
+
+    async def set(self, phash: int, prompt_version: str, scope: str, result: Any) -> None:
+        if result is None:
+            return
+
+        payload = json.dumps(result, ensure_ascii=False)
+        async with self._lock:
+            db = await self._connect()
+            await db.execute(
+                """
+                INSERT OR REPLACE INTO case_image_analyses (scope, phash, prompt_version, result, created_at)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                (scope, format(phash, "016x"), prompt_version, payload, time.time()),
+            )
+            await db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "scope": "case",
+            "max_distance": self.max_distance,
+            "hits": self.hits,
+            "near_hits": self.near_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    async def close(self) -> None:
+        if self._db is not None:
+            await self._db.close()
+            self._db = None
+
+
+image_cache: Optional[ImageHashCache] = (
+    ImageHashCache(IMAGE_CACHE_PATH, max_distance=IMAGE_CACHE_MAX_DISTANCE) if IMAGE_CACHE_ENABLED else None
+)
@@ -0,0 +1,57 @@
+import base64
+import io
+from typing import Tuple
+
+from PIL import Image, ImageChops, ImageOps
+
+# Channel difference (0-255) above which a pixel counts as coloured, and the share of
+# coloured pixels (JPEG chroma noise, small annotations) tolerated in a grayscale image
+_COLOUR_THRESHOLD = 16
+_COLOUR_SHARE = 0.01
+
+_FORMATS = {
+    "jpeg": ("JPEG", "image/jpeg"),
+    "webp": ("WEBP", "image/webp"),
+}
+
+
+def is_grayscale(image: Image.Image) -> bool:
+    """Whether an RGB(A) image carries no colour, as most exported scans don't"""
+    if image.mode in ("1", "L", "LA", "I", "I;16", "F"):
+        return True
+    # A box-filtered reduction is plenty to spot colour and far cheaper than a full-size conversion
+    rgb = image.reduce(max(1, min(image.size) // 256)).convert("RGB")
+    red, green, blue = rgb.split()
+    difference = ImageChops.lighter(ImageChops.difference(red, green), ImageChops.difference(green, blue))
+    coloured = sum(difference.histogram()[_COLOUR_THRESHOLD + 1:])
+    return coloured <= _COLOUR_SHARE * rgb.width * rgb.height
+
+
+def preprocess_image(image_bytes: bytes, max_side: int, image_format: str = "jpeg", quality: int = 85) -> Tuple[bytes, str]:
+    """
+    Downscale an image so its longer side is at most `max_side` and
+    re-encode it as JPEG or WebP. Images without colour are converted to
+    a single grayscale channel; colour (e.g. Doppler overlays) is kept.
+
+    CPU-bound: run it off the event loop. Returns the encoded bytes and
+    their MIME type.
+    """
+    pil_format, mime = _FORMATS[image_format.lower()]
+    with Image.open(io.BytesIO(image_bytes)) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode in ("I", "I;16", "F"):
+            # 16-bit / float exports: stretch their value range to 8 bits before encoding
+            low, high = image.getextrema()
+            scale = 255 / (high - low) if high > low else 0
+            image = image.convert("F").point(lambda value: (value - low) * scale).convert("L")
+        image = image.convert("L") if is_grayscale(image) else image.convert("RGB")
+        image.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+
+        buffer = io.BytesIO()
+        image.save(buffer, format=pil_format, quality=quality, optimize=True)
+    return buffer.getvalue(), mime
+
+
+def data_url(data: bytes, mime: str) -> str:
+    """Inline base64 data URL for an image"""
+    return f"data:{mime};base64,{base64.b64encode(data).decode('ascii')}"
@@ -0,0 +1,96 @@
+import hashlib
+import json
+import logging
+from collections import defaultdict
+from typing import Any, Dict, Optional
+
+from cachetools import TTLCache
+
+from config import (
+    LLM_CACHE_ENABLED, LLM_CACHE_TTL, LLM_CACHE_MAX_ENTRIES,
+    LLM_CACHE_PATH, LLM_CACHE_MAX_BYTES
+)
+from utils import medical_prompts
+from utils.disk_cache import SQLiteCache
+
+logger = logging.getLogger(__name__)
+
+# Maps prompt templates back to their constant names for readable counters
+PROMPT_NAMES = {
+    value: name for name, value in vars(medical_prompts).items()
+    if name.endswith("_PROMPT") and isinstance(value, str)
+}
+
+
+def prompt_name(system_prompt: str) -> str:
+    """Return the medical_prompts constant name for a template, or a short hash"""
+    return PROMPT_NAMES.get(system_prompt) or "prompt_" + hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()[:8]
+
+
+class LLMResponseCache:
+    """
+    Two-tier cache of extracted LLM JSON responses.
+
+    The in-memory tier is an LRU with TTL; the optional persistent tier is a
+    SQLiteCache with the same TTL, so entries survive restarts and are shared
+    by workers on the same host.
+    """
+
+    def __init__(self, max_entries: int, ttl: float, path: Optional[str] = None, max_bytes: int = LLM_CACHE_MAX_BYTES):
+        self.memory = TTLCache(maxsize=max_entries, ttl=ttl)
+        self.disk = SQLiteCache(path, max_bytes=max_bytes, ttl=ttl) if path else None
+        self.counters: Dict[str, Dict[str, int]] = defaultdict(lambda: {"hits": 0, "misses": 0})
+
+    @staticmethod
+    def make_key(model_name: str, temperature: float, system_prompt: str, user_input: str) -> str:
+        payload = json.dumps([model_name, temperature, system_prompt, user_input], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def get(self, key: str, name: str) -> Optional[Any]:
+        """Return the cached response for `key`, counting the lookup under `name`"""
+        value = self.memory.get(key)
+
+        if value is None and self.disk is not None:
+            try:
+                raw = await self.disk.get(key)
+                if raw is not None:
+                    value = json.loads(raw)
+                    self.memory[key] = value
+            except Exception as e:
+                logger.warning(f"LLM cache lookup failed: {e}")
+
+        self.counters[name]["hits" if value is not None else "misses"] += 1
+        return value
+
+    async def set(self, key: str, value: Any) -> None:
+        if value is None:
+            return
+
+        self.memory[key] = value
+        if self.disk is not None:
+            try:
+                await self.disk.set(key, json.dumps(value, ensure_ascii=False))
+            except Exception as e:
+                logger.warning(f"LLM cache store failed: {e}")
+
+    async def stats(self) -> Dict[str, Any]:
+        return {
+            "memory_entries": len(self.memory),
+            "persistent": await self.disk.stats() if self.disk is not None else None,
+            "prompts": {name: dict(counts) for name, counts in self.counters.items()},
+        }
+
+
+_llm_cache: Optional[LLMResponseCache] = None
+
+
+def get_llm_cache() -> Optional[LLMResponseCache]:
+    """Return the process-wide LLM response cache, or None when disabled."""
+    global _llm_cache
+    if LLM_CACHE_ENABLED and _llm_cache is None:
+        _llm_cache = LLMResponseCache(
+            max_entries=LLM_CACHE_MAX_ENTRIES,
+            ttl=LLM_CACHE_TTL,
+            path=LLM_CACHE_PATH,
+        )
+    return _llm_cache
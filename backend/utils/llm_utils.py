@@ -1,13 +1,32 @@
 from langchain_groq import ChatGroq
 from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.messages import SystemMessage
 from langchain_core.output_parsers import JsonOutputParser
+import asyncio
 import json
-from typing import Dict, Any, Optional
+import logging
+import time
+from typing import Dict, Any, Optional, AsyncIterator, Awaitable, Callable
 import os
 from dotenv import load_dotenv
 load_dotenv()
 
-from utils.extractjson import extract_json_from_string
+from utils.extractjson import extract_json_from_string, parse_partial_json
+from utils.rate_limiter import AsyncRateLimiter, get_llm_limiter
+from utils.llm_cache import LLMResponseCache, get_llm_cache, prompt_name
+from utils.retry import retrying, next_retry_delay
+from utils.tokens import count_tokens
+from config import LLM_STREAM_PARTIAL_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+# Completion tokens assumed per call when budgeting against the tokens-per-minute limit
+COMPLETION_TOKENS_ESTIMATE = 1024
+
+
+def estimate_tokens(*texts: str) -> int:
+    """Token count of a call: its prompt texts plus a typical completion"""
+    return sum(count_tokens(text) for text in texts) + COMPLETION_TOKENS_ESTIMATE
 
 
 parser = JsonOutputParser(pydantic_object={
@@ -24,24 +43,138 @@ parser = JsonOutputParser(pydantic_object={
 
 class LLMManager:
     
-    def __init__(self, model_name: str = "llama-3.3-70b-versatile", temperature: float = 0.7):
-        self.llm = ChatGroq(model_name=model_name, temperature=temperature)
+    def __init__(self, model_name: str = "llama-3.3-70b-versatile", temperature: float = 0.7, limiter: Optional[AsyncRateLimiter] = None, cache: Optional[LLMResponseCache] = None):
+        self.model_name = model_name
+        self.temperature = temperature
+        # Shared across all LLMManager instances unless passed explicitly
+        self.limiter = limiter or get_llm_limiter()
+        # Retries are ours (see utils/retry.py); responses update the limiter's view of the rate limits
+        self.llm = ChatGroq(
+            model_name=model_name,
+            temperature=temperature,
+            max_retries=0,
+            http_async_client=self.limiter.http_client(),
+        )
+        self.cache = cache or get_llm_cache()
 
-    async def generate_response(self, system_prompt: str, user_input: str, prompt_variables: Optional[Dict[str, Any]] = None) -> dict:
-        """Generate response with optional prompt variable substitution"""
+    def _model(self, json_mode: bool):
+        return self.llm.bind(response_format={"type": "json_object"}) if json_mode else self.llm
+
+    async def generate_response(
+        self,
+        system_prompt: str,
+        user_input: str,
+        prompt_variables: Optional[Dict[str, Any]] = None,
+        on_partial: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None,
+        json_mode: bool = False,
+    ) -> dict:
+        """
+        Generate response with optional prompt variable substitution.
+        With `on_partial`, the response is streamed and the callback is awaited
+        with each partially parsed JSON object as it grows. `json_mode` asks
+        the API for a syntactically valid JSON object.
+        """
+        if on_partial is not None:
+            result = None
+            async for result, done in self.stream_response(system_prompt, user_input, prompt_variables, json_mode=json_mode):
+                if not done and result is not None:
+                    await on_partial(result)
+            return result
         
         # If we have prompt variables, use Python string formatting first
-        if prompt_variables:
-            formatted_system_prompt = system_prompt.format(**prompt_variables)
-        else:
-            formatted_system_prompt = system_prompt
+        # Prompts are formatted exactly once, here. The result is passed as a
+        # message, not a template, so braces in it (JSON examples, serialized
+        # notes in prompt variables) reach the model as-is.
+        formatted_system_prompt = system_prompt.format(**(prompt_variables or {}))
+
+        if self.cache is not None:
+            cache_key = self.cache.make_key(self.model_name, self.temperature, formatted_system_prompt, user_input)
+            cached = await self.cache.get(cache_key, prompt_name(system_prompt))
+            if cached is not None:
+                return cached
             
         prompt = ChatPromptTemplate.from_messages([
-            ("system", formatted_system_prompt),
+            SystemMessage(content=formatted_system_prompt),
             ("user", "{input}")
         ])
         
-        chain = prompt | self.llm 
-        result = chain.invoke({"input": user_input})
+        chain = prompt | self._model(json_mode)
+        await self.limiter.acquire_tokens(estimate_tokens(formatted_system_prompt, user_input))
+        async for attempt in retrying("Groq LLM", self.limiter):
+            with attempt:
+                async with self.limiter:
+                    result = await chain.ainvoke({"input": user_input})
         result = extract_json_from_string(result.content)
+
+        if self.cache is not None:
+            await self.cache.set(cache_key, result)
         return result
+
+    async def stream_response(
+        self,
+        system_prompt: str,
+        user_input: str,
+        prompt_variables: Optional[Dict[str, Any]] = None,
+        json_mode: bool = False,
+    ) -> AsyncIterator[tuple]:
+        """
+        Stream the response, yielding (parsed_json, done) pairs.
+
+        While tokens arrive, yields the partially parsed object when it has
+        changed (done=False), re-parsing the buffer at most once per
+        LLM_STREAM_PARTIAL_INTERVAL so parsing stays linear in the response
+        length. The last pair is the fully extracted JSON, the same value
+        generate_response returns (done=True).
+        """
+        # Prompts are formatted exactly once, here. The result is passed as a
+        # message, not a template, so braces in it (JSON examples, serialized
+        # notes in prompt variables) reach the model as-is.
+        formatted_system_prompt = system_prompt.format(**(prompt_variables or {}))
+
+        if self.cache is not None:
+            cache_key = self.cache.make_key(self.model_name, self.temperature, formatted_system_prompt, user_input)
+            cached = await self.cache.get(cache_key, prompt_name(system_prompt))
+            if cached is not None:
+                yield cached, True
+                return
+
+        prompt = ChatPromptTemplate.from_messages([
+            SystemMessage(content=formatted_system_prompt),
+            ("user", "{input}")
+        ])
+
+        chain = prompt | self._model(json_mode)
+        content = ""
+        partial = None
+        last_parse = time.monotonic()
+        await self.limiter.acquire_tokens(estimate_tokens(formatted_system_prompt, user_input))
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                async with self.limiter:
+                    async for chunk in chain.astream({"input": user_input}):
+                        if not chunk.content:
+                            continue
+                        content += chunk.content
+                        now = time.monotonic()
+                        if now - last_parse < LLM_STREAM_PARTIAL_INTERVAL:
+                            continue
+                        last_parse = now
+                        parsed = parse_partial_json(content)
+                        if parsed is not None and parsed != partial:
+                            partial = parsed
+                            yield partial, False
+                break
+            except Exception as e:
+                # Partial results already went out, so only failures before the first token are retried
+                delay = None if content else next_retry_delay(e, attempt, self.limiter)
+                if delay is None:
+                    raise
+                logger.warning(f"Groq LLM stream failed ({e.__class__.__name__}: {e}), retry {attempt} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+        result = extract_json_from_string(content)
+        if self.cache is not None:
+            await self.cache.set(cache_key, result)
+        yield result, True
@@ -54,11 +54,11 @@ Input Information:
 - Radiology Summaries: {radiology_summaries}
 
 Required JSON structure:
-{{{{
+{{
   "comprehensive_summary": "<comprehensive_case_summary>",
   "key_findings": ["<key_finding_1>", "<key_finding_2>"],
   "confidence_score": <number>
-}}}}
+}}
 
 Guidelines:
 - Synthesize all available information
@@ -71,13 +71,13 @@ SOAP_NOTE_PROMPT: Final = '''
 Generate a SOAP note based on the case summary. Return STRICT JSON only.
 
 Required JSON structure:
-{{{{
+{{
   "subjective": "<patient_reported_symptoms_and_history>",
   "objective": "<objective_findings_from_exams_and_tests>",
   "assessment": "<clinical_assessment_and_working_diagnosis>",
   "plan": "<treatment_and_management_plan>",
   "confidence_score": <number>
-}}}}
+}}
 
 Guidelines:
 - Follow standard SOAP format
@@ -90,13 +90,13 @@ DIAGNOSIS_PROMPT: Final = '''
 Generate a primary diagnosis based on the SOAP note. Return STRICT JSON only.
 
 Required JSON structure:
-{{{{
+{{
   "diagnosis": "<primary_diagnosis>",
   "icd_code": "<icd_10_code>",
   "description": "<detailed_description>",
   "supporting_evidence": ["<evidence_1>", "<evidence_2>"],
   "confidence_score": <number>
-}}}}
+}}
 
 Guidelines:
 - Provide most likely primary diagnosis
@@ -105,6 +105,46 @@ Guidelines:
 - Assess diagnostic confidence
 '''
 
+FAST_ANALYSIS_PROMPT: Final = '''
+Generate a case summary, a SOAP note and a primary diagnosis for this case in one response. Return STRICT JSON only.
+
+Input Information:
+- Patient: {patient_info}
+- Doctor's Notes: {doctor_notes}
+- Lab Summaries: {lab_summaries}
+- Radiology Summaries: {radiology_summaries}
+
+Required JSON structure:
+{{
+  "case_summary": {{
+    "comprehensive_summary": "<comprehensive_case_summary>",
+    "key_findings": ["<key_finding_1>", "<key_finding_2>"],
+    "confidence_score": <number>
+  }},
+  "soap_note": {{
+    "subjective": "<patient_reported_symptoms_and_history>",
+    "objective": "<objective_findings_from_exams_and_tests>",
+    "assessment": "<clinical_assessment_and_working_diagnosis>",
+    "plan": "<treatment_and_management_plan>",
+    "confidence_score": <number>
+  }},
+  "diagnosis": {{
+    "diagnosis": "<primary_diagnosis>",
+    "icd_code": "<icd_10_code>",
+    "description": "<detailed_description>",
+    "supporting_evidence": ["<evidence_1>", "<evidence_2>"],
+    "confidence_score": <number>
+  }}
+}}
+
+Guidelines:
+- Synthesize all available information into the summary and highlight key clinical findings
+- Write the SOAP note from the summary in standard SOAP format
+- Base the diagnosis on the SOAP note, with an ICD-10 code if possible and supporting evidence
+- Confidence scores are between 0 and 1
+- Maintain medical accuracy
+'''
+
 DIFFERENTIAL_DIAGNOSIS_PROMPT: Final = '''
 Generate differential diagnoses based on SOAP note and primary diagnosis. Return STRICT JSON only.
 
@@ -0,0 +1,76 @@
+import hashlib
+import json
+import logging
+from collections import defaultdict
+from typing import Any, Dict, Optional
+
+from config import NODE_CACHE_ENABLED, NODE_CACHE_PATH, NODE_CACHE_MAX_BYTES
+from utils.disk_cache import SQLiteCache
+
+logger = logging.getLogger(__name__)
+
+
+def fingerprint(*parts: Any) -> str:
+    """Stable hash of JSON-serializable node inputs"""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class NodeResultCache:
+    """
+    Last output of each analysis workflow node per case, stored with the
+    fingerprint of the inputs it was computed from.
+
+    A re-run of a case gets a node's stored output back only while its input
+    fingerprint is unchanged, so adding a file or editing the doctor's notes
+    recomputes just the nodes downstream of the change. One entry is kept
+    per (case, node); a recomputation overwrites it.
+    """
+
+    def __init__(self, path: str, max_bytes: int):
+        self.disk = SQLiteCache(path, max_bytes=max_bytes)
+        self.counters: Dict[str, Dict[str, int]] = defaultdict(lambda: {"reused": 0, "recomputed": 0})
+
+    async def get(self, case_id: str, node: str, input_fingerprint: str) -> Optional[Dict[str, Any]]:
+        """Return the node's stored output if it was computed from the same inputs"""
+        output = None
+        try:
+            raw = await self.disk.get(f"{case_id}:{node}")
+            if raw is not None:
+                entry = json.loads(raw)
+                if entry["fingerprint"] == input_fingerprint:
+                    output = entry["output"]
+        except Exception as e:
+            logger.warning(f"Node cache lookup failed: {e}")
+
+        self.counters[node.split(":")[0]]["reused" if output is not None else "recomputed"] += 1
+        return output
+
+    async def set(self, case_id: str, node: str, input_fingerprint: str, output: Dict[str, Any]) -> None:
+        try:
+            await self.disk.set(
+                f"{case_id}:{node}",
+                json.dumps({"fingerprint": input_fingerprint, "output": output}, ensure_ascii=False, default=str),
+            )
+        except Exception as e:
+            logger.warning(f"Node cache store failed: {e}")
+
+    async def stats(self) -> Dict[str, Any]:
+        return {
+            "persistent": await self.disk.stats(),
+            "nodes": {node: dict(counts) for node, counts in self.counters.items()},
+        }
+
+    async def close(self) -> None:
+        await self.disk.close()
+
+
+_node_cache: Optional[NodeResultCache] = None
+
+
+def get_node_cache() -> Optional[NodeResultCache]:
+    """Return the process-wide node result cache, or None when disabled."""
+    global _node_cache
+    if NODE_CACHE_ENABLED and _node_cache is None:
+        _node_cache = NodeResultCache(path=NODE_CACHE_PATH, max_bytes=NODE_CACHE_MAX_BYTES)
+    return _node_cache
@@ -0,0 +1,192 @@
+import asyncio
+import time
+from typing import Dict, Mapping, Optional
+
+import httpx
+
+from config import LLM_MAX_CONCURRENCY, LLM_REQUESTS_PER_MINUTE, VISION_MAX_CONCURRENCY, PARSE_MAX_CONCURRENCY
+from utils.retry import parse_duration, retry_after_from_headers
+
+
+class TokenBucket:
+    """
+    Async token bucket used to smooth request bursts.
+
+    Tokens refill continuously at `rate` per second up to `capacity`.
+    A rate of 0 or less disables throttling.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def configure(self, rate: float, capacity: float) -> None:
+        """Change the refill rate and capacity, keeping the tokens already available."""
+        self._refill()
+        if self.rate <= 0:
+            self.tokens = capacity
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = min(self.tokens, capacity)
+
+    def limit_available(self, tokens: float) -> None:
+        """Lower the available tokens to what the server reports remaining."""
+        self._refill()
+        self.tokens = min(self.tokens, max(0.0, tokens))
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        """Wait until `tokens` are available and consume them."""
+        if self.rate <= 0:
+            return
+        # A request larger than the whole bucket only waits for a full one
+        tokens = min(tokens, self.capacity)
+
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self.tokens) / self.rate)
+
+
+class AsyncRateLimiter:
+    """
+    Caps the number of in-flight calls with a semaphore and paces new calls
+    with a token bucket. Use as `async with limiter: ...`.
+
+    Responses passed to `observe` (see `http_client`) keep it in step with
+    the server's limits: the Groq x-ratelimit-* headers size a tokens-per-
+    minute bucket (`acquire_tokens`), and an exhausted limit or Retry-After
+    pauses new calls until the reset, so bursts queue instead of failing.
+    """
+
+    def __init__(self, max_concurrency: int, requests_per_minute: float = 0):
+        self.max_concurrency = max_concurrency
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.bucket = TokenBucket(
+            rate=requests_per_minute / 60.0,
+            capacity=min(max_concurrency, requests_per_minute) or 1.0,
+        )
+        # Disabled until a response reports the tokens-per-minute limit
+        self.token_bucket = TokenBucket(rate=0)
+        self.paused_until = 0.0
+        self.in_flight = 0
+        self.total_calls = 0
+        self.rate_limited = 0
+        self._http_client: Optional[httpx.AsyncClient] = None
+
+    async def __aenter__(self) -> "AsyncRateLimiter":
+        await self.semaphore.acquire()
+        try:
+            while (delay := self.paused_until - time.monotonic()) > 0:
+                await asyncio.sleep(delay)
+            await self.bucket.acquire()
+        except BaseException:
+            self.semaphore.release()
+            raise
+        self.in_flight += 1
+        self.total_calls += 1
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        self.in_flight -= 1
+        self.semaphore.release()
+
+    async def acquire_tokens(self, tokens: float) -> None:
+        """Wait until the tokens-per-minute budget covers a call of about `tokens` tokens."""
+        await self.token_bucket.acquire(tokens)
+
+    def pause(self, seconds: float) -> None:
+        """Hold back new calls for `seconds`."""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def observe(self, status_code: int, headers: Mapping[str, str]) -> None:
+        """Update the limits from a response's rate-limit headers."""
+        token_limit = headers.get("x-ratelimit-limit-tokens")
+        if token_limit:
+            try:
+                tokens_per_minute = float(token_limit)
+                if tokens_per_minute != self.token_bucket.capacity:
+                    self.token_bucket.configure(rate=tokens_per_minute / 60.0, capacity=tokens_per_minute)
+                remaining_tokens = headers.get("x-ratelimit-remaining-tokens")
+                if remaining_tokens:
+                    self.token_bucket.limit_available(float(remaining_tokens))
+            except ValueError:
+                pass
+
+        if headers.get("x-ratelimit-remaining-requests") == "0":
+            reset = parse_duration(headers.get("x-ratelimit-reset-requests"))
+            if reset:
+                self.pause(reset)
+
+        if status_code == 429:
+            self.rate_limited += 1
+            delay = retry_after_from_headers(headers) or parse_duration(headers.get("x-ratelimit-reset-tokens"))
+            if delay:
+                self.pause(delay)
+
+    async def _observe_response(self, response: httpx.Response) -> None:
+        self.observe(response.status_code, response.headers)
+
+    def http_client(self) -> httpx.AsyncClient:
+        """Shared HTTP client whose responses are fed to `observe`, for the SDK clients this limiter guards."""
+        if self._http_client is None:
+            self._http_client = httpx.AsyncClient(
+                timeout=httpx.Timeout(60.0, connect=5.0),
+                event_hooks={"response": [self._observe_response]},
+            )
+        return self._http_client
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "total_calls": self.total_calls,
+            "rate_limited": self.rate_limited,
+            "tokens_per_minute": self.token_bucket.capacity if self.token_bucket.rate > 0 else None,
+            "paused_for": max(0.0, self.paused_until - time.monotonic()),
+        }
+
+
+_llm_limiter: Optional[AsyncRateLimiter] = None
+_vision_limiter: Optional[AsyncRateLimiter] = None
+_parse_limiter: Optional[AsyncRateLimiter] = None
+
+
+def get_llm_limiter() -> AsyncRateLimiter:
+    """Return the process-wide limiter shared by all Groq LLM calls."""
+    global _llm_limiter
+    if _llm_limiter is None:
+        _llm_limiter = AsyncRateLimiter(
+            max_concurrency=LLM_MAX_CONCURRENCY,
+            requests_per_minute=LLM_REQUESTS_PER_MINUTE,
+        )
+    return _llm_limiter
+
+
+def get_vision_limiter() -> AsyncRateLimiter:
+    """Return the process-wide limiter shared by all Groq vision calls."""
+    global _vision_limiter
+    if _vision_limiter is None:
+        _vision_limiter = AsyncRateLimiter(
+            max_concurrency=VISION_MAX_CONCURRENCY,
+            requests_per_minute=LLM_REQUESTS_PER_MINUTE,
+        )
+    return _vision_limiter
+
+
+def get_parse_limiter() -> AsyncRateLimiter:
+    """Return the process-wide limiter shared by all LlamaParse jobs."""
+    global _parse_limiter
+    if _parse_limiter is None:
+        _parse_limiter = AsyncRateLimiter(max_concurrency=PARSE_MAX_CONCURRENCY)
+    return _parse_limiter
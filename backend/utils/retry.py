@@ -0,0 +1,161 @@
+import asyncio
+import email.utils
+import logging
+import random
+import re
+import time
+from typing import Any, Mapping, Optional
+
+import httpx
+from tenacity import AsyncRetrying, RetryCallState, retry_if_exception, stop_after_attempt
+from tenacity.wait import wait_base
+
+from config import RETRY_MAX_ATTEMPTS, RETRY_BASE_DELAY, RETRY_MAX_DELAY
+
+logger = logging.getLogger(__name__)
+
+# Request timeout, conflict, too early, rate limited, and transient server errors
+RETRYABLE_STATUS = {408, 409, 425, 429, 500, 502, 503, 504}
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """Seconds in a Groq reset header such as "7.66s", "2m59.56s" or "120ms"."""
+    if not value:
+        return None
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+def retry_after_from_headers(headers: Mapping[str, str]) -> Optional[float]:
+    """Seconds to wait according to retry-after-ms / retry-after (seconds or HTTP date)."""
+    if headers.get("retry-after-ms"):
+        try:
+            return float(headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _response(exc: BaseException) -> Optional[httpx.Response]:
+    """The HTTP response behind an exception, looking through wrapping exceptions."""
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        seen.add(id(exc))
+        response = getattr(exc, "response", None)
+        if isinstance(response, httpx.Response):
+            return response
+        exc = exc.__cause__ or exc.__context__
+    return None
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Rate limits, transient server errors, timeouts and dropped connections."""
+    response = _response(exc)
+    if response is not None:
+        return response.status_code in RETRYABLE_STATUS
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        seen.add(id(exc))
+        # groq.APIConnectionError / APITimeoutError carry no response
+        if isinstance(exc, (httpx.TransportError, asyncio.TimeoutError)) or type(exc).__name__ in ("APIConnectionError", "APITimeoutError"):
+            return True
+        exc = exc.__cause__ or exc.__context__
+    return False
+
+
+def server_delay(exc: BaseException) -> Optional[float]:
+    """How long the server asked us to wait before retrying, if it said."""
+    response = _response(exc)
+    if response is None:
+        return None
+    delay = retry_after_from_headers(response.headers)
+    if delay is None and response.status_code == 429:
+        resets = [parse_duration(response.headers.get(name)) for name in ("x-ratelimit-reset-requests", "x-ratelimit-reset-tokens")]
+        resets = [reset for reset in resets if reset is not None]
+        delay = min(resets) if resets else None
+    return delay
+
+
+def backoff_delay(attempt: int, base: float = RETRY_BASE_DELAY, cap: float = RETRY_MAX_DELAY) -> float:
+    """Exponential backoff with full jitter for the given 1-based attempt."""
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+
+class wait_server_or_backoff(wait_base):
+    """Wait what Retry-After / the rate-limit reset headers ask for, else back off exponentially with jitter."""
+
+    def __init__(self, base: float = RETRY_BASE_DELAY, cap: float = RETRY_MAX_DELAY):
+        self.base = base
+        self.cap = cap
+
+    def __call__(self, retry_state: RetryCallState) -> float:
+        exc = retry_state.outcome.exception() if retry_state.outcome else None
+        delay = server_delay(exc) if exc is not None else None
+        if delay is not None:
+            # A little jitter so callers told the same reset time don't all return at once
+            return min(self.cap, delay) + random.uniform(0, self.base)
+        return backoff_delay(retry_state.attempt_number, self.base, self.cap)
+
+
+def next_retry_delay(exc: BaseException, attempt: int, limiter: Any = None, max_attempts: int = RETRY_MAX_ATTEMPTS) -> Optional[float]:
+    """
+    Same policy for hand-written retry loops: seconds to sleep before
+    attempt `attempt + 1`, or None to give up and re-raise.
+    """
+    if attempt >= max_attempts or not is_retryable(exc):
+        return None
+    delay = server_delay(exc)
+    if delay is None:
+        return backoff_delay(attempt)
+    if limiter is not None:
+        limiter.pause(delay)
+    return min(RETRY_MAX_DELAY, delay) + random.uniform(0, RETRY_BASE_DELAY)
+
+
+def retrying(name: str, limiter: Any = None, max_attempts: int = RETRY_MAX_ATTEMPTS) -> AsyncRetrying:
+    """
+    Retry policy for calls to Groq and LlamaParse:
+
+        async for attempt in retrying("llm", limiter):
+            with attempt:
+                ...
+
+    When the server names a wait time, `limiter` (an AsyncRateLimiter) is
+    paused for it as well, so other calls queue behind the limit instead
+    of hitting it too.
+    """
+    def before_sleep(retry_state: RetryCallState) -> None:
+        exc = retry_state.outcome.exception()
+        delay = server_delay(exc)
+        if limiter is not None and delay is not None:
+            limiter.pause(delay)
+        logger.warning(
+            f"{name} call failed ({exc.__class__.__name__}: {exc}), "
+            f"retry {retry_state.attempt_number}/{max_attempts - 1} in {retry_state.upcoming_sleep:.1f}s"
+        )
+
+    return AsyncRetrying(
+        retry=retry_if_exception(is_retryable),
+        wait=wait_server_or_backoff(),
+        stop=stop_after_attempt(max_attempts),
+        before_sleep=before_sleep,
+        reraise=True,
+    )
@@ -0,0 +1,82 @@
+import logging
+from typing import List, Optional
+
+from config import TOKENIZER_ENCODING
+
+logger = logging.getLogger(__name__)
+
+_encoding = None
+_encoding_failed = False
+
+
+def _get_encoding():
+    """The tiktoken encoding, loaded on first use; None if it can't be loaded"""
+    global _encoding, _encoding_failed
+    if _encoding is None and not _encoding_failed:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding(TOKENIZER_ENCODING)
+        except Exception as e:
+            # The BPE file is downloaded on first use; hosts without network access fall back to an estimate
+            _encoding_failed = True
+            logger.warning(f"tiktoken encoding {TOKENIZER_ENCODING} unavailable ({e}), estimating tokens as characters / 4")
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """
+    Token count of `text` in the configured tiktoken encoding. Llama 3's
+    tokenizer is built on cl100k_base, so this is close to what Groq counts.
+    """
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is None:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def _split_page(page: str, max_tokens: int) -> List[str]:
+    """Split a page larger than the budget on line boundaries"""
+    parts: List[str] = []
+    lines: List[str] = []
+    tokens = 0
+    for line in page.splitlines():
+        line_tokens = count_tokens(line) + 1
+        if lines and tokens + line_tokens > max_tokens:
+            parts.append("\n".join(lines))
+            lines, tokens = [], 0
+        lines.append(line)
+        tokens += line_tokens
+    if lines:
+        parts.append("\n".join(lines))
+    return parts
+
+
+def chunk_pages(pages: List[str], max_tokens: int, counts: Optional[List[int]] = None) -> List[str]:
+    """
+    Pack consecutive pages into chunks of at most `max_tokens` tokens,
+    keeping page order. Pages are never split unless one alone is over
+    the budget, in which case it is split between lines.
+    """
+    if counts is None:
+        counts = [count_tokens(page) for page in pages]
+
+    chunks: List[str] = []
+    current: List[str] = []
+    tokens = 0
+    for page, page_tokens in zip(pages, counts):
+        if page_tokens > max_tokens:
+            if current:
+                chunks.append("\n\n".join(current))
+                current, tokens = [], 0
+            chunks.extend(_split_page(page, max_tokens))
+            continue
+        if current and tokens + page_tokens > max_tokens:
+            chunks.append("\n\n".join(current))
+            current, tokens = [], 0
+        current.append(page)
+        tokens += page_tokens
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
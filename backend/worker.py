@@ -0,0 +1,156 @@
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from typing import Optional
+
+from agentic import agentic_process, resume_analysis
+from parsers.parse import shutdown_local_pool
+from config import JOB_LEASE_SECONDS, WORKER_CONCURRENCY
+from jobs.queue import Job, JobQueueError, SQLiteJobQueue, get_job_queue
+from jobs.spool import remove_case_spool
+from supabase_client.supabase_client import get_supabase_client, close_supabase_client
+from utils.events import get_event_bus
+from utils.checkpoints import get_checkpointer
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = 1.0
+
+# Job kind -> coroutine called with the job payload as keyword arguments
+HANDLERS = {
+    "agentic_process": agentic_process,
+    "resume_analysis": resume_analysis,
+}
+
+supabase = get_supabase_client()
+events = get_event_bus()
+
+
+async def _heartbeat(queue: SQLiteJobQueue, job: Job, worker_id: str) -> None:
+    while True:
+        await asyncio.sleep(JOB_LEASE_SECONDS / 3)
+        try:
+            await queue.heartbeat(job.job_id, worker_id, JOB_LEASE_SECONDS)
+        except JobQueueError as e:
+            logger.warning(f"{worker_id}: {e}")
+            return
+
+
+async def _give_up(job: Job) -> None:
+    """Final failure: mark the case failed and drop its spooled files"""
+    case_id = job.payload.get("case_id")
+    logger.error(f"Job {job.job_id} ({job.kind}) failed permanently: {job.last_error}")
+    if case_id:
+        try:
+            await supabase.update_case_status(case_id=case_id, status="failed")
+        except Exception as e:
+            logger.error(f"Could not mark case {case_id} failed: {e}")
+        await events.publish(case_id, "status", {"status": "failed", "error": job.last_error})
+        remove_case_spool(case_id)
+
+
+async def run_job(queue: SQLiteJobQueue, job: Job, worker_id: str) -> None:
+    """Run one claimed job, keeping its lease alive until it finishes"""
+    logger.info(f"{worker_id}: running job {job.job_id} ({job.kind}), attempt {job.attempts}/{job.max_attempts}")
+    case_id = job.payload.get("case_id")
+    heartbeat = asyncio.create_task(_heartbeat(queue, job, worker_id))
+    try:
+        handler = HANDLERS.get(job.kind)
+        if handler is None:
+            raise ValueError(f"No handler for job kind {job.kind}")
+
+        if case_id and job.attempts > 1:
+            await supabase.update_case_status(case_id=case_id, status="processing")
+            await events.publish(case_id, "status", {"status": "processing", "attempt": job.attempts})
+
+        await handler(**job.payload)
+
+    except Exception as e:
+        logger.error(f"{worker_id}: job {job.job_id} failed: {e}")
+        job.last_error = str(e)
+        if not await queue.fail(job, str(e)):
+            await _give_up(job)
+        elif case_id:
+            # Not terminal: live streams stay open for the next attempt
+            await events.publish(case_id, "status", {"status": "retrying", "attempt": job.attempts, "error": str(e)})
+
+    else:
+        await queue.complete(job.job_id)
+        if case_id:
+            remove_case_spool(case_id)
+        logger.info(f"{worker_id}: job {job.job_id} done")
+
+    finally:
+        heartbeat.cancel()
+
+
+async def worker_loop(queue: SQLiteJobQueue, worker_id: str, stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        try:
+            job = await queue.claim(worker_id, JOB_LEASE_SECONDS)
+        except Exception as e:
+            logger.error(f"{worker_id}: could not claim a job: {e}")
+            job = None
+
+        if job is None:
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            continue
+
+        await run_job(queue, job, worker_id)
+
+
+async def recover_orphans(queue: SQLiteJobQueue) -> None:
+    """Requeue jobs left running by a crashed worker; give up on exhausted ones"""
+    recovered = await queue.recover_orphans()
+    if recovered["requeued"]:
+        logger.warning(f"Requeued {recovered['requeued']} orphaned jobs")
+    for job in recovered["failed"]:
+        await _give_up(job)
+
+
+async def _recovery_loop(queue: SQLiteJobQueue, stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=JOB_LEASE_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        try:
+            await recover_orphans(queue)
+        except Exception as e:
+            logger.error(f"Orphan recovery failed: {e}")
+
+
+async def run_workers(count: int = WORKER_CONCURRENCY, stop: Optional[asyncio.Event] = None) -> None:
+    """Run `count` workers until `stop` is set (forever if not given)"""
+    queue = get_job_queue()
+    stop = stop or asyncio.Event()
+    prefix = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+    await recover_orphans(queue)
+    logger.info(f"Starting {count} workers ({prefix})")
+    await asyncio.gather(
+        _recovery_loop(queue, stop),
+        *(worker_loop(queue, f"{prefix}-{i}", stop) for i in range(count)),
+    )
+
+
+async def main() -> None:
+    try:
+        await run_workers()
+    finally:
+        await get_job_queue().close()
+        await get_event_bus().close()
+        if get_checkpointer() is not None:
+            await get_checkpointer().close()
+        await close_supabase_client()
+        shutdown_local_pool()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -30,9 +30,10 @@ export default function CasesPage() {
   const [pagination, setPagination] = useState<PaginationInfo>({
     page: 1,
     pageSize: 5,
-    total: 0,
-    totalPages: 0,
+    hasMore: false,
   });
+  // cursors[i] fetches page i + 1; the list is paged by the backend's next_cursor
+  const [cursors, setCursors] = useState<(string | null)[]>([null]);
 
   const fetchCases = async () => {
     if (!userId) return;
@@ -40,54 +41,26 @@ export default function CasesPage() {
     setLoading(true);
     setError("");
     try {
-      const result = await caseApi.getAll({}, userId);
+      const { page, pageSize } = pagination;
+      const result = await caseApi.getAll({
+        cursor: cursors[page - 1],
+        limit: pageSize,
+        status: filters.status,
+        search: filters.search.trim(),
+        startDate: filters.dateRange.from ? new Date(filters.dateRange.from).toISOString() : undefined,
+        // The "to" date is inclusive: everything before the start of the next day
+        endDate: filters.dateRange.to
+          ? new Date(new Date(filters.dateRange.to).getTime() + 24 * 60 * 60 * 1000).toISOString()
+          : undefined,
+        minAge: filters.ageRange.min > 0 ? filters.ageRange.min : undefined,
+        maxAge: filters.ageRange.max < 120 ? filters.ageRange.max : undefined,
+      }, userId);
       
-      let filteredCases = result.cases;
-      
-      if (filters.search) {
-        const searchTerm = filters.search.toLowerCase();
-        filteredCases = filteredCases.filter(case_ => 
-          case_.patient_name?.toLowerCase().includes(searchTerm) ||
-          case_.case_summary?.toLowerCase().includes(searchTerm) ||
-          case_.id.toLowerCase().includes(searchTerm)
-        );
-      }
-      
-      if (filters.status) {
-        filteredCases = filteredCases.filter(case_ => case_.status === filters.status);
-      }
-      
-      if (filters.ageRange.min > 0 || filters.ageRange.max < 120) {
-        filteredCases = filteredCases.filter(case_ => 
-          case_.patient_age !== undefined &&
-          case_.patient_age >= filters.ageRange.min && 
-          case_.patient_age <= filters.ageRange.max
-        );
-      }
-      
-      if (filters.dateRange.from || filters.dateRange.to) {
-        filteredCases = filteredCases.filter(case_ => {
-          const caseDate = new Date(case_.created_at);
-          const fromDate = filters.dateRange.from ? new Date(filters.dateRange.from) : null;
-          const toDate = filters.dateRange.to ? new Date(filters.dateRange.to) : null;
-          
-          if (fromDate && caseDate < fromDate) return false;
-          if (toDate && caseDate > toDate) return false;
-          return true;
-        });
-      }
-      
-      const total = filteredCases.length;
-      const totalPages = Math.ceil(total / pagination.pageSize);
-      const startIndex = (pagination.page - 1) * pagination.pageSize;
-      const endIndex = startIndex + pagination.pageSize;
-      const paginatedCases = filteredCases.slice(startIndex, endIndex);
-      
-      setCases(paginatedCases);
+      setCases(result.cases);
+      setCursors(prev => [...prev.slice(0, page), result.nextCursor]);
       setPagination(prev => ({ 
         ...prev, 
-        total, 
-        totalPages 
+        hasMore: result.nextCursor !== null 
       }));
     } catch (error) {
       console.error("Failed to fetch cases:", error);
@@ -103,14 +76,15 @@ export default function CasesPage() {
     }
   }, [filters, pagination.page, userId, authLoading]);
 
-  useEffect(() => {
-    if (pagination.page !== 1) {
-      setPagination(prev => ({ ...prev, page: 1 }));
-    }
-  }, [filters.search, filters.status, filters.dateRange, filters.ageRange]);
+  // Cursors belong to one set of filters, so a filter change starts over from page 1
+  const resetPaging = () => {
+    setCursors([null]);
+    setPagination(prev => ({ ...prev, page: 1, hasMore: false }));
+  };
 
   const handleFiltersChange = (newFilters: CaseFilters) => {
     setFilters(newFilters);
+    resetPaging();
   };
 
   const handleClearFilters = () => {
@@ -127,6 +101,7 @@ export default function CasesPage() {
         max: 120,
       },
     });
+    resetPaging();
   };
 
   const handlePageChange = (page: number) => {
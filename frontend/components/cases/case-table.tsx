@@ -214,14 +214,13 @@ export function CaseTable({ cases, pagination, onPageChange, onExportCase, loadi
           ))}
         </div>
 
-        {/* Pagination */}
-        {pagination.totalPages > 1 && (
+        {/* Pagination (cursor-based: only the neighbouring pages are reachable) */}
+        {(pagination.page > 1 || pagination.hasMore) && (
           <div className="border-t p-4">
             <div className="flex items-center justify-between">
               <div className="text-sm text-muted-foreground">
                 Showing {(pagination.page - 1) * pagination.pageSize + 1} to{' '}
-                {Math.min(pagination.page * pagination.pageSize, pagination.total)} of{' '}
-                {pagination.total} cases
+                {(pagination.page - 1) * pagination.pageSize + cases.length} cases
               </div>
               
               <div className="flex items-center gap-2">
@@ -235,37 +234,13 @@ export function CaseTable({ cases, pagination, onPageChange, onExportCase, loadi
                   Previous
                 </Button>
                 
-                <div className="flex items-center gap-1">
-                  {Array.from({ length: Math.min(5, pagination.totalPages) }, (_, i) => {
-                    let pageNum;
-                    if (pagination.totalPages <= 5) {
-                      pageNum = i + 1;
-                    } else {
-                      const start = Math.max(1, pagination.page - 2);
-                      const end = Math.min(pagination.totalPages, start + 4);
-                      pageNum = start + i;
-                      if (pageNum > end) return null;
-                    }
-                    
-                    return (
-                      <Button
-                        key={pageNum}
-                        variant={pagination.page === pageNum ? "default" : "outline"}
-                        size="sm"
-                        onClick={() => onPageChange(pageNum)}
-                        className="w-8"
-                      >
-                        {pageNum}
-                      </Button>
-                    );
-                  })}
-                </div>
+                <span className="text-sm px-2">Page {pagination.page}</span>
 
                 <Button
                   variant="outline"
                   size="sm"
                   onClick={() => onPageChange(pagination.page + 1)}
-                  disabled={pagination.page >= pagination.totalPages}
+                  disabled={!pagination.hasMore}
                 >
                   Next
                   <ChevronRight className="h-4 w-4" />
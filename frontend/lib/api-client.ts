@@ -20,7 +20,7 @@ export interface CaseData {
 }
 
 export interface CaseFilters {
-  page?: number;
+  cursor?: string | null;
   limit?: number;
   status?: string;
   search?: string;
@@ -28,10 +28,20 @@ export interface CaseFilters {
   endDate?: string;
   minAge?: number;
   maxAge?: number;
-  sortBy?: string;
-  sortOrder?: 'asc' | 'desc';
 }
 
+// CaseFilters field -> /cases/all_cases query parameter
+const CASE_FILTER_PARAMS: Record<keyof CaseFilters, string> = {
+  cursor: 'cursor',
+  limit: 'limit',
+  status: 'status',
+  search: 'search',
+  startDate: 'created_after',
+  endDate: 'created_before',
+  minAge: 'min_age',
+  maxAge: 'max_age',
+};
+
 export interface ApiResponse<T = any> {
   success?: boolean;
   message?: string;
@@ -93,41 +103,44 @@ class ApiClient {
     return await response.json();
   }
 
-  async getCases(filters: CaseFilters = {}, userId?: string): Promise<{ cases: Case[] }> {
+  async getCases(filters: CaseFilters = {}, userId?: string): Promise<{ cases: Case[]; nextCursor: string | null }> {
     const queryParams = new URLSearchParams();
     if (userId) {
       queryParams.append('user_id', userId);
     }
 
     Object.entries(filters).forEach(([key, value]) => {
-      if (value !== undefined && value !== null) {
-        queryParams.append(key, value.toString());
+      if (value !== undefined && value !== null && value !== '') {
+        queryParams.append(CASE_FILTER_PARAMS[key as keyof CaseFilters], value.toString());
       }
     });
 
     const endpoint = `/cases/all_cases${queryParams.toString() ? `?${queryParams.toString()}` : ''}`;
     const data = await makeBackendRequest(endpoint, {});
     
-    const transformedCases: Case[] = data.cases.map((backendCase: BackendCase) => ({
-      id: backendCase.case_id,
-      patient_name: backendCase.patient_name,
-      patient_age: backendCase.patient_age,
-      patient_gender: backendCase.patient_gender,
-      case_summary: backendCase.case_summary,
-      status: backendCase.status,
-      created_at: backendCase.created_at,
-      updated_at: backendCase.updated_at,
-      patient: {
-        id: `patient-${backendCase.id}`,
-        name: backendCase.patient_name,
-        age: backendCase.patient_age,
-        gender: backendCase.patient_gender,
-      },
-      patient_id: `patient-${backendCase.id}`,
-      title: backendCase.case_summary?.substring(0, 50) + "..." || "Case Summary",
-    }));
-
-    return { cases: transformedCases };
+    const transformedCases: Case[] = data.cases.map((backendCase: BackendCase) => {
+      const summary = backendCase.case_summary ?? backendCase.case_summary_preview;
+      return {
+        id: backendCase.case_id,
+        patient_name: backendCase.patient_name,
+        patient_age: backendCase.patient_age,
+        patient_gender: backendCase.patient_gender,
+        case_summary: summary,
+        status: backendCase.status,
+        created_at: backendCase.created_at,
+        updated_at: backendCase.updated_at,
+        patient: {
+          id: `patient-${backendCase.id}`,
+          name: backendCase.patient_name,
+          age: backendCase.patient_age,
+          gender: backendCase.patient_gender,
+        },
+        patient_id: `patient-${backendCase.id}`,
+        title: summary ? summary.substring(0, 50) + "..." : "Case Summary",
+      };
+    });
+
+    return { cases: transformedCases, nextCursor: data.next_cursor ?? null };
   }
 
   async getCase(caseId: string, userId?: string): Promise<ApiResponse> {
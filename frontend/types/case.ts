@@ -13,7 +13,9 @@ export interface BackendCase {
   patient_name: string;
   patient_age: number;
   patient_gender: string;
-  case_summary: string;
+  // Full summary with view=full; list rows carry a truncated preview instead
+  case_summary?: string;
+  case_summary_preview?: string | null;
   status: "failed" | "completed" | "processing";
   created_at: string;
   updated_at: string;
@@ -104,6 +106,5 @@ export interface CaseFilters {
 export interface PaginationInfo {
   page: number;
   pageSize: number;
-  total: number;
-  totalPages: number;
+  hasMore: boolean;
 } 
\ No newline at end of file